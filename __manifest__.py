@@ -23,11 +23,18 @@
     ],
     "data": [
         "security/ir.model.access.csv",
+        "data/ir_cron.xml",
         "views/work_center_view.xml",
         "views/robot_view.xml",
+        "views/api_endpoint_view.xml",
         "views/res_config_settings.xml",
         "views/product_template_view.xml",
         "views/production_view.xml",
+        "views/mass_start_view.xml",
+        "views/dispatch_job_view.xml",
+        "views/robot_utilization_view.xml",
+        "views/cycle_time_view.xml",
+        "views/profile_view.xml",
     ],
     "assets": {
         "web.assets_backend": [
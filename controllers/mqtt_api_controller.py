@@ -1,13 +1,46 @@
 # -*- coding: utf-8 -*-
 
+import gzip
 import json
 import logging
+import time
+import zlib
+from contextlib import contextmanager
 
+import psycopg2
+
+import odoo
 from odoo import http
 from odoo.http import request
+from odoo.tools import config
+
+from ..tools import profiler
+from ..tools.event_logger import events
+from ..tools.latency import tracker as api_latency
+from ..tools.wire_format import COMPACT_FORMAT, decode_body
 
 _logger = logging.getLogger(__name__)
 
+MAX_TELEMETRY_BATCH = 5000
+MAX_ROBOT_BATCH = 10000
+
+# Streaming status channel: events are committed in micro-batches of this
+# size or age, and a single NDJSON line may not exceed MAX_STREAM_LINE bytes.
+STREAM_BATCH_SIZE = 50
+STREAM_BATCH_SECONDS = 0.5
+MAX_STREAM_LINE = 64 * 1024
+
+# Callbacks may target any database served by this Odoo through a header or
+# query parameter, or through a plant key mapped to a database by the
+# ``mqtt_plant_databases`` server option (``plant_a:db_a,plant_b:db_b``).
+DATABASE_HEADER = 'X-Odoo-Database'
+PLANT_HEADER = 'X-MQTT-Plant'
+
+# Per-worker cache of each database's authentication settings.
+DATABASE_SETTINGS_TTL = 60
+_DATABASE_SETTINGS = {}
+_PLANT_DATABASES = None
+
 
 class MQTTAPIController(http.Controller):
     _inherit = 'http.controller'
@@ -16,15 +49,14 @@ class MQTTAPIController(http.Controller):
     # AUTHENTICATION METHODS
     # ===========================
 
-    def _check_authentication(self):
-        """Check if the request is authenticated based on configuration."""
-        config = request.env['ir.config_parameter'].sudo()
-        auth_enabled = config.get_param('mqtt_integration.mqtt_api_authentication_enabled', 'False')
+    def _check_authentication(self, dbname):
+        """Check if the request is authenticated based on the configuration of the database."""
+        settings = self._get_database_settings(dbname)
         
-        if auth_enabled != 'True':
+        if not settings['auth_enabled']:
             return True  # Authentication is disabled
         
-        auth_password = config.get_param('mqtt_integration.mqtt_api_authentication_password', '')
+        auth_password = settings['auth_password']
         if not auth_password:
             _logger.warning("Authentication is enabled but no password is configured")
             return False
@@ -42,6 +74,23 @@ class MQTTAPIController(http.Controller):
         
         return True
 
+    def _get_database_settings(self, dbname):
+        """Return the authentication settings of the database, cached for DATABASE_SETTINGS_TTL seconds."""
+        cached = _DATABASE_SETTINGS.get(dbname)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        with odoo.registry(dbname).cursor() as cr:
+            config_parameter = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})['ir.config_parameter']
+            settings = {
+                'auth_enabled': config_parameter.get_param(
+                    'mqtt_integration.mqtt_api_authentication_enabled', 'False') == 'True',
+                'auth_password': config_parameter.get_param(
+                    'mqtt_integration.mqtt_api_authentication_password', ''),
+            }
+        _DATABASE_SETTINGS[dbname] = (time.monotonic() + DATABASE_SETTINGS_TTL, settings)
+        return settings
+
     def _unauthorized_response(self):
         """Generate an unauthorized response."""
         response = json.dumps({
@@ -51,6 +100,66 @@ class MQTTAPIController(http.Controller):
         })
         return request.make_response(response, status=401, headers={'Content-Type': 'application/json'})
 
+    # ===========================
+    # DATABASE ROUTING METHODS
+    # ===========================
+
+    def _get_plant_databases(self):
+        """Return the {plant key: database} mapping of the mqtt_plant_databases server option."""
+        global _PLANT_DATABASES
+        if _PLANT_DATABASES is None:
+            mapping = {}
+            for item in (config.get('mqtt_plant_databases') or '').split(','):
+                plant, separator, dbname = item.partition(':')
+                if separator and plant.strip() and dbname.strip():
+                    mapping[plant.strip()] = dbname.strip()
+            _PLANT_DATABASES = mapping
+        return _PLANT_DATABASES
+
+    def _resolve_database(self):
+        """
+        Resolve the database targeted by the request.
+        
+        An explicit database (header or ``db`` parameter) wins over a plant
+        key (header or ``plant`` parameter); without either, the database
+        Odoo selected for the request is used.
+        
+        Returns:
+            tuple: (database name or None, error message or None)
+        """
+        httprequest = request.httprequest
+        dbname = httprequest.headers.get(DATABASE_HEADER) or httprequest.args.get('db')
+        plant = httprequest.headers.get(PLANT_HEADER) or httprequest.args.get('plant')
+        
+        if not dbname and plant:
+            dbname = self._get_plant_databases().get(plant)
+            if not dbname:
+                return None, f'Unknown plant: {plant}'
+        
+        if not dbname:
+            if not request.db:
+                return None, 'No database selected'
+            return request.db, None
+        
+        if dbname != request.db and not self._is_database_allowed(dbname):
+            return None, f'Unknown database: {dbname}'
+        return dbname, None
+
+    def _is_database_allowed(self, dbname):
+        """Check that the database exists and passes the server's database filter."""
+        if not http.db_filter([dbname], host=request.httprequest.host):
+            return False
+        return dbname in _DATABASE_SETTINGS or odoo.service.db.exp_db_exist(dbname)
+
+    @contextmanager
+    def _database_env(self, dbname):
+        """Yield a superuser environment on the database, reusing the request cursor when possible."""
+        if dbname == request.db:
+            yield request.env(user=1)
+            return
+        with odoo.registry(dbname).cursor() as cr:
+            yield odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+
     # ===========================
     # API ENDPOINTS
     # ===========================
@@ -58,84 +167,303 @@ class MQTTAPIController(http.Controller):
     @http.route('/mqtt-integration/update-production-status', type='http', auth='none', methods=['POST'], csrf=False)
     def update_production_status(self, **kwargs):
         """Update manufacturing order status from MQTT API with improved queue integration."""
-        try:
-            # Check authentication first
-            if not self._check_authentication():
-                return self._unauthorized_response()
+        dbname, error = self._resolve_database()
+        if error:
+            return self._error_response(error)
+        # Authenticate before profiling so unauthenticated calls never write profiles.
+        if not self._check_authentication(dbname):
+            return self._unauthorized_response()
+        
+        with self._database_env(dbname) as env:
+            profile_model = env['mqtt_integration.profile'].sudo()
+            profile = profile_model._start('callback', '/mqtt-integration/update-production-status')
+            with profiler.activate(profile):
+                try:
+                    return self._update_production_status(env)
+                finally:
+                    profile_model._save(profile)
 
+    def _update_production_status(self, env):
+        """Parse and apply one authenticated status update request."""
+        profile = profiler.current()
+        try:
             try:
-                data = json.loads(request.httprequest.data.decode('utf-8'))
-            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                with profile.phase('parse'):
+                    data = self._read_json_body()
+            except (json.JSONDecodeError, UnicodeDecodeError, OSError, EOFError, zlib.error) as e:
                 _logger.error(f"Invalid JSON data in production status update: {e}")
                 return self._error_response('Invalid JSON format')
             
-            validation_result = self._validate_request_data(data)
-            if validation_result:
-                return validation_result
-            
-            production_id = data['productionId']
-            status = data['status'] 
-            task_id = data.get('taskId')
-            
-            _logger.info(f"Processing status update - Production: {production_id}, Status: {status}, Task: {task_id}")
-            
-            production = self._get_production(production_id)
-            if isinstance(production, dict):
-                return production
-            
-            try:
-                request.env.cr.execute("SELECT id FROM mrp_production WHERE id = %s FOR UPDATE NOWAIT", (production.id,))
-                
-                production = production.sudo()
-                
-                if status == 'done' and production.state == 'done':
-                    _logger.info(f"Production {production_id} already completed, skipping duplicate request")
-                    return self._success_response('Production already completed')
-                
-                if status == 'failed' and production.state in ('cancel', 'draft'):
-                    _logger.info(f"Production {production_id} already failed/cancelled, skipping duplicate request")
-                    return self._success_response('Production already failed/cancelled')
-                
-                if task_id and production.mqtt_task_id != task_id:
-                    _logger.warning(f"Task ID mismatch for production {production_id}: expected {production.mqtt_task_id}, got {task_id}")
-                    return self._error_response('Task ID mismatch')
-                
-                success = self._process_status_update(production, status, task_id)
-                if not success:
-                    return self._error_response(f'Failed to process status: {status}')
-                    
-            except Exception as lock_error:
-                _logger.warning(f"Could not acquire lock for production {production_id}: {lock_error}")
-                return self._success_response('Production update already in progress')
-            
-            _logger.info(f"Successfully updated production {production_id} to status {status}")
-            return self._success_response('Production status updated successfully')
+            success, message = self._apply_status_update(env, data)
+            if not success:
+                return self._error_response(message)
+            return self._success_response(message)
             
         except Exception as e:
             _logger.error(f"Unexpected error in production status update: {str(e)}")
             return self._error_response(f'Internal server error: {str(e)}')
 
+    @http.route('/mqtt-integration/update-production-status/stream', type='http', auth='none', methods=['POST'], csrf=False)
+    def stream_production_status(self, **kwargs):
+        """
+        Apply a long-lived stream of newline-delimited JSON status events.
+
+        Events are parsed incrementally, applied in micro-batches committed one
+        by one, and acknowledged with one NDJSON line per event once their
+        batch is committed. A blank line forces the pending batch to flush.
+        """
+        dbname, error = self._resolve_database()
+        if error:
+            return self._error_response(error)
+        if not self._check_authentication(dbname):
+            return self._unauthorized_response()
+
+        stream = request.httprequest.stream
+        if (request.httprequest.headers.get('Content-Encoding') or '').lower() == 'gzip':
+            stream = gzip.GzipFile(fileobj=stream)
+
+        response = request.make_response(
+            self._generate_stream_acks(dbname, stream),
+            headers={'Content-Type': 'application/x-ndjson', 'Cache-Control': 'no-cache'},
+        )
+        response.direct_passthrough = True
+        return response
+
+    @http.route('/mqtt-integration/telemetry', type='http', auth='none', methods=['POST'], csrf=False)
+    def ingest_telemetry(self, **kwargs):
+        """Ingest a batch of robot progress and sensor events."""
+        try:
+            dbname, error = self._resolve_database()
+            if error:
+                return self._error_response(error)
+            if not self._check_authentication(dbname):
+                return self._unauthorized_response()
+
+            try:
+                data = self._read_json_body()
+            except (json.JSONDecodeError, UnicodeDecodeError, OSError, EOFError, zlib.error) as e:
+                _logger.error(f"Invalid JSON data in telemetry batch: {e}")
+                return self._error_response('Invalid JSON format')
+
+            samples = data.get('events') if isinstance(data, dict) else data
+            if not isinstance(samples, list) or not samples:
+                return self._error_response('No events provided')
+            if len(samples) > MAX_TELEMETRY_BATCH:
+                return self._error_response(f'Too many events in batch (max {MAX_TELEMETRY_BATCH})')
+
+            with self._database_env(dbname) as env:
+                accepted, rejected = env['mqtt_integration.telemetry']._ingest(samples)
+
+            response = json.dumps({
+                'status': 'success',
+                'message': 'Telemetry ingested',
+                'accepted': accepted,
+                'rejected': rejected,
+                'timestamp': self._get_timestamp()
+            })
+            return request.make_response(response, headers={'Content-Type': 'application/json'})
+
+        except Exception as e:
+            _logger.error(f"Unexpected error in telemetry ingestion: {str(e)}")
+            return self._error_response(f'Internal server error: {str(e)}')
+
+    @http.route('/mqtt-integration/heartbeat', type='http', auth='none', methods=['POST'], csrf=False)
+    def robot_heartbeat(self, **kwargs):
+        """Record that one or more robots are alive."""
+        try:
+            dbname, error = self._resolve_database()
+            if error:
+                return self._error_response(error)
+            if not self._check_authentication(dbname):
+                return self._unauthorized_response()
+
+            try:
+                data = self._read_json_body()
+            except (json.JSONDecodeError, UnicodeDecodeError, OSError, EOFError, zlib.error) as e:
+                _logger.error(f"Invalid JSON data in robot heartbeat: {e}")
+                return self._error_response('Invalid JSON format')
+
+            if not isinstance(data, dict):
+                return self._error_response('No robots provided')
+            identifiers = data.get('robots') or ([data['identifier']] if data.get('identifier') else [])
+            identifiers = [str(identifier) for identifier in identifiers if identifier]
+            if not identifiers:
+                return self._error_response('No robots provided')
+
+            with self._database_env(dbname) as env:
+                written = env['mqtt_integration.robot']._record_heartbeats(identifiers)
+
+            response = json.dumps({
+                'status': 'success',
+                'message': 'Heartbeat recorded',
+                'accepted': len(identifiers),
+                'written': written,
+                'timestamp': self._get_timestamp()
+            })
+            return request.make_response(response, headers={'Content-Type': 'application/json'})
+
+        except Exception as e:
+            _logger.error(f"Unexpected error in robot heartbeat: {str(e)}")
+            return self._error_response(f'Internal server error: {str(e)}')
+
+    @http.route('/mqtt-integration/robots', type='http', auth='none', methods=['POST'], csrf=False)
+    def upsert_robots(self, **kwargs):
+        """Register, move or retire robots in bulk, keyed by their identifier."""
+        try:
+            dbname, error = self._resolve_database()
+            if error:
+                return self._error_response(error)
+            if not self._check_authentication(dbname):
+                return self._unauthorized_response()
+
+            try:
+                data = self._read_json_body()
+            except (json.JSONDecodeError, UnicodeDecodeError, OSError, EOFError, zlib.error) as e:
+                _logger.error(f"Invalid JSON data in robot upsert: {e}")
+                return self._error_response('Invalid JSON format')
+
+            robots = data.get('robots') if isinstance(data, dict) else data
+            if not isinstance(robots, list) or not robots:
+                return self._error_response('No robots provided')
+            if len(robots) > MAX_ROBOT_BATCH:
+                return self._error_response(f'Too many robots in batch (max {MAX_ROBOT_BATCH})')
+
+            with self._database_env(dbname) as env:
+                created, updated, errors = env['mqtt_integration.robot']._bulk_upsert(robots)
+
+            response = json.dumps({
+                'status': 'success',
+                'message': 'Robots registered',
+                'created': created,
+                'updated': updated,
+                'rejected': len(errors),
+                'errors': errors[:100],
+                'timestamp': self._get_timestamp()
+            })
+            return request.make_response(response, headers={'Content-Type': 'application/json'})
+
+        except Exception as e:
+            _logger.error(f"Unexpected error in robot upsert: {str(e)}")
+            return self._error_response(f'Internal server error: {str(e)}')
+
+    # ===========================
+    # REQUEST METHODS
+    # ===========================
+
+    def _read_json_body(self):
+        """Decode the JSON request body, gunzipping it when sent with Content-Encoding: gzip."""
+        return decode_body(
+            request.httprequest.get_data(),
+            request.httprequest.headers.get('Content-Encoding'),
+        )
+
+    # ===========================
+    # STREAMING METHODS
+    # ===========================
+
+    def _iter_ndjson(self, stream):
+        """
+        Parse a byte stream of newline-delimited JSON lazily.
+
+        Yields:
+            tuple: (sequence number, event dict or None for a flush marker, error message)
+        """
+        sequence = 0
+        for raw_line in iter(lambda: stream.readline(MAX_STREAM_LINE + 1), b''):
+            if not raw_line.strip():
+                yield None, None, None
+                continue
+            sequence += 1
+            if len(raw_line) > MAX_STREAM_LINE:
+                yield sequence, None, 'Line too long'
+                # Skip the rest of the oversized line.
+                while raw_line and not raw_line.endswith(b'\n'):
+                    raw_line = stream.readline(MAX_STREAM_LINE + 1)
+                continue
+            try:
+                yield sequence, json.loads(raw_line.decode('utf-8')), None
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                yield sequence, None, 'Invalid JSON format'
+
+    def _generate_stream_acks(self, dbname, stream):
+        """Apply streamed events in micro-batches and yield one ack line per event."""
+        registry = odoo.registry(dbname)
+        batch = []
+        batch_started = time.monotonic()
+
+        def ack(sequence, event, success, message):
+            line = {
+                'seq': event.get('seq', sequence) if isinstance(event, dict) else sequence,
+                'status': 'success' if success else 'error',
+                'message': message,
+            }
+            if isinstance(event, dict) and event.get('productionId') is not None:
+                line['productionId'] = event['productionId']
+            return (json.dumps(line) + '\n').encode('utf-8')
+
+        def flush():
+            acks = []
+            with registry.cursor() as cr:
+                env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+                for sequence, event in batch:
+                    try:
+                        with cr.savepoint():
+                            success, message = self._apply_status_update(env, event)
+                    except Exception as e:
+                        events.error('callback', 'stream.event_error', exc_info=True, seq=sequence,
+                                     production=event.get('productionId'), task=event.get('taskId'), error=e)
+                        success, message = False, f'Internal server error: {str(e)}'
+                    acks.append(ack(sequence, event, success, message))
+            batch.clear()
+            return b''.join(acks)
+
+        try:
+            for sequence, event, error in self._iter_ndjson(stream):
+                if error:
+                    yield ack(sequence, None, False, error)
+                    continue
+                if event is not None:
+                    batch.append((sequence, event))
+                if batch and (
+                    event is None
+                    or len(batch) >= STREAM_BATCH_SIZE
+                    or time.monotonic() - batch_started >= STREAM_BATCH_SECONDS
+                ):
+                    yield flush()
+                    batch_started = time.monotonic()
+            if batch:
+                yield flush()
+        except Exception as e:
+            _logger.error(f"Status stream aborted: {e}")
+            yield (json.dumps({'status': 'error', 'message': f'Stream aborted: {str(e)}'}) + '\n').encode('utf-8')
+
     # ===========================
     # VALIDATION METHODS
     # ===========================
 
     def _validate_request_data(self, data):
-        """Validate the request data format and required fields."""
-        if not data:
-            _logger.error("Empty data received in production status update")
-            return self._error_response('No data provided')
+        """
+        Validate the request data format and required fields.
+        
+        Returns:
+            str: error message, or None when the data is valid
+        """
+        if not data or not isinstance(data, dict):
+            events.error('callback', 'request.empty')
+            return 'No data provided'
         
         required_fields = ['productionId', 'status']
         missing_fields = [field for field in required_fields if not data.get(field)]
         
         if missing_fields:
-            _logger.error(f"Missing required fields: {missing_fields}")
-            return self._error_response(f'Missing required fields: {", ".join(missing_fields)}')
+            events.error('callback', 'request.missing_fields', fields=','.join(missing_fields))
+            return f'Missing required fields: {", ".join(missing_fields)}'
         
         valid_statuses = ['done', 'failed']
         if data['status'] not in valid_statuses:
-            _logger.error(f"Invalid status '{data['status']}', must be one of: {valid_statuses}")
-            return self._error_response(f'Invalid status. Valid options: {", ".join(valid_statuses)}')
+            events.error('callback', 'request.invalid_status', production=data.get('productionId'),
+                         task=data.get('taskId'), status=data['status'])
+            return f'Invalid status. Valid options: {", ".join(valid_statuses)}'
         
         return None
 
@@ -143,47 +471,117 @@ class MQTTAPIController(http.Controller):
     # PRODUCTION METHODS
     # ===========================
 
-    def _get_production(self, production_id):
-        """Get production record with error handling."""
+    def _get_production(self, env, production_id):
+        """
+        Get production record with error handling.
+        
+        Returns:
+            tuple: (production record or None, error message or None)
+        """
         try:
-            env = request.env(user=1)
             production = env['mrp.production'].browse(int(production_id))
             
             if not production.exists():
-                _logger.error(f"Production {production_id} not found")
-                return self._error_response(f'Production {production_id} not found')
+                events.error('callback', 'production.not_found', production=production_id)
+                return None, f'Production {production_id} not found'
             
-            return production
+            return production, None
             
-        except ValueError:
-            _logger.error(f"Invalid production ID format: {production_id}")
-            return self._error_response('Invalid production ID format')
+        except (TypeError, ValueError):
+            events.error('callback', 'production.invalid_id', production=production_id)
+            return None, 'Invalid production ID format'
         except Exception as e:
-            _logger.error(f"Error retrieving production {production_id}: {e}")
-            return self._error_response('Failed to retrieve production')
+            events.error('callback', 'production.read_error', production=production_id, error=e)
+            return None, 'Failed to retrieve production'
+
+    def _apply_status_update(self, env, data):
+        """
+        Validate and apply one status update in the given environment.
+        
+        The production row is locked with NOWAIT inside a savepoint, so a
+        concurrent update of the same production is reported without
+        aborting the surrounding transaction.
+        
+        Returns:
+            tuple: (success, message)
+        """
+        error = self._validate_request_data(data)
+        if error:
+            return False, error
+        
+        production_id = data['productionId']
+        status = data['status']
+        task_id = data.get('taskId')
+        
+        events.debug('callback', 'status.received', task=task_id, production=production_id, status=status)
+        profile = profiler.current()
+        profile.annotate(production_id=production_id, task_id=task_id)
+        
+        production, error = self._get_production(env, production_id)
+        if error:
+            return False, error
+        
+        try:
+            with profile.phase('lock', lock=True), env.cr.savepoint(flush=False):
+                env.cr.execute("SELECT id FROM mrp_production WHERE id = %s FOR UPDATE NOWAIT", (production.id,))
+        except psycopg2.OperationalError as lock_error:
+            events.warning('callback', 'production.locked', task=task_id, production=production_id,
+                           error=str(lock_error).strip())
+            if production.mqtt_unit_ids:
+                # Unit tasks of one production finish concurrently; ask for a retry instead of dropping one.
+                return False, 'Production update already in progress, retry later'
+            return True, 'Production update already in progress'
+        
+        production = production.sudo()
+        
+        if status == 'done' and production.state == 'done':
+            events.info('callback', 'status.duplicate', sampled=True, task=task_id,
+                        production=production_id, status=status)
+            return True, 'Production already completed'
+        
+        if status == 'failed' and production.state in ('cancel', 'draft'):
+            events.info('callback', 'status.duplicate', sampled=True, task=task_id,
+                        production=production_id, status=status)
+            return True, 'Production already failed/cancelled'
+        
+        if task_id and production.mqtt_task_id != task_id and task_id not in production.mqtt_unit_ids.mapped('task_id'):
+            events.warning('callback', 'task.mismatch', task=task_id, production=production_id,
+                           expected=production.mqtt_task_id)
+            return False, 'Task ID mismatch'
+        
+        success = self._process_status_update(production, status, task_id)
+        if not success:
+            return False, f'Failed to process status: {status}'
+        
+        events.info('callback', 'status.applied', sampled=True, task=task_id,
+                    production=production_id, status=status)
+        return True, 'Production status updated successfully'
 
     def _process_status_update(self, production, status, task_id):
         """Process the status update for the production."""
         try:
-            if status == 'done':
+            if production.mqtt_unit_ids:
+                return production._handle_unit_status(task_id, status)
+            elif production.mqtt_job_id.state == 'dispatched':
+                return production.mqtt_job_id._handle_status(status, task_id)
+            elif status == 'done':
                 production._handle_task_completion()
-                _logger.info(f"Production {production.id} completed successfully via task {task_id}")
                 return True
             elif status == 'failed':
                 error_msg = f'Task {task_id} failed during robot execution'
                 production._handle_task_failure(error_msg)
-                _logger.info(f"Production {production.id} marked as failed via task {task_id}")
                 return True
             else:
-                _logger.error(f"Unhandled status '{status}' for production {production.id}")
+                events.error('callback', 'status.unhandled', task=task_id, production=production.id, status=status)
                 return False
                 
         except Exception as e:
-            _logger.error(f"Error processing status update for production {production.id}: {e}")
+            events.error('callback', 'status.error', exc_info=True, task=task_id,
+                         production=production.id, status=status, error=e)
             try:
                 if status == 'done':
                     production.write({'state': 'cancel'})
-                    _logger.info(f"Production {production.id} marked as cancelled due to completion error")
+                    events.warning('callback', 'production.cancelled', task=task_id, production=production.id)
             except:
                 pass
             return False
@@ -223,24 +621,42 @@ class MQTTAPIController(http.Controller):
     def health_check(self, **kwargs):
         """Health check endpoint for MQTT API integration."""
         try:
+            dbname, error = self._resolve_database()
+            if error:
+                return {
+                    'status': 'unhealthy',
+                    'message': error,
+                    'timestamp': self._get_timestamp(),
+                    'database_accessible': False
+                }
+
             # Check authentication for health check too
-            if not self._check_authentication():
+            if not self._check_authentication(dbname):
                 return {
                     'status': 'unauthorized',
                     'message': 'Authentication required',
                     'timestamp': self._get_timestamp()
                 }
 
-            env = request.env(user=1)
-            
-            production_count = env['mrp.production'].search_count([])
+            with self._database_env(dbname) as env:
+                with env['mqtt_integration.replica']._read_cursor() as (read_cr, read_source):
+                    read_cr.execute("SELECT count(*) FROM mrp_production")
+                    production_count = read_cr.fetchone()[0]
+                # Circuit state drives dispatch decisions and is always read from the primary.
+                api_circuits = env['mqtt_integration.api.circuit']._get_circuit_status()
             
             return {
                 'status': 'healthy',
                 'message': 'MQTT Integration addon is running',
                 'timestamp': self._get_timestamp(),
+                'database': dbname,
                 'database_accessible': True,
-                'production_records': production_count
+                'production_records': production_count,
+                'read_source': read_source,
+                'api_circuits': api_circuits,
+                'api_latency': api_latency.snapshot(),
+                'wire_formats': ['json', COMPACT_FORMAT],
+                'content_encodings': ['gzip']
             }
         except Exception as e:
             _logger.error(f"Health check failed: {e}")
@@ -1,8 +1,22 @@
 # -*- coding: utf-8 -*-
 
 from . import mrp_production
+from . import production_unit
 from . import mrp_work_center
 from . import mrp_work_order
 from . import res_config_settings
 from . import robot
 from . import product_template
+from . import api_circuit
+from . import api_client
+from . import api_endpoint
+from . import mass_start
+from . import dispatch_job
+from . import material_ledger
+from . import telemetry
+from . import task_history
+from . import cycle_time
+from . import robot_utilization
+from . import profile
+from . import replica
+from . import retention
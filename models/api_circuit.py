@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# Per-worker memo of open circuits ({key: monotonic deadline}), so that calls
+# fail fast without a database round trip while a circuit is known to be open.
+_OPEN_UNTIL = {}
+_OPEN_UNTIL_LOCK = threading.Lock()
+# Per-worker memo of closed circuits without failures ({key: monotonic expiry}),
+# so that healthy endpoints cost no database round trip before or after a call.
+_CLOSED_UNTIL = {}
+_CLOSED_TTL = 5
+
+
+class MqttApiCircuit(models.Model):
+    _name = "mqtt_integration.api.circuit"
+    _description = "MQTT API Circuit Breaker"
+    _rec_name = 'key'
+
+    # ===========================
+    # FIELDS
+    # ===========================
+
+    key = fields.Char(
+        string="Endpoint",
+        required=True,
+        index=True,
+        help="Base URL of the API endpoint protected by this circuit"
+    )
+    state = fields.Selection(
+        selection=[
+            ('closed', 'Closed'),
+            ('open', 'Open'),
+            ('half_open', 'Half-Open'),
+        ],
+        string="State",
+        required=True,
+        default='closed',
+        help="Closed: calls pass. Open: calls fail fast. Half-Open: one probe call is allowed"
+    )
+    failure_count = fields.Integer(
+        string="Consecutive Failures",
+        help="Number of consecutive failed calls"
+    )
+    opened_at = fields.Datetime(
+        string="Opened At",
+        help="When the circuit last opened"
+    )
+    probe_started_at = fields.Datetime(
+        string="Probe Started At",
+        help="When the current half-open probe call started"
+    )
+    last_error = fields.Char(
+        string="Last Error",
+        help="Error of the last failed call"
+    )
+
+    _sql_constraints = [
+        ('key_unique', 'unique(key)', 'A circuit already exists for this endpoint.'),
+    ]
+
+    # ===========================
+    # CONFIGURATION METHODS
+    # ===========================
+
+    @api.model
+    def _get_circuit_settings(self):
+        """Return (failure threshold, reset timeout in seconds) from configuration."""
+        config = self.env['ir.config_parameter'].sudo()
+        threshold = int(config.get_param('mqtt_integration.mqtt_api_circuit_failure_threshold', 5) or 5)
+        reset_timeout = int(config.get_param('mqtt_integration.mqtt_api_circuit_reset_timeout', 30) or 30)
+        return max(threshold, 1), max(reset_timeout, 1)
+
+    # ===========================
+    # CIRCUIT METHODS
+    # ===========================
+
+    @api.model
+    def _allow_request(self, key):
+        """
+        Decide whether a call to the endpoint may go through.
+
+        Returns:
+            float: 0 if the call is allowed, otherwise seconds until the next probe
+        """
+        return self._check_request(key)[0]
+
+    @api.model
+    def _check_request(self, key):
+        """
+        Decide whether a call to the endpoint may go through, and whether it is the half-open probe.
+
+        State lives in its own committed transaction so every worker sees it
+        regardless of the caller's transaction outcome; a circuit seen closed
+        without failures is trusted for a few seconds without reading it
+        again, and rows are only written on failures and transitions. When the
+        reset timeout has elapsed, exactly one caller wins the transition to
+        half-open and is allowed to probe the endpoint.
+
+        Returns:
+            tuple: (0 if the call is allowed, otherwise seconds until the next
+            probe, whether the call is the single probe of a half-open circuit)
+        """
+        with _OPEN_UNTIL_LOCK:
+            deadline = _OPEN_UNTIL.get(key)
+            clean_until = _CLOSED_UNTIL.get(key)
+        now = time.monotonic()
+        if deadline and deadline > now:
+            return deadline - now, False
+        if clean_until and clean_until > now:
+            return 0, False
+
+        _threshold, reset_timeout = self._get_circuit_settings()
+        with self.env.registry.cursor() as cr:
+            cr.execute("""
+                SELECT state,
+                       failure_count,
+                       EXTRACT(EPOCH FROM (COALESCE(opened_at, now() at time zone 'utc')
+                               + %s * interval '1 second' - now() at time zone 'utc'))
+                  FROM mqtt_integration_api_circuit
+                 WHERE key = %s
+            """, (reset_timeout, key))
+            row = cr.fetchone()
+            if not row or row[0] == 'closed':
+                if not row or not row[1]:
+                    self._remember_closed(key)
+                return 0, False
+
+            cr.execute("""
+                UPDATE mqtt_integration_api_circuit
+                   SET state = 'half_open',
+                       probe_started_at = now() at time zone 'utc'
+                 WHERE key = %(key)s
+                   AND ((state = 'open'
+                         AND opened_at <= now() at time zone 'utc' - %(reset)s * interval '1 second')
+                     OR (state = 'half_open'
+                         AND probe_started_at <= now() at time zone 'utc' - %(reset)s * interval '1 second'))
+             RETURNING id
+            """, {'key': key, 'reset': reset_timeout})
+            if cr.fetchone():
+                _logger.info(f"Circuit for {key} is half-open, probing endpoint")
+                return 0, True
+
+        state, _failures, remaining = row
+        remaining = max(float(remaining or 0), 1.0)
+        if state == 'open':
+            with _OPEN_UNTIL_LOCK:
+                _OPEN_UNTIL[key] = time.monotonic() + remaining
+        return remaining, False
+
+    @api.model
+    def _remember_closed(self, key):
+        """Skip the database for the endpoint while its circuit is known to be closed without failures."""
+        with _OPEN_UNTIL_LOCK:
+            _OPEN_UNTIL.pop(key, None)
+            _CLOSED_UNTIL[key] = time.monotonic() + _CLOSED_TTL
+
+    @api.model
+    def _record_success(self, key):
+        """Close the circuit after a successful call; nothing is written while it is known to be closed."""
+        with _OPEN_UNTIL_LOCK:
+            clean_until = _CLOSED_UNTIL.get(key)
+        if clean_until and clean_until > time.monotonic():
+            return
+        with self.env.registry.cursor() as cr:
+            cr.execute("""
+                UPDATE mqtt_integration_api_circuit
+                   SET state = 'closed',
+                       failure_count = 0,
+                       probe_started_at = NULL
+                 WHERE key = %s
+                   AND (state != 'closed' OR failure_count != 0)
+            """, (key,))
+        self._remember_closed(key)
+
+    @api.model
+    def _record_failure(self, key, error):
+        """Count a failed call and open the circuit past the threshold or on a failed probe."""
+        with _OPEN_UNTIL_LOCK:
+            _CLOSED_UNTIL.pop(key, None)
+        threshold, reset_timeout = self._get_circuit_settings()
+        with self.env.registry.cursor() as cr:
+            cr.execute("""
+                INSERT INTO mqtt_integration_api_circuit AS c (key, state, failure_count, last_error, opened_at)
+                VALUES (
+                    %(key)s,
+                    CASE WHEN %(threshold)s <= 1 THEN 'open' ELSE 'closed' END,
+                    1,
+                    %(error)s,
+                    CASE WHEN %(threshold)s <= 1 THEN now() at time zone 'utc' END
+                )
+                ON CONFLICT (key) DO UPDATE
+                   SET failure_count = c.failure_count + 1,
+                       last_error = EXCLUDED.last_error,
+                       state = CASE
+                           WHEN c.state = 'half_open' OR c.failure_count + 1 >= %(threshold)s THEN 'open'
+                           ELSE c.state
+                       END,
+                       opened_at = CASE
+                           WHEN c.state = 'half_open' OR c.failure_count + 1 >= %(threshold)s
+                           THEN now() at time zone 'utc'
+                           ELSE c.opened_at
+                       END
+             RETURNING state, failure_count
+            """, {'key': key, 'error': str(error)[:255], 'threshold': threshold})
+            row = cr.fetchone()
+
+        if row and row[0] == 'open':
+            with _OPEN_UNTIL_LOCK:
+                _OPEN_UNTIL[key] = time.monotonic() + reset_timeout
+            _logger.warning(
+                f"Circuit for {key} opened after {row[1]} consecutive failures: {error}"
+            )
+
+    @api.model
+    def _get_circuit_status(self):
+        """Return the state of every circuit for the health endpoint."""
+        circuits = self.sudo().search([])
+        return [{
+            'endpoint': circuit.key,
+            'state': circuit.state,
+            'failure_count': circuit.failure_count,
+            'opened_at': circuit.opened_at.isoformat() if circuit.opened_at else None,
+            'last_error': circuit.last_error,
+        } for circuit in circuits]
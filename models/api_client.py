@@ -0,0 +1,448 @@
+# -*- coding: utf-8 -*-
+
+import itertools
+import logging
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+from odoo import models, api
+from odoo.exceptions import UserError
+
+from ..tools import dispatch_pool
+from ..tools.latency import tracker as latency
+from ..tools.wire_format import COMPACT_FORMAT, WIRE_FORMAT_HEADER, encode_body
+
+_logger = logging.getLogger(__name__)
+
+# Per-worker round-robin counters, keyed by endpoint group.
+_ROUND_ROBIN = {}
+_ROUND_ROBIN_LOCK = threading.Lock()
+
+# Per-worker cache of negotiated capabilities ({base_url: (expiry, capabilities)}).
+_CAPABILITIES = {}
+_CAPABILITIES_TTL = 300
+
+# Methods safe to send twice: hedged when enabled and timed out after the observed latency.
+IDEMPOTENT_METHODS = ('GET', 'DELETE')
+# Timeout of other calls, such as task creation, which must not give up early and be sent again.
+FIXED_TIMEOUT = 10
+
+# Feature advertised by API versions accepting POST /api/tasks/batch-delete.
+BATCH_DELETE_FEATURE = 'batch-delete'
+BATCH_DELETE_SIZE = 500
+
+
+class MqttApiClient(models.AbstractModel):
+    _name = "mqtt_integration.api.client"
+    _description = "MQTT API Client"
+
+    # ===========================
+    # CONFIGURATION METHODS
+    # ===========================
+
+    @api.model
+    def _get_api_base_url(self):
+        """Return the base URL of the single API configured in the settings."""
+        config = self.env['ir.config_parameter'].sudo()
+        host = config.get_param('mqtt_integration.mqtt_api_host', 'localhost')
+        port = config.get_param('mqtt_integration.mqtt_api_port', '3000')
+        return f"http://{host}:{port}"
+
+    @api.model
+    def _get_api_base_urls(self, workcenter=None):
+        """Return the candidate base URLs for a work center, falling back to the settings."""
+        return (
+            self.env['mqtt_integration.api.endpoint']._get_routing_group(workcenter)
+            or [self._get_api_base_url()]
+        )
+
+    @api.model
+    def _get_auth_headers(self):
+        """Return the Authorization header when API authentication is enabled."""
+        config = self.env['ir.config_parameter'].sudo()
+        auth_enabled = config.get_param('mqtt_integration.mqtt_api_authentication_enabled', 'False')
+        auth_password = config.get_param('mqtt_integration.mqtt_api_authentication_password', '')
+
+        headers = {}
+        if auth_enabled == 'True' and auth_password:
+            headers['Authorization'] = f'Bearer {auth_password}'
+        return headers
+
+    @api.model
+    def _get_wire_format(self):
+        """Return the configured wire format: 'auto' negotiates, 'json' forces the legacy format."""
+        config = self.env['ir.config_parameter'].sudo()
+        return config.get_param('mqtt_integration.mqtt_api_wire_format', 'auto')
+
+    @api.model
+    def _get_dispatch_concurrency(self):
+        """Return how many API calls of one batch may be in flight at once; 1 sends them one by one."""
+        config = self.env['ir.config_parameter'].sudo()
+        return max(int(config.get_param('mqtt_integration.mqtt_dispatch_concurrency', 8) or 1), 1)
+
+    @api.model
+    def _get_hedging_enabled(self):
+        """Return whether slow idempotent calls are hedged with a second request."""
+        config = self.env['ir.config_parameter'].sudo()
+        return config.get_param('mqtt_integration.mqtt_api_hedge_requests', 'False') == 'True'
+
+    @api.model
+    def _get_capabilities(self, base_url):
+        """
+        Return the wire capabilities advertised by an endpoint.
+
+        Older API versions have no capabilities route; they are remembered
+        as legacy JSON-only endpoints until the cache expires.
+
+        Returns:
+            dict: ``formats``, ``encodings`` and ``features`` lists
+        """
+        cached = _CAPABILITIES.get(base_url)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        capabilities = {'formats': ['json'], 'encodings': [], 'features': []}
+        try:
+            response = requests.get(
+                f"{base_url}/api/capabilities", headers=self._get_auth_headers(), timeout=2
+            )
+            if response.status_code == 200:
+                data = response.json()
+                capabilities = {
+                    'formats': list(data.get('formats') or ['json']),
+                    'encodings': list(data.get('encodings') or []),
+                    'features': list(data.get('features') or []),
+                }
+        except (requests.exceptions.RequestException, ValueError) as e:
+            _logger.info(f"Could not negotiate wire format with {base_url}, using JSON: {e}")
+
+        _CAPABILITIES[base_url] = (time.monotonic() + _CAPABILITIES_TTL, capabilities)
+        return capabilities
+
+    @api.model
+    def _build_body(self, base_url, json, compact_json):
+        """
+        Choose the body sent to an endpoint.
+
+        Returns:
+            dict: keyword arguments for ``requests.request``
+        """
+        if compact_json is not None and self._get_wire_format() == 'auto':
+            capabilities = self._get_capabilities(base_url)
+            if COMPACT_FORMAT in capabilities['formats']:
+                body, headers = encode_body(compact_json, compress='gzip' in capabilities['encodings'])
+                headers[WIRE_FORMAT_HEADER] = COMPACT_FORMAT
+                return {'data': body, 'extra_headers': headers, 'compact': True}
+        return {'json': json, 'extra_headers': {}, 'compact': False}
+
+    # ===========================
+    # REQUEST METHODS
+    # ===========================
+
+    @api.model
+    def _rotate(self, base_urls):
+        """Rotate the candidates round-robin so load spreads across a group."""
+        if len(base_urls) < 2:
+            return list(base_urls)
+        with _ROUND_ROBIN_LOCK:
+            counter = _ROUND_ROBIN.setdefault(tuple(base_urls), itertools.count())
+            offset = next(counter) % len(base_urls)
+        return base_urls[offset:] + base_urls[:offset]
+
+    @api.model
+    def _request(self, method, path, json=None, timeout=None, workcenter=None, base_url=None, compact_json=None):
+        """
+        Send a request to the Node.js API through the circuit breaker.
+
+        Without an explicit ``base_url`` the call is routed to the endpoint
+        group of ``workcenter`` and balanced round-robin across it. Endpoints
+        with an open circuit are skipped, and the call fails over to the next
+        endpoint when the connection cannot be established or the endpoint
+        answers with a 5xx. Read timeouts are not retried elsewhere since the
+        request may already have been processed.
+
+        When ``compact_json`` is given and the endpoint negotiated the compact
+        format, it is sent instead of ``json``. An endpoint rejecting it with
+        415 is downgraded to JSON and the call is retried once.
+
+        Without an explicit ``timeout``, GET and DELETE calls time out after
+        the latency recently observed on the endpoint and are hedged when
+        enabled. Other calls keep a fixed timeout, since a call that timed
+        out may still have been processed.
+
+        Returns:
+            tuple: (base URL that answered, requests.Response) with
+            ``raise_for_status`` not applied
+        """
+        candidates = [base_url] if base_url else self._rotate(self._get_api_base_urls(workcenter))
+        circuit = self.env['mqtt_integration.api.circuit']
+        headers = self._get_auth_headers()
+
+        retry_in = None
+        last_error = None
+        for index, candidate in enumerate(candidates):
+            wait = circuit._allow_request(candidate)
+            if wait:
+                retry_in = wait if retry_in is None else min(retry_in, wait)
+                continue
+
+            is_last = index == len(candidates) - 1
+            try:
+                response = self._send(method, candidate, path, headers, timeout, json, compact_json)
+            except requests.exceptions.ConnectionError as e:
+                circuit._record_failure(candidate, e)
+                _logger.warning(f"MQTT API endpoint {candidate} unreachable for {method} {path}: {e}")
+                last_error = e
+                continue
+            except requests.exceptions.Timeout as e:
+                circuit._record_failure(candidate, e)
+                raise
+
+            if response.status_code >= 500:
+                circuit._record_failure(candidate, f"HTTP {response.status_code}")
+                if not is_last:
+                    _logger.warning(
+                        f"MQTT API endpoint {candidate} answered {response.status_code}, failing over"
+                    )
+                    continue
+            else:
+                circuit._record_success(candidate)
+            return candidate, response
+
+        if last_error:
+            raise last_error
+
+        _logger.warning(f"All MQTT API circuits are open, failing fast on {method} {path}")
+        raise UserError(
+            f'The MQTT API is currently unavailable. '
+            f'Please retry in about {int(retry_in or 1)} seconds.'
+        )
+
+    @api.model
+    def _send(self, method, base_url, path, headers, timeout, json, compact_json):
+        """Send one HTTP request in the negotiated format, downgrading to JSON on 415."""
+        call = self._prepare_call(method, base_url, path, headers, timeout, json, compact_json)
+        delay = (
+            method in IDEMPOTENT_METHODS and self._get_hedging_enabled() and latency.hedge_delay(base_url)
+        )
+        try:
+            if delay:
+                response, downgraded, hedged = dispatch_pool.send_hedged(
+                    call, delay, self._get_dispatch_concurrency()
+                )
+                if hedged:
+                    _logger.info(f"Hedged slow {method} {path} on {base_url} after {delay:.3f}s")
+            else:
+                response, downgraded = dispatch_pool.send(call)
+        except requests.exceptions.Timeout:
+            latency.record(base_url, call.timeout)
+            raise
+        self._record_outcome(base_url, response, downgraded)
+        return response
+
+    @api.model
+    def _prepare_call(self, method, base_url, path, headers, timeout, json, compact_json):
+        """Build a fully negotiated call that can be sent outside the Odoo environment."""
+        body = self._build_body(base_url, json, compact_json)
+        if not timeout:
+            timeout = latency.timeout(base_url) if method in IDEMPOTENT_METHODS else FIXED_TIMEOUT
+        return dispatch_pool.HttpCall(
+            method, f"{base_url}{path}", dict(headers, **body['extra_headers']),
+            body.get('json'), body.get('data'), timeout,
+            (json, headers) if body['compact'] else None,
+        )
+
+    @api.model
+    def _record_outcome(self, base_url, response, downgraded):
+        """Track the response time of an endpoint and remember when it refused the compact format."""
+        latency.record(base_url, response.elapsed.total_seconds())
+        if downgraded:
+            _logger.warning(f"MQTT API endpoint {base_url} rejected the compact format, falling back to JSON")
+            _CAPABILITIES[base_url] = (
+                time.monotonic() + _CAPABILITIES_TTL,
+                dict(self._get_capabilities(base_url), formats=['json'], encodings=[])
+            )
+
+    # ===========================
+    # BULK METHODS
+    # ===========================
+
+    @api.model
+    def _request_many(self, calls):
+        """
+        Send independent requests concurrently through a bounded thread pool.
+
+        Endpoint selection, circuit checks and body negotiation happen here
+        before the calls are sent; circuits are updated once all responses
+        are in. Routed calls that could not connect or got a 5xx are retried
+        one by one through ``_request`` so they fail over like single calls.
+        An endpoint whose circuit is half-open receives only the probe call
+        of the batch.
+
+        Args:
+            calls (list): dicts with ``method``, ``path`` and the keyword
+                arguments of ``_request``
+
+        Returns:
+            list: per call, in order, a (base URL, response) tuple or the
+            exception the call raised
+        """
+        concurrency = self._get_dispatch_concurrency()
+        if concurrency < 2 or len(calls) < 2:
+            return [self._request_safely(call) for call in calls]
+
+        circuit = self.env['mqtt_integration.api.circuit']
+        headers = self._get_auth_headers()
+        allowed = {}
+        probing = set()
+        results = [None] * len(calls)
+        prepared = []
+        for index, call in enumerate(calls):
+            try:
+                candidates = (
+                    [call['base_url']] if call.get('base_url')
+                    else self._rotate(self._get_api_base_urls(call.get('workcenter')))
+                )
+            except UserError as e:
+                results[index] = e
+                continue
+            for candidate in candidates:
+                if candidate not in allowed:
+                    wait, probe = circuit._check_request(candidate)
+                    allowed[candidate] = not wait
+                    if probe:
+                        probing.add(candidate)
+            base_url = next((candidate for candidate in candidates if allowed[candidate]), None)
+            if not base_url:
+                results[index] = UserError('The MQTT API is currently unavailable. Please retry later.')
+                continue
+            if base_url in probing:
+                # A half-open endpoint takes one probe call; the rest of the batch goes elsewhere or fails fast.
+                allowed[base_url] = False
+            prepared.append((index, base_url, self._prepare_call(
+                call['method'], base_url, call['path'], headers, call.get('timeout'),
+                call.get('json'), call.get('compact_json'),
+            )))
+
+        sent = dispatch_pool.send_all([http_call for _index, _base_url, http_call in prepared], concurrency)
+        succeeded, failed, retry = set(), [], []
+        for (index, base_url, http_call), (outcome, downgraded) in zip(prepared, sent):
+            if not isinstance(outcome, Exception):
+                self._record_outcome(base_url, outcome, downgraded)
+            if isinstance(outcome, requests.exceptions.Timeout):
+                latency.record(base_url, http_call.timeout)
+                failed.append((base_url, outcome))
+                results[index] = outcome
+            elif isinstance(outcome, requests.exceptions.RequestException):
+                failed.append((base_url, outcome))
+                results[index] = outcome
+                if not calls[index].get('base_url'):
+                    retry.append(index)
+            elif outcome.status_code >= 500:
+                failed.append((base_url, f"HTTP {outcome.status_code}"))
+                results[index] = (base_url, outcome)
+                if not calls[index].get('base_url'):
+                    retry.append(index)
+            else:
+                succeeded.add(base_url)
+                results[index] = (base_url, outcome)
+
+        for base_url in succeeded:
+            circuit._record_success(base_url)
+        for base_url, error in failed:
+            circuit._record_failure(base_url, error)
+        for index in retry:
+            results[index] = self._request_safely(calls[index])
+        return results
+
+    @api.model
+    def _request_safely(self, call):
+        """Send one call of ``_request_many`` through ``_request``, returning the exception instead of raising it."""
+        call = dict(call)
+        try:
+            return self._request(call.pop('method'), call.pop('path'), **call)
+        except (UserError, requests.exceptions.RequestException) as e:
+            return e
+
+    @api.model
+    def _delete_tasks(self, tasks):
+        """
+        Delete many tasks, in batch requests on endpoints that support them.
+
+        Tasks on other endpoints are deleted with concurrent single calls. A
+        failure never stops the remaining deletions; tasks unknown to the
+        API count as deleted.
+
+        Args:
+            tasks (list): (task id, base URL or None, work center) tuples
+
+        Returns:
+            dict: {task id: error message} for the tasks that could not be deleted
+        """
+        by_endpoint = defaultdict(list)
+        for task_id, base_url, workcenter in tasks:
+            by_endpoint[base_url].append((task_id, workcenter))
+
+        failures = {}
+        single = []
+        for base_url, entries in by_endpoint.items():
+            if base_url and BATCH_DELETE_FEATURE in self._get_capabilities(base_url)['features']:
+                task_ids = [task_id for task_id, _workcenter in entries]
+                for start in range(0, len(task_ids), BATCH_DELETE_SIZE):
+                    failures.update(self._batch_delete(base_url, task_ids[start:start + BATCH_DELETE_SIZE]))
+            else:
+                single.extend((task_id, base_url, workcenter) for task_id, workcenter in entries)
+
+        results = self._request_many([{
+            'method': 'DELETE',
+            'path': f'/api/tasks/{task_id}',
+            'workcenter': workcenter,
+            'base_url': base_url,
+        } for task_id, base_url, workcenter in single])
+        for (task_id, _base_url, _workcenter), result in zip(single, results):
+            error = self._get_delete_error(task_id, result)
+            if error:
+                failures[task_id] = error
+        return failures
+
+    @api.model
+    def _batch_delete(self, base_url, task_ids):
+        """
+        Delete tasks with one request to an endpoint supporting batch deletion.
+
+        Returns:
+            dict: {task id: error message} for the tasks the endpoint could not delete
+        """
+        try:
+            _base_url, response = self._request(
+                'POST', '/api/tasks/batch-delete', json={'ids': task_ids}, timeout=30, base_url=base_url
+            )
+            response.raise_for_status()
+            failed = response.json().get('failed') or {}
+        except (UserError, requests.exceptions.RequestException, ValueError) as e:
+            _logger.error(f"Batch deletion of {len(task_ids)} MQTT tasks on {base_url} failed: {e}")
+            return {task_id: str(e) for task_id in task_ids}
+        return {str(task_id): str(error) for task_id, error in failed.items()}
+
+    @api.model
+    def _get_delete_error(self, task_id, result):
+        """
+        Interpret the outcome of one task deletion.
+
+        Returns:
+            str: error message, or None when the task is deleted or unknown to the API
+        """
+        try:
+            if isinstance(result, Exception):
+                raise result
+            _base_url, response = result
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return None
+        except (UserError, requests.exceptions.RequestException) as e:
+            _logger.error(f"Failed to delete MQTT task {task_id}: {e}")
+            return str(e)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+
+class MqttApiEndpoint(models.Model):
+    _name = "mqtt_integration.api.endpoint"
+    _description = "MQTT API Endpoint"
+    _order = 'sequence, id'
+
+    # ===========================
+    # FIELDS
+    # ===========================
+
+    name = fields.Char(
+        string="Name",
+        required=True,
+        help="Human-readable name for this API instance"
+    )
+    sequence = fields.Integer(
+        string="Sequence",
+        default=10,
+        help="Order in which endpoints are listed"
+    )
+    active = fields.Boolean(
+        string="Active",
+        default=True,
+        help="Inactive endpoints never receive traffic"
+    )
+    host = fields.Char(
+        string="Host",
+        required=True,
+        default="localhost",
+        help="Hostname or IP address of the MQTT API instance"
+    )
+    port = fields.Integer(
+        string="Port",
+        required=True,
+        default=3000,
+        help="Port of the MQTT API instance"
+    )
+    base_url = fields.Char(
+        string="Base URL",
+        compute='_compute_base_url',
+        help="URL used to reach this API instance"
+    )
+    workcenter_ids = fields.Many2many(
+        comodel_name='mrp.workcenter',
+        string="Work Centers",
+        help="Work centers routed to this endpoint. Leave empty to serve work centers without a dedicated endpoint"
+    )
+
+    # ===========================
+    # COMPUTED FIELDS
+    # ===========================
+
+    @api.depends('host', 'port')
+    def _compute_base_url(self):
+        """Compute the base URL from host and port."""
+        for endpoint in self:
+            endpoint.base_url = f"http://{(endpoint.host or '').strip()}:{endpoint.port}"
+
+    # ===========================
+    # ROUTING METHODS
+    # ===========================
+
+    @api.model
+    def _get_routing_group(self, workcenter=None):
+        """
+        Return the base URLs that may serve a work center.
+
+        Endpoints bound to the work center come first; otherwise the unbound
+        endpoints form the default group. An empty list means no endpoint
+        records exist and the single host/port from the settings applies.
+
+        Returns:
+            list: base URLs in configured order
+
+        Raises:
+            UserError: when endpoints are configured but none serves the work center
+        """
+        endpoints = self.sudo().search([])
+        if workcenter:
+            bound = endpoints.filtered(lambda e: workcenter in e.workcenter_ids)
+            if bound:
+                return bound.mapped('base_url')
+        default = endpoints.filtered(lambda e: not e.workcenter_ids).mapped('base_url')
+        if endpoints and not default:
+            raise UserError(
+                f'No MQTT API endpoint serves work center {workcenter.display_name}. '
+                f'Bind an endpoint to it or add an endpoint without work centers.'
+                if workcenter else
+                'No default MQTT API endpoint is configured. Add an endpoint without work centers.'
+            )
+        return default
@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from datetime import timedelta
+
+from psycopg2.extras import execute_values
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# Cycle time assumed before any task of a robot has been observed.
+DEFAULT_CYCLE_SECONDS = 60.0
+# Weight of a new observation in the moving average.
+EWMA_ALPHA = 0.2
+# Robots changed this long before the last run are scheduled again, covering transactions still open then.
+DIRTY_MARGIN_SECONDS = 30
+
+
+class MqttCycleTime(models.Model):
+    _name = "mqtt_integration.cycle.time"
+    _description = "MQTT Learned Cycle Time"
+    _order = 'robot_id, binary_payload'
+    _rec_name = 'robot_id'
+    _log_access = False
+
+    # ===========================
+    # FIELDS
+    # ===========================
+
+    robot_id = fields.Many2one(
+        comodel_name='mqtt_integration.robot',
+        string="Robot",
+        required=True,
+        ondelete='cascade',
+        readonly=True
+    )
+    binary_payload = fields.Char(
+        string="Binary Payload",
+        required=True,
+        readonly=True
+    )
+    seconds = fields.Float(
+        string="Cycle Time (s)",
+        readonly=True,
+        help="Moving average of the time from start, or dispatch, to done"
+    )
+    sample_count = fields.Integer(
+        string="Observed Tasks",
+        readonly=True
+    )
+    updated_at = fields.Datetime(
+        string="Updated At",
+        readonly=True
+    )
+
+    _sql_constraints = [
+        ('robot_payload_unique', 'unique(robot_id, binary_payload)', 'One cycle time per robot and payload.'),
+    ]
+
+    # ===========================
+    # CONFIGURATION METHODS
+    # ===========================
+
+    @api.model
+    def _get_schedule_enabled(self):
+        """Return whether productions are assigned and ordered by deadline using learned cycle times."""
+        config = self.env['ir.config_parameter'].sudo()
+        return config.get_param('mqtt_integration.mqtt_schedule_deadlines', 'False') == 'True'
+
+    # ===========================
+    # LEARNING METHODS
+    # ===========================
+
+    @api.model
+    def _learn(self, limit=10000):
+        """
+        Fold task events recorded since the last run into the moving averages.
+
+        Events are consumed in id order from a watermark kept in its own
+        table, so each run only reads new events without writing a
+        configuration parameter, which would clear the caches of every worker.
+
+        Returns:
+            int: number of events read
+        """
+        watermark = self.env['mqtt_integration.cycle.time.watermark']
+        after = watermark._read()
+        cr = self.env.cr
+        cr.execute("""
+            SELECT max(id), count(*)
+              FROM (
+                    SELECT id
+                      FROM mqtt_integration_task_event
+                     WHERE id > %s
+                     ORDER BY id
+                     LIMIT %s
+                   ) AS batch
+        """, (after, limit))
+        upto, count = cr.fetchone()
+        if not count:
+            return 0
+
+        cr.execute(f"""
+            INSERT INTO {self._table} AS c (robot_id, binary_payload, seconds, sample_count, updated_at)
+            SELECT robot_id, binary_payload, avg(cycle), count(*), now() at time zone 'utc'
+              FROM (
+                    SELECT robot_id, binary_payload,
+                           EXTRACT(EPOCH FROM finished_at - COALESCE(started_at, dispatched_at)) AS cycle
+                      FROM mqtt_integration_task_event
+                     WHERE id > %(after)s
+                       AND id <= %(upto)s
+                       AND status = 'done'
+                       AND robot_id IS NOT NULL
+                       AND binary_payload IS NOT NULL
+                   ) AS observed
+             WHERE cycle > 0
+             GROUP BY robot_id, binary_payload
+            ON CONFLICT (robot_id, binary_payload) DO UPDATE
+               SET seconds = c.seconds * power(1 - %(alpha)s, EXCLUDED.sample_count)
+                           + EXCLUDED.seconds * (1 - power(1 - %(alpha)s, EXCLUDED.sample_count)),
+                   sample_count = c.sample_count + EXCLUDED.sample_count,
+                   updated_at = EXCLUDED.updated_at
+        """, {'after': after, 'upto': upto, 'alpha': EWMA_ALPHA})
+        watermark._write(upto)
+        self.invalidate_model()
+        return count
+
+    @api.model
+    def _load_estimates(self, robot_ids):
+        """
+        Return the cycle times known for the robots.
+
+        Returns:
+            dict: {(robot id, payload): seconds}, with per-robot averages under
+            ``(robot id, None)`` and the fleet average under ``(None, None)``
+        """
+        cr = self.env.cr
+        cr.execute(f"""
+            SELECT robot_id, binary_payload, seconds, sample_count
+              FROM {self._table}
+             WHERE robot_id = ANY(%s)
+        """, (list(robot_ids),))
+        estimates = {}
+        totals = {}
+        for robot_id, payload, seconds, samples in cr.fetchall():
+            estimates[(robot_id, payload)] = seconds
+            total, weight = totals.get(robot_id, (0.0, 0))
+            totals[robot_id] = (total + seconds * samples, weight + samples)
+        for robot_id, (total, weight) in totals.items():
+            if weight:
+                estimates[(robot_id, None)] = total / weight
+
+        cr.execute(f"SELECT sum(seconds * sample_count) / NULLIF(sum(sample_count), 0) FROM {self._table}")
+        estimates[(None, None)] = cr.fetchone()[0] or DEFAULT_CYCLE_SECONDS
+        return estimates
+
+    @api.model
+    def _estimate(self, robot, binary_payload):
+        """Return the expected cycle time of a payload on one robot."""
+        return self._lookup(self._load_estimates(robot.ids), robot.id, binary_payload)
+
+    @api.model
+    def _lookup(self, estimates, robot_id, binary_payload):
+        """Return the expected cycle time of a payload on a robot, falling back to robot and fleet averages."""
+        return (
+            estimates.get((robot_id, binary_payload))
+            or estimates.get((robot_id, None))
+            or estimates[(None, None)]
+        )
+
+    # ===========================
+    # SCHEDULING METHODS
+    # ===========================
+
+    @api.model
+    def _pick_robot(self, robots, binary_payload, planned=None):
+        """
+        Return the robot expected to finish a new task soonest.
+
+        A robot is free at the end of its backlog as predicted by the last
+        scheduling run, plus the cycle times of productions assigned to it
+        since then and of ``planned`` work not written yet. Only productions
+        changed since that run are read, so the cost does not grow with the
+        backlog.
+
+        Args:
+            planned (dict): {robot id: seconds} already assigned in the current start
+
+        Returns:
+            tuple: (robot, expected cycle time in seconds)
+        """
+        planned = planned or {}
+        estimates = self._load_estimates(robots.ids)
+        self.env['mrp.production'].flush_model(['state', 'selected_robot_id', 'mqtt_predicted_finish'])
+        self.env.cr.execute("""
+            SELECT p.selected_robot_id, array_agg(p.mqtt_binary_payload)
+              FROM mrp_production p
+              JOIN mqtt_integration_robot r ON r.id = p.selected_robot_id
+             WHERE p.selected_robot_id = ANY(%s)
+               AND p.write_date > COALESCE(r.scheduled_at, '-infinity')
+               AND p.state = 'mqtt_processing'
+               AND p.mqtt_predicted_finish IS NULL
+             GROUP BY p.selected_robot_id
+        """, (robots.ids,))
+        unplanned = dict(self.env.cr.fetchall())
+
+        now = fields.Datetime.now()
+        best = None
+        for robot in robots.sorted('id'):
+            cycle = self._lookup(estimates, robot.id, binary_payload)
+            wait = sum(self._lookup(estimates, robot.id, payload) for payload in unplanned.get(robot.id, []))
+            free_at = max(robot.predicted_free_at or now, now)
+            finish = free_at + timedelta(seconds=wait + planned.get(robot.id, 0.0) + cycle)
+            if best is None or finish < best[0]:
+                best = (finish, robot, cycle)
+        return best[1], best[2]
+
+    @api.model
+    def _get_dirty_robots(self):
+        """Return the robots whose backlog changed since their predictions were last computed."""
+        self.env.cr.execute("""
+            SELECT r.id
+              FROM mqtt_integration_robot r
+             WHERE r.active
+               AND (EXISTS (
+                        SELECT 1
+                          FROM mrp_production p
+                         WHERE p.selected_robot_id = r.id
+                           AND p.write_date > COALESCE(r.scheduled_at, '-infinity')
+                    )
+                 OR EXISTS (
+                        SELECT 1
+                          FROM mqtt_integration_task_event e
+                         WHERE e.robot_id = r.id
+                           AND e.finished_at > COALESCE(r.scheduled_at, '-infinity')
+                    ))
+        """)
+        return self.env['mqtt_integration.robot'].browse([row[0] for row in self.env.cr.fetchall()])
+
+    @api.model
+    def _predict(self, robot, estimates, now):
+        """
+        Predict when every production of the robot's backlog completes.
+
+        Tasks already in the API run in dispatch order, the one at the head
+        having already used part of its cycle; waiting productions follow in
+        the order the pipeline will send them. Unit tasks of split
+        productions take robot time but get no prediction of their own.
+
+        Returns:
+            tuple: (list of (production id, predicted completion) pairs,
+            when the robot finishes its backlog)
+        """
+        cr = self.env.cr
+        cr.execute("""
+            SELECT p.id, p.mqtt_binary_payload, p.mqtt_dispatched_at, p.mqtt_queued_at, p.date_deadline
+              FROM mrp_production p
+             WHERE p.state = 'mqtt_processing'
+               AND p.selected_robot_id = %s
+               AND NOT EXISTS (
+                   SELECT 1 FROM mqtt_integration_production_unit u WHERE u.production_id = p.id
+               )
+            UNION ALL
+            SELECT NULL, p.mqtt_binary_payload, u.dispatched_at, NULL, NULL
+              FROM mqtt_integration_production_unit u
+              JOIN mrp_production p ON p.id = u.production_id
+             WHERE u.state IN ('processing', 'waiting')
+               AND u.robot_id = %s
+        """, (robot.id, robot.id))
+        rows = cr.fetchall()
+        in_api = sorted(
+            (row for row in rows if not row[3]),
+            key=lambda row: (row[2] is None, row[2] or now, row[0] or 0),
+        )
+        waiting = sorted((row for row in rows if row[3]), key=self._queue_order_key)
+
+        clock = now
+        predictions = []
+        for index, (production_id, payload, dispatched_at, _queued_at, _deadline) in enumerate(in_api + waiting):
+            cycle = self._lookup(estimates, robot.id, payload)
+            if index == 0 and dispatched_at:
+                cycle = max(cycle - (now - dispatched_at).total_seconds(), 0.0)
+            clock += timedelta(seconds=cycle)
+            if production_id:
+                predictions.append((production_id, clock))
+        return predictions, clock
+
+    @api.model
+    def _queue_order_key(self, row):
+        """Sort key of a waiting production: earliest deadline first, then start order."""
+        _production_id, _payload, _dispatched_at, queued_at, deadline = row
+        return (deadline is None, deadline or queued_at, queued_at, row[0])
+
+    @api.model
+    def _cron_schedule(self):
+        """
+        Learn cycle times from new task events and refresh predicted completions.
+
+        Only robots whose backlog changed since their last run are
+        rescheduled, so the cost follows the activity rather than the size
+        of the backlog. Predictions are written with SQL so they do not
+        count as changes themselves.
+        """
+        self._learn()
+        if not self._get_schedule_enabled():
+            return
+
+        started = fields.Datetime.now()
+        robots = self._get_dirty_robots()
+        if not robots:
+            return
+
+        estimates = self._load_estimates(robots.ids)
+        predictions = []
+        free_at = []
+        for robot in robots:
+            robot_predictions, robot_free_at = self._predict(robot, estimates, started)
+            predictions.extend(robot_predictions)
+            free_at.append((robot.id, robot_free_at))
+        if predictions:
+            execute_values(self.env.cr._obj, """
+                UPDATE mrp_production AS p
+                   SET mqtt_predicted_finish = v.finish
+                  FROM (VALUES %s) AS v(id, finish)
+                 WHERE p.id = v.id
+            """, predictions, template='(%s, %s::timestamp)', page_size=1000)
+            self.env['mrp.production'].invalidate_model(['mqtt_predicted_finish'])
+
+        execute_values(self.env.cr._obj, """
+            UPDATE mqtt_integration_robot AS r
+               SET scheduled_at = v.scheduled_at,
+                   predicted_free_at = v.free_at
+              FROM (VALUES %s) AS v(id, scheduled_at, free_at)
+             WHERE r.id = v.id
+        """, [
+            (robot_id, started - timedelta(seconds=DIRTY_MARGIN_SECONDS), robot_free_at)
+            for robot_id, robot_free_at in free_at
+        ], template='(%s, %s::timestamp, %s::timestamp)', page_size=1000)
+        self.env['mqtt_integration.robot'].invalidate_model(['scheduled_at', 'predicted_free_at'])
+        _logger.info(f"Rescheduled {len(robots)} robots, {len(predictions)} predicted completions")
+
+
+class MqttCycleTimeWatermark(models.Model):
+    _name = "mqtt_integration.cycle.time.watermark"
+    _description = "MQTT Cycle Time Learning Watermark"
+    _log_access = False
+
+    # ===========================
+    # FIELDS
+    # ===========================
+
+    last_event_id = fields.Integer(
+        string="Last Task Event",
+        readonly=True,
+        help="Id of the last task event folded into the learned cycle times"
+    )
+
+    def init(self):
+        """Create the single watermark row, resuming from the former configuration parameter."""
+        self.env.cr.execute(f"""
+            INSERT INTO {self._table} (last_event_id)
+            SELECT COALESCE((
+                       SELECT value::int
+                         FROM ir_config_parameter
+                        WHERE key = 'mqtt_integration.mqtt_cycle_time_last_event'
+                   ), 0)
+             WHERE NOT EXISTS (SELECT 1 FROM {self._table})
+        """)
+
+    # ===========================
+    # METHODS
+    # ===========================
+
+    @api.model
+    def _read(self):
+        """Lock the watermark until the end of the transaction and return the last learned event id."""
+        self.env.cr.execute(f"SELECT last_event_id FROM {self._table} ORDER BY id LIMIT 1 FOR UPDATE")
+        row = self.env.cr.fetchone()
+        return (row[0] or 0) if row else 0
+
+    @api.model
+    def _write(self, last_event_id):
+        """Move the watermark past the events just learned."""
+        self.env.cr.execute(f"UPDATE {self._table} SET last_event_id = %s", (last_event_id,))
+        self.invalidate_model()
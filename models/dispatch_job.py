@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools.sql import create_index
+
+_logger = logging.getLogger(__name__)
+
+# Delay before a job whose dispatch failed fast (e.g. open circuit) is retried.
+DISPATCH_RETRY_SECONDS = 30
+
+
+class MqttDispatchJob(models.Model):
+    _name = "mqtt_integration.dispatch.job"
+    _description = "MQTT Coalesced Dispatch Job"
+    _order = 'id desc'
+
+    # ===========================
+    # FIELDS
+    # ===========================
+
+    mqtt_topic = fields.Char(
+        string="MQTT Topic",
+        required=True,
+        readonly=True
+    )
+    binary_payload = fields.Char(
+        string="Binary Payload",
+        required=True,
+        readonly=True
+    )
+    robot_id = fields.Many2one(
+        comodel_name='mqtt_integration.robot',
+        string="Robot",
+        readonly=True,
+        ondelete='set null'
+    )
+    state = fields.Selection(
+        selection=[
+            ('open', 'Collecting'),
+            ('queued', 'Waiting for Robot'),
+            ('dispatched', 'Dispatched'),
+            ('done', 'Done'),
+            ('failed', 'Failed'),
+            ('cancel', 'Cancelled'),
+        ],
+        string="State",
+        required=True,
+        readonly=True,
+        default='open'
+    )
+    window_until = fields.Datetime(
+        string="Dispatch At",
+        required=True,
+        readonly=True,
+        help="End of the coalescing window; the job is sent to the robot after this time"
+    )
+    production_ids = fields.One2many(
+        comodel_name='mrp.production',
+        inverse_name='mqtt_job_id',
+        string="Productions",
+        readonly=True
+    )
+    unit_count = fields.Integer(
+        string="Units",
+        readonly=True,
+        help="Productions processed by the robot as one task"
+    )
+    task_id = fields.Char(
+        string="MQTT Task ID",
+        readonly=True
+    )
+    api_base_url = fields.Char(
+        string="MQTT API Endpoint",
+        readonly=True
+    )
+    dispatched_at = fields.Datetime(
+        string="Dispatched At",
+        readonly=True
+    )
+    error = fields.Text(
+        string="Error",
+        readonly=True
+    )
+
+    def init(self):
+        """Index the open jobs looked up when a production joins a coalescing window."""
+        create_index(
+            self.env.cr,
+            'mqtt_integration_dispatch_job_open_idx',
+            self._table,
+            ['mqtt_topic', 'binary_payload'],
+            where="state = 'open'",
+        )
+
+    # ===========================
+    # CONFIGURATION METHODS
+    # ===========================
+
+    @api.model
+    def _get_coalesce_settings(self):
+        """Return (window in seconds, maximum productions per job) from configuration; a 0 window disables coalescing."""
+        config = self.env['ir.config_parameter'].sudo()
+        window = int(config.get_param('mqtt_integration.mqtt_coalesce_window', 0) or 0)
+        max_units = int(config.get_param('mqtt_integration.mqtt_coalesce_max_units', 10) or 10)
+        return max(window, 0), max(max_units, 1)
+
+    # ===========================
+    # COALESCING METHODS
+    # ===========================
+
+    @api.model
+    def _join(self, production, mqtt_topic, binary_payload):
+        """
+        Add the production to the open job of its topic and payload, opening one if needed.
+
+        Open jobs locked by another transaction are skipped rather than
+        waited for, at the cost of an extra job.
+
+        Returns:
+            record: the job, or an empty recordset when coalescing is disabled
+        """
+        window, max_units = self._get_coalesce_settings()
+        if not window:
+            return self.browse()
+
+        self.env.cr.execute(f"""
+            SELECT id
+              FROM {self._table}
+             WHERE state = 'open'
+               AND mqtt_topic = %s
+               AND binary_payload = %s
+               AND unit_count < %s
+               AND window_until > now() at time zone 'utc'
+             ORDER BY id
+             LIMIT 1
+               FOR UPDATE SKIP LOCKED
+        """, (mqtt_topic, binary_payload, max_units))
+        row = self.env.cr.fetchone()
+        if row:
+            job = self.sudo().browse(row[0])
+            job.unit_count += 1
+        else:
+            job = self.sudo().create({
+                'mqtt_topic': mqtt_topic,
+                'binary_payload': binary_payload,
+                'robot_id': production.selected_robot_id.id,
+                'window_until': fields.Datetime.now() + timedelta(seconds=window),
+                'unit_count': 1,
+            })
+            self.env.ref('mqtt_integration.ir_cron_mqtt_dispatch_jobs')._trigger(at=job.window_until)
+        production.mqtt_job_id = job
+        return job
+
+    def _detach(self, production):
+        """Remove a production from a job that has not been dispatched yet, open or waiting for its robot."""
+        self.ensure_one()
+        production.mqtt_job_id = False
+        self.unit_count = max(self.unit_count - 1, 0)
+        if not self.unit_count:
+            self.state = 'cancel'
+
+    # ===========================
+    # DISPATCH METHODS
+    # ===========================
+
+    @api.model
+    def _cron_dispatch_jobs(self, limit=100):
+        """Send every job whose coalescing window has closed as one task, committing job by job."""
+        cr = self.env.cr
+        cr.execute(f"""
+            SELECT id
+              FROM {self._table}
+             WHERE state = 'open'
+               AND window_until <= now() at time zone 'utc'
+             ORDER BY window_until
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, (limit,))
+        for job in self.browse([row[0] for row in cr.fetchall()]):
+            job._dispatch()
+            cr.commit()
+
+        cr.execute(f"SELECT min(window_until) FROM {self._table} WHERE state = 'open'")
+        next_window = cr.fetchone()[0]
+        if next_window:
+            self.env.ref('mqtt_integration.ir_cron_mqtt_dispatch_jobs')._trigger(at=next_window)
+
+    def _dispatch(self):
+        """
+        Create one multi-unit task for the members of the job.
+
+        A job whose window closed while its robot's pipeline is full waits
+        like a single production: its members are queued and the pipeline
+        cron sends the job once the robot has a free slot.
+
+        Returns:
+            bool: False when the API is unavailable and a waiting job keeps waiting
+        """
+        self.ensure_one()
+        if self.state not in ('open', 'queued'):
+            return True
+        members = self.production_ids.filtered(lambda p: p.state == 'mqtt_processing' and not p.mqtt_task_id)
+        if not members:
+            self.write({'state': 'cancel', 'unit_count': 0})
+            return True
+
+        lead = members.sorted('id')[0]
+        if self.state == 'open' and lead._queue_for_pipeline(self.binary_payload):
+            (members - lead).write({'mqtt_queued_at': lead.mqtt_queued_at})
+            self.state = 'queued'
+            return True
+
+        try:
+            task_data = lead._create_api_task(self.mqtt_topic, self.binary_payload, quantity=len(members))
+        except UserError as e:
+            if self.state == 'queued':
+                self.error = str(e)
+                return False
+            retry_at = fields.Datetime.now() + timedelta(seconds=DISPATCH_RETRY_SECONDS)
+            self.write({'window_until': retry_at, 'error': str(e)})
+            return True
+        if not task_data:
+            self._fail(members, 'Failed to create MQTT task.')
+            return True
+
+        now = fields.Datetime.now()
+        members.write({
+            'mqtt_task_id': task_data.get('id'),
+            'mqtt_api_base_url': task_data.get('base_url'),
+            'mqtt_dispatched_at': now,
+            'mqtt_queued_at': False,
+        })
+        self.write({
+            'state': 'dispatched',
+            'task_id': task_data.get('id'),
+            'api_base_url': task_data.get('base_url'),
+            'dispatched_at': now,
+            'unit_count': len(members),
+            'error': False,
+        })
+        _logger.info(f"Dispatched coalesced MQTT job {self.id} with {len(members)} productions as task {self.task_id}")
+        return True
+
+    def _fail(self, members, error):
+        """Return the members of a job that could not be dispatched to draft, recording their failure."""
+        for production in members:
+            production.workorder_ids.write({'state': 'pending'})
+            self.env['mqtt_integration.task.event']._record(production, 'failed')
+        self.env['mqtt_integration.material.ledger']._release(members)
+        members.write({
+            'state': 'draft',
+            'mqtt_binary_payload': False,
+            'mqtt_job_id': False,
+            'mqtt_queued_at': False,
+        })
+        self.write({'state': 'failed', 'error': error})
+        _logger.error(f"Coalesced MQTT job {self.id} failed: {error}")
+
+    # ===========================
+    # COMPLETION METHODS
+    # ===========================
+
+    def _handle_status(self, status, task_id):
+        """
+        Fan the outcome of the job's task out to all member productions in the current transaction.
+
+        Members are locked in id order before they are updated.
+
+        Returns:
+            bool: True when the status was applied or is a duplicate
+        """
+        self.ensure_one()
+        if self.state != 'dispatched':
+            return True
+
+        members = self.production_ids.filtered(lambda p: p.state == 'mqtt_processing')
+        if members:
+            self.env.cr.execute(
+                "SELECT id FROM mrp_production WHERE id = ANY(%s) ORDER BY id FOR UPDATE",
+                (members.ids,)
+            )
+        if status == 'done':
+            members._handle_task_completion()
+        else:
+            members._handle_task_failure(f'Coalesced task {task_id} failed during robot execution')
+        self.state = 'done' if status == 'done' else 'failed'
+        return True
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError, ValidationError
+
+from .material_ledger import MaterialLedgerBusy
+
+_logger = logging.getLogger(__name__)
+
+ELIGIBLE_STATES = ('draft', 'confirmed', 'progress')
+
+
+class MqttMassStart(models.Model):
+    _name = "mqtt_integration.mass.start"
+    _description = "MQTT Mass Start Job"
+    _order = 'id desc'
+
+    # ===========================
+    # FIELDS
+    # ===========================
+
+    product_tmpl_id = fields.Many2one(
+        comodel_name='product.template',
+        string="Product",
+        required=True,
+        readonly=True,
+        ondelete='cascade',
+        help="Product whose productions are started"
+    )
+    user_id = fields.Many2one(
+        comodel_name='res.users',
+        string="Requested By",
+        required=True,
+        readonly=True,
+        default=lambda self: self.env.user,
+        help="User that requested the job; productions are started with their rights"
+    )
+    state = fields.Selection(
+        selection=[
+            ('pending', 'Pending'),
+            ('running', 'Running'),
+            ('done', 'Done'),
+        ],
+        string="State",
+        required=True,
+        readonly=True,
+        default='pending'
+    )
+    total_count = fields.Integer(
+        string="Productions",
+        readonly=True,
+        help="Number of eligible productions when the job was created"
+    )
+    processed_count = fields.Integer(
+        string="Processed",
+        readonly=True
+    )
+    started_count = fields.Integer(
+        string="Started",
+        readonly=True
+    )
+    error_count = fields.Integer(
+        string="Errors",
+        readonly=True
+    )
+    progress = fields.Float(
+        string="Progress",
+        compute='_compute_progress'
+    )
+    last_production_id = fields.Integer(
+        string="Last Processed Production",
+        readonly=True,
+        help="Cursor of the job: productions are processed in increasing id order"
+    )
+    error_log = fields.Text(
+        string="Errors Log",
+        readonly=True,
+        help="One line per production that could not be started"
+    )
+
+    # ===========================
+    # COMPUTED FIELDS
+    # ===========================
+
+    @api.depends('processed_count', 'total_count')
+    def _compute_progress(self):
+        """Compute the share of processed productions."""
+        for job in self:
+            job.progress = min(100.0, 100.0 * job.processed_count / job.total_count) if job.total_count else 100.0
+
+    # ===========================
+    # JOB METHODS
+    # ===========================
+
+    @api.model
+    def _get_eligible_domain(self, product_tmpl):
+        """Domain of productions that can still be started for a product template."""
+        return [
+            ('product_id', 'in', product_tmpl.product_variant_ids.ids),
+            ('state', 'in', ELIGIBLE_STATES),
+            ('mqtt_task_id', '=', False),
+        ]
+
+    @api.model
+    def _create_for_template(self, product_tmpl):
+        """Create a job for the template and wake up the worker cron."""
+        total = self.env['mrp.production'].search_count(self._get_eligible_domain(product_tmpl))
+        if not total:
+            raise UserError('No production of this product is waiting to be started.')
+
+        job = self.create({'product_tmpl_id': product_tmpl.id, 'total_count': total})
+        self.env.ref('mqtt_integration.ir_cron_mqtt_mass_start')._trigger()
+        return job
+
+    def _next_chunk(self, chunk_size):
+        """Return the next eligible productions after the job cursor."""
+        self.ensure_one()
+        return self.env['mrp.production'].with_user(self.user_id).search(
+            self._get_eligible_domain(self.product_tmpl_id) + [('id', '>', self.last_production_id)],
+            order='id',
+            limit=chunk_size,
+        )
+
+    def _process_chunk(self, productions):
+        """
+        Start a chunk of productions, each in its own savepoint.
+
+        Errors are collected per production instead of aborting the chunk.
+        Productions whose materials are being reserved by another worker are
+        skipped at first and retried, waiting for the lock, once the rest of
+        the chunk is done.
+        """
+        self.ensure_one()
+        started = 0
+        errors = []
+        deferred = self.env['mrp.production']
+        for production in productions:
+            outcome = self._start_production(production.with_context(mqtt_skip_locked_materials=True))
+            if outcome is MaterialLedgerBusy:
+                deferred |= production
+            elif outcome:
+                errors.append(outcome)
+            else:
+                started += 1
+
+        for production in deferred:
+            outcome = self._start_production(production)
+            if outcome:
+                errors.append(outcome)
+            else:
+                started += 1
+
+        self.write({
+            'state': 'running',
+            'processed_count': self.processed_count + len(productions),
+            'started_count': self.started_count + started,
+            'error_count': self.error_count + len(errors),
+            'last_production_id': productions[-1].id,
+            'error_log': '\n'.join(filter(None, [self.error_log] + errors)),
+        })
+
+    def _start_production(self, production):
+        """
+        Start one production in a savepoint.
+
+        Returns:
+            None on success, MaterialLedgerBusy if its materials are locked,
+            otherwise the error line to log
+        """
+        try:
+            with self.env.cr.savepoint():
+                production.action_start_mqtt_processing()
+            return None
+        except MaterialLedgerBusy:
+            return MaterialLedgerBusy
+        except (UserError, ValidationError) as e:
+            return f"{production.name}: {e.args[0] if e.args else e}"
+        except Exception as e:
+            _logger.error(f"Unexpected error starting production {production.id} in mass start job {self.id}: {e}")
+            return f"{production.name}: {e}"
+
+    def _notify_progress(self):
+        """Send the job progress to the requesting user."""
+        self.ensure_one()
+        done = self.state == 'done'
+        message = (
+            f'{self.processed_count}/{self.total_count} productions processed, '
+            f'{self.started_count} started, {self.error_count} errors.'
+        )
+        self.env['bus.bus']._sendone(self.user_id.partner_id, 'simple_notification', {
+            'title': f'MQTT mass start {"finished" if done else "in progress"}: {self.product_tmpl_id.display_name}',
+            'message': message,
+            'type': ('warning' if self.error_count else 'success') if done else 'info',
+            'sticky': done and bool(self.error_count),
+        })
+
+    # ===========================
+    # CRON METHODS
+    # ===========================
+
+    @api.model
+    def _cron_process_mass_start(self, chunk_size=50, time_budget=120):
+        """
+        Process pending mass start jobs chunk by chunk.
+
+        Each chunk is committed on its own so progress survives failures and
+        is visible to the user. When the time budget is exhausted the cron
+        re-triggers itself to continue with the remaining productions.
+        """
+        deadline = time.monotonic() + time_budget
+        for job in self.search([('state', 'in', ('pending', 'running'))], order='id'):
+            while True:
+                if time.monotonic() > deadline:
+                    self.env.ref('mqtt_integration.ir_cron_mqtt_mass_start')._trigger()
+                    return
+
+                productions = job._next_chunk(chunk_size)
+                if not productions:
+                    job.write({'state': 'done'})
+                    job._notify_progress()
+                    self.env.cr.commit()
+                    break
+
+                job._process_chunk(productions)
+                job._notify_progress()
+                self.env.cr.commit()
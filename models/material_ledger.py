@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+
+class MaterialLedgerBusy(Exception):
+    """Raised in skip-locked mode when another worker holds a material of the production."""
+
+
+class MqttMaterialLedger(models.Model):
+    _name = "mqtt_integration.material.ledger"
+    _description = "MQTT Material Reservation Ledger"
+    _rec_name = 'product_id'
+
+    # ===========================
+    # FIELDS
+    # ===========================
+
+    product_id = fields.Many2one(
+        comodel_name='product.product',
+        string="Material",
+        required=True,
+        ondelete='cascade',
+        help="Material whose reservations are serialized by this ledger row"
+    )
+    reservation_ids = fields.One2many(
+        comodel_name='mqtt_integration.material.reservation',
+        inverse_name='ledger_id',
+        string="Reservations",
+        help="Material reserved by productions being processed"
+    )
+    reserved_qty = fields.Float(
+        string="Reserved Quantity",
+        compute='_compute_reserved_qty',
+        help="Quantity reserved by productions in MQTT processing"
+    )
+
+    _sql_constraints = [
+        ('product_unique', 'unique(product_id)', 'A ledger already exists for this material.'),
+    ]
+
+    # ===========================
+    # COMPUTED FIELDS
+    # ===========================
+
+    @api.depends('reservation_ids.quantity')
+    def _compute_reserved_qty(self):
+        """Sum the open reservations of the material."""
+        for ledger in self:
+            ledger.reserved_qty = sum(ledger.reservation_ids.mapped('quantity'))
+
+    # ===========================
+    # RESERVATION METHODS
+    # ===========================
+
+    @api.model
+    def _read_reserved(self, product_ids, exclude_production_ids=()):
+        """
+        Return the quantities reserved on the given materials, without locking them.
+
+        Returns:
+            dict: {product_id: quantity reserved by productions other than the excluded ones}
+        """
+        if not product_ids:
+            return {}
+        self.env.cr.execute("""
+            SELECT l.product_id, COALESCE(SUM(r.quantity), 0)
+              FROM mqtt_integration_material_ledger l
+              LEFT JOIN mqtt_integration_material_reservation r
+                     ON r.ledger_id = l.id AND r.production_id <> ALL(%s)
+             WHERE l.product_id = ANY(%s)
+             GROUP BY l.product_id
+        """, (list(exclude_production_ids), list(product_ids)))
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _lock_materials(self, product_ids, skip_locked=False, exclude_production_ids=()):
+        """
+        Lock the ledger rows of the given materials and return their reserved quantities.
+
+        Rows are created on first use and locked in product order so that
+        concurrent starts sharing materials cannot deadlock. Only the rows of
+        the materials involved are locked; starts on other materials run in
+        parallel. With ``skip_locked`` a busy material raises
+        MaterialLedgerBusy instead of waiting for the other worker.
+
+        Returns:
+            tuple: ({product_id: quantity reserved by other productions},
+            {product_id: ledger id})
+        """
+        product_ids = sorted(set(product_ids))
+        if not product_ids:
+            return {}, {}
+
+        cr = self.env.cr
+        cr.execute("""
+            INSERT INTO mqtt_integration_material_ledger (product_id)
+            SELECT unnest(%s::int[])
+            ON CONFLICT (product_id) DO NOTHING
+        """, (product_ids,))
+        cr.execute(f"""
+            SELECT id, product_id
+              FROM mqtt_integration_material_ledger
+             WHERE product_id = ANY(%s)
+             ORDER BY product_id
+               FOR UPDATE {'SKIP LOCKED' if skip_locked else ''}
+        """, (product_ids,))
+        ledger_by_product = dict((product_id, ledger_id) for ledger_id, product_id in cr.fetchall())
+
+        if len(ledger_by_product) < len(product_ids):
+            raise MaterialLedgerBusy(set(product_ids) - set(ledger_by_product))
+
+        return self._read_reserved(product_ids, exclude_production_ids), ledger_by_product
+
+    @api.model
+    def _reserve(self, requirements, skip_locked=False):
+        """
+        Atomically check availability and reserve materials for several productions.
+
+        The materials of the whole batch are locked once, in product order,
+        and availability is the on-hand stock minus what other productions
+        already reserved, evaluated while holding the material rows. Each
+        production also sees what the productions before it in the batch
+        reserve.
+
+        Args:
+            requirements (dict): {production: {product: quantity}}
+        """
+        productions = list(requirements)
+        reserved, ledger_by_product = self._lock_materials(
+            [product.id for needs in requirements.values() for product in needs],
+            skip_locked=skip_locked,
+            exclude_production_ids=[production.id for production in productions],
+        )
+        for production in productions:
+            production._check_material_stock_availability(reserved=reserved)
+            for product, quantity in requirements[production].items():
+                reserved[product.id] = reserved.get(product.id, 0.0) + quantity
+
+        # Restarting a production replaces its previous reservations.
+        self.env.cr.execute(
+            "DELETE FROM mqtt_integration_material_reservation WHERE production_id = ANY(%s)",
+            ([production.id for production in productions],)
+        )
+        self.env['mqtt_integration.material.reservation'].sudo().create([{
+            'ledger_id': ledger_by_product[product.id],
+            'production_id': production.id,
+            'quantity': quantity,
+        } for production in productions for product, quantity in requirements[production].items()])
+
+    @api.model
+    def _release(self, productions):
+        """Release the reservations of the given productions."""
+        if not productions:
+            return
+        cr = self.env.cr
+        cr.execute("""
+            SELECT DISTINCT l.product_id
+              FROM mqtt_integration_material_reservation r
+              JOIN mqtt_integration_material_ledger l ON l.id = r.ledger_id
+             WHERE r.production_id = ANY(%s)
+        """, (productions.ids,))
+        product_ids = [row[0] for row in cr.fetchall()]
+        if not product_ids:
+            return
+
+        self._lock_materials(product_ids)
+        cr.execute(
+            "DELETE FROM mqtt_integration_material_reservation WHERE production_id = ANY(%s)",
+            (productions.ids,)
+        )
+        self.env['mqtt_integration.material.reservation'].invalidate_model()
+
+
+class MqttMaterialReservation(models.Model):
+    _name = "mqtt_integration.material.reservation"
+    _description = "MQTT Material Reservation"
+    _log_access = False
+
+    # ===========================
+    # FIELDS
+    # ===========================
+
+    ledger_id = fields.Many2one(
+        comodel_name='mqtt_integration.material.ledger',
+        string="Ledger",
+        required=True,
+        index=True,
+        ondelete='cascade'
+    )
+    production_id = fields.Many2one(
+        comodel_name='mrp.production',
+        string="Production",
+        required=True,
+        index=True,
+        ondelete='cascade'
+    )
+    quantity = fields.Float(
+        string="Quantity",
+        required=True
+    )
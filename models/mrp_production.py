@@ -1,12 +1,16 @@
 # -*- coding: utf-8 -*-
 
-import logging
+from collections import defaultdict
+
 import requests
 
 from odoo import models, fields, api
 from odoo.exceptions import UserError, ValidationError
+from odoo.tools.sql import create_index
 
-_logger = logging.getLogger(__name__)
+from ..tools import profiler
+from ..tools.event_logger import events
+from ..tools.wire_format import pack_payload
 
 
 class MrpProduction(models.Model):
@@ -26,6 +30,16 @@ class MrpProduction(models.Model):
         readonly=True,
         help="Binary payload used for MQTT communication"
     )
+    mqtt_api_base_url = fields.Char(
+        string="MQTT API Endpoint",
+        readonly=True,
+        help="API instance that holds the MQTT task of this production"
+    )
+    mqtt_dispatched_at = fields.Datetime(
+        string="MQTT Dispatched At",
+        readonly=True,
+        help="When the current MQTT task was sent to the API"
+    )
     selected_robot_id = fields.Many2one(
         comodel_name="mqtt_integration.robot",
         string="Selected Robot",
@@ -46,24 +60,101 @@ class MrpProduction(models.Model):
         help="Indicates if the product is configured for MQTT processing"
     )
 
+    mqtt_job_id = fields.Many2one(
+        comodel_name="mqtt_integration.dispatch.job",
+        string="Coalesced Job",
+        readonly=True,
+        index=True,
+        ondelete='set null',
+        help="Job sending this production together with others of the same topic and payload"
+    )
+    mqtt_queued_at = fields.Datetime(
+        string="Waiting For Robot Since",
+        readonly=True,
+        help="Set while the production waits in Odoo for a free slot in the task pipeline of its robot"
+    )
+    mqtt_predicted_finish = fields.Datetime(
+        string="Predicted Completion",
+        readonly=True,
+        help="When the robot is expected to finish this production, from the cycle times learned for its robot and payload"
+    )
+    mqtt_split_units = fields.Boolean(
+        string="Split Into Unit Tasks",
+        help="Send one task per unit of the quantity, spread across the robots of the work center"
+    )
+    mqtt_unit_ids = fields.One2many(
+        comodel_name="mqtt_integration.production.unit",
+        inverse_name="production_id",
+        string="Unit Tasks",
+        readonly=True
+    )
+    mqtt_units_finished = fields.Integer(
+        string="Units Finished",
+        readonly=True,
+        help="Unit tasks that reported done or failed"
+    )
+
+    mqtt_progress = fields.Float(
+        string="Robot Progress",
+        compute='_compute_mqtt_progress',
+        help="Latest progress reported by the robot through telemetry"
+    )
+
     state = fields.Selection(
         selection_add=[('mqtt_processing', 'MQTT Processing')]
     )
 
+    def init(self):
+        """Index productions that are still waiting to be started through MQTT."""
+        create_index(
+            self.env.cr,
+            'mrp_production_mqtt_startable_idx',
+            self._table,
+            ['product_id', 'id'],
+            where="state IN ('draft', 'confirmed', 'progress') AND mqtt_task_id IS NULL",
+        )
+        create_index(
+            self.env.cr,
+            'mrp_production_mqtt_queued_idx',
+            self._table,
+            ['selected_robot_id', 'mqtt_queued_at'],
+            where="mqtt_queued_at IS NOT NULL",
+        )
+        create_index(
+            self.env.cr,
+            'mrp_production_mqtt_robot_write_idx',
+            self._table,
+            ['selected_robot_id', 'write_date'],
+            where="selected_robot_id IS NOT NULL",
+        )
+        create_index(
+            self.env.cr,
+            'mrp_production_mqtt_archivable_idx',
+            self._table,
+            ['write_date', 'id'],
+            where="state IN ('done', 'cancel') AND mqtt_task_id IS NOT NULL",
+        )
+
     # ===========================
     # COMPUTED FIELDS
     # ===========================
 
-    @api.depends('workorder_ids.workcenter_id.robot_ids')
+    @api.depends('workorder_ids.workcenter_id.robot_ids', 'bom_id')
     def _compute_available_robots(self):
-        """Compute available robots based on work center configuration."""
+        """Compute the live robots of the work centers able to process the production's materials."""
         for record in self:
             robots = self.env['mqtt_integration.robot']
             if record.workorder_ids:
                 for wo in record.workorder_ids:
                     if wo.workcenter_id and wo.workcenter_id.robot_ids:
                         robots |= wo.workcenter_id.robot_ids
-            record.available_robot_ids = robots
+            record.available_robot_ids = robots._filter_capable(record._generate_binary_payload(), live=True)
+
+    def _compute_mqtt_progress(self):
+        """Read the latest robot progress from the telemetry table."""
+        progress = self.env['mqtt_integration.telemetry.latest']._get_progress(self.ids)
+        for record in self:
+            record.mqtt_progress = progress.get(record.id, 0.0)
 
     @api.depends('product_id.product_tmpl_id.mqtt_product_type', 'state', 'mqtt_task_id')
     def _compute_show_start_mqtt(self):
@@ -188,7 +279,40 @@ class MrpProduction(models.Model):
 
     def action_start_mqtt_processing(self):
         """Start MQTT processing for production orders."""
+        profile_model = self.env['mqtt_integration.profile']
+        profile = profile_model._start('dispatch', 'action_start_mqtt_processing')
+        with profiler.activate(profile):
+            try:
+                self._start_mqtt_processing()
+            finally:
+                profile_model._save(profile)
+
+    def _start_mqtt_processing(self):
+        """
+        Validate, send one MQTT task per production and reserve materials.
+        
+        Productions are validated one by one before any call is made; their
+        tasks, including the unit tasks of split productions, are then
+        created with concurrent API calls and stored together. With deadline
+        scheduling, each production goes to the robot expected to finish it soonest.
+        With pipelining, productions and unit tasks beyond a robot's pipeline
+        wait in Odoo for the top-up cron.
+        
+        Stock is checked without locks while validating. The materials of
+        the whole batch are reserved once the API calls are done, so the
+        ledger rows are only held until commit; when sending or reserving
+        fails, the tasks sent by this start are deleted again.
+        """
+        profile = profiler.current()
+        cycle_times = self.env['mqtt_integration.cycle.time']
+        ledger = self.env['mqtt_integration.material.ledger']
+        schedule = cycle_times._get_schedule_enabled()
+        pending = []
+        waiting_units = []
+        pending_by_robot = defaultdict(int)
+        planned = defaultdict(float)
         for production in self:
+            profile.annotate(production_id=production.id)
             if not production.product_id.product_tmpl_id.mqtt_product_type == 'action':
                 raise UserError(
                     'Product must be of type "Action" for MQTT processing.'
@@ -212,7 +336,10 @@ class MrpProduction(models.Model):
                     'No Bill of Materials (BOM) defined.'
                 )
             
-            production._check_material_stock_availability()
+            with profile.phase('stock'):
+                production._check_material_stock_availability(reserved=ledger._read_reserved(
+                    [product.id for product in production._get_material_requirements()], [production.id]
+                ))
             
             work_center = production.workorder_ids[0].workcenter_id
             if not work_center.robot_ids:
@@ -220,162 +347,443 @@ class MrpProduction(models.Model):
                     f'No robots assigned to work center "{work_center.name}".'
                 )
             
-            if not production.selected_robot_id:
+            split = production._is_mqtt_split()
+            binary_payload = production._generate_binary_payload()
+            if not split and schedule and production.selected_robot_id:
+                robot = production.selected_robot_id
+                planned[robot.id] += cycle_times._estimate(robot, binary_payload)
+            elif not split and schedule:
+                candidates = work_center.robot_ids._filter_capable(binary_payload, live=True)
+                if candidates:
+                    robot, cycle = cycle_times._pick_robot(candidates, binary_payload, planned=planned)
+                    production.selected_robot_id = robot
+                    planned[robot.id] += cycle
+            elif not split and not production.selected_robot_id:
+                production.selected_robot_id = work_center.robot_ids._auto_select(binary_payload)
+            
+            if not split and not production.selected_robot_id:
                 raise UserError(
                     'Please select a robot before starting MQTT processing.'
                 )
             
-            if production.selected_robot_id not in work_center.robot_ids:
+            if not split and production.selected_robot_id not in work_center.robot_ids:
                 raise UserError(
                     'Selected robot is not assigned to the work center.'
                 )
             
+            if not split and not production.selected_robot_id._filter_capable(binary_payload):
+                raise UserError(
+                    f'Robot "{production.selected_robot_id.name}" cannot process the materials '
+                    f'of this production (payload {binary_payload}).'
+                )
+            
+            if not split and not production.selected_robot_id._filter_live():
+                raise UserError(
+                    f'Robot "{production.selected_robot_id.name}" is offline: no recent heartbeat received.'
+                )
+            
+            if split:
+                capable_robots = work_center.robot_ids._filter_capable(binary_payload)
+                if not capable_robots:
+                    raise UserError(
+                        f'No robot of work center "{work_center.name}" can process the materials '
+                        f'of this production (payload {binary_payload}).'
+                    )
+                live_robots = capable_robots._filter_live()
+            else:
+                live_robots = work_center.robot_ids
+            if not live_robots:
+                raise UserError(
+                    f'All robots of work center "{work_center.name}" are offline: no recent heartbeat received.'
+                )
+            
             mqtt_topic = production._get_mqtt_topic()
             if not mqtt_topic:
                 raise UserError(
                     'No MQTT topic configured for work centers.'
                 )
             
-            complete_mqtt_topic = f"{mqtt_topic}/{production.selected_robot_id.identifier}"
-            binary_payload = production._generate_binary_payload()
-            task_data = production._create_api_task(complete_mqtt_topic, binary_payload)
+            if split:
+                for entry in production._plan_unit_tasks(mqtt_topic, binary_payload, live_robots):
+                    robot = entry[3][1]
+                    with profile.phase('lock', lock=True):
+                        has_slot = robot._has_pipeline_slot(pending=pending_by_robot[robot.id])
+                    # Units left waiting also count, so later units of the robot wait behind them.
+                    pending_by_robot[robot.id] += 1
+                    (pending if has_slot else waiting_units).append(entry)
+                continue
             
-            if task_data:
+            complete_mqtt_topic = f"{mqtt_topic}/{production.selected_robot_id.identifier}"
+            job = self.env['mqtt_integration.dispatch.job']._join(production, complete_mqtt_topic, binary_payload)
+            if job:
                 production.write({
                     'state': 'mqtt_processing',
-                    'mqtt_task_id': task_data.get('id'),
-                    'mqtt_binary_payload': binary_payload
+                    'mqtt_binary_payload': binary_payload,
                 })
-            else:
-                raise UserError(
-                    'Failed to create MQTT task.'
-                )
+                events.info('dispatch', 'job.joined', sampled=True, production=production.id,
+                            job=job.id, units=job.unit_count)
+                continue
+            
+            robot = production.selected_robot_id
+            if production._queue_for_pipeline(binary_payload, pending=pending_by_robot[robot.id]):
+                continue
+            
+            pending_by_robot[robot.id] += 1
+            pending.append((production, complete_mqtt_topic, binary_payload, None))
+        
+        started = self.browse()
+        try:
+            if pending or waiting_units:
+                with profile.phase('api'):
+                    started = self._create_api_tasks(pending, waiting_units)
+            with profile.phase('reserve', lock=True):
+                self._reserve_material_stock()
+        except Exception:
+            started._delete_started_tasks()
+            raise
 
-    def _get_mqtt_topic(self):
-        for wo in self.workorder_ids:
-            if wo.workcenter_id and wo.workcenter_id.mqtt_topic:
-                _logger.info(f"Found MQTT topic '{wo.workcenter_id.mqtt_topic}' from work center '{wo.workcenter_id.name}'")
-                return wo.workcenter_id.mqtt_topic.strip()
+    def action_stop_mqtt_processing(self):
+        """
+        Stop MQTT processing and reset productions to draft state.
         
-        if self.bom_id and self.bom_id.operation_ids:
-            for operation in self.bom_id.operation_ids:
-                if operation.workcenter_id and operation.workcenter_id.mqtt_topic:
-                    _logger.info(f"Found MQTT topic '{operation.workcenter_id.mqtt_topic}' from BOM operation work center '{operation.workcenter_id.name}'")
-                    return operation.workcenter_id.mqtt_topic.strip()
+        Tasks of all productions are deleted together, in batch requests
+        where the API supports them. Productions whose task could not be
+        deleted stay in processing and are reported; the others are reset
+        with multi-record writes.
+        """
+        productions = self.filtered(lambda p: p.state == 'mqtt_processing')
+        failures = {}
+        tasks = []
+        task_owners = {}
         
-        _logger.warning(f"No MQTT topic found for production {self.id}. Work orders: {len(self.workorder_ids)}, BOM operations: {len(self.bom_id.operation_ids) if self.bom_id else 0}")
-        return None
-
-    def _generate_binary_payload(self):
-        """Generate binary payload from BOM components"""
-        if not self.bom_id or not self.bom_id.bom_line_ids:
-            return '000000'
+        for production in productions:
+            job = production.mqtt_job_id
+            if job.state == 'dispatched' and job.production_ids.filtered(
+                lambda p: p.state == 'mqtt_processing' and p not in productions
+            ):
+                failures[production] = 'Shares its robot task with productions that are not being stopped'
+                continue
+            
+            if job.state in ('open', 'queued'):
+                job._detach(production)
+                continue
+            
+            workcenter = production.workorder_ids[:1].workcenter_id
+            if production.mqtt_unit_ids:
+                production_tasks = [
+                    (unit.task_id, unit.api_base_url)
+                    for unit in production.mqtt_unit_ids.filtered(lambda u: u.state == 'processing')
+                ]
+            elif production.mqtt_task_id:
+                production_tasks = [(production.mqtt_task_id, production.mqtt_api_base_url)]
+            else:
+                production_tasks = []
+            
+            for task_id, base_url in production_tasks:
+                # Members of a coalesced job share one task; delete it once.
+                if task_id not in task_owners:
+                    tasks.append((task_id, base_url or None, workcenter))
+                task_owners.setdefault(task_id, self.browse())
+                task_owners[task_id] |= production
         
-        result_binary = [0] * 6
+        for task_id, error in self.env['mqtt_integration.api.client']._delete_tasks(tasks).items():
+            for production in task_owners.get(task_id, self.browse()):
+                events.error('dispatch', 'task.delete_failed', task=task_id, production=production.id, error=error)
+                failures.setdefault(production, error)
         
-        for line in self.bom_id.bom_line_ids:
-            component_binary = line.product_id.product_tmpl_id.mqtt_material_binary or ''
-            if component_binary:
-                component_binary = component_binary.zfill(6)[-6:]
-                for i, bit in enumerate(component_binary):
-                    if bit == '1':
-                        result_binary[i] = 1
+        failed = self.browse([production.id for production in failures])
+        stopped = productions - failed
+        if stopped:
+            stopped.mqtt_unit_ids.unlink()
+            stopped.mqtt_job_id.filtered(lambda j: j.state == 'dispatched').write({'state': 'cancel'})
+            stopped.workorder_ids.write({'state': 'pending'})
+            self.env['mqtt_integration.material.ledger']._release(stopped)
+            stopped.write({
+                'state': 'draft',
+                'mqtt_task_id': False,
+                'mqtt_binary_payload': False,
+                'mqtt_api_base_url': False,
+                'mqtt_dispatched_at': False,
+                'mqtt_units_finished': 0,
+                'mqtt_job_id': False,
+                'mqtt_queued_at': False,
+            })
+            self.env['mqtt_integration.robot']._request_top_up()
         
-        return ''.join(str(bit) for bit in result_binary)
+        if not failures:
+            return True
+        
+        details = '\n'.join(f"• {production.name}: {error}" for production, error in failures.items())
+        if not stopped:
+            raise UserError(
+                'Failed to delete MQTT task from API. '
+                'Please try again or contact the administrator.\n' + details
+            )
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'MQTT Processing Partially Stopped',
+                'message': f'{len(stopped)} productions stopped, {len(failures)} could not be stopped:\n{details}',
+                'type': 'warning',
+                'sticky': True,
+            },
+        }
+
+    def _mark_dispatched(self, task_data, binary_payload):
+        """Store the task created in the API for the production."""
+        self.write({
+            'state': 'mqtt_processing',
+            'mqtt_task_id': task_data.get('id'),
+            'mqtt_binary_payload': binary_payload,
+            'mqtt_api_base_url': task_data.get('base_url'),
+            'mqtt_dispatched_at': fields.Datetime.now(),
+            'mqtt_queued_at': False,
+        })
+        events.info('dispatch', 'task.created', sampled=True, task=task_data.get('id'),
+                    production=self.id, robot=self.selected_robot_id.id,
+                    endpoint=task_data.get('base_url'))
+
+    # ===========================
+    # PIPELINE METHODS
+    # ===========================
 
-    def _create_api_task(self, mqtt_topic, binary_payload):
-        """Create a new task through the Node.js API."""
-        config = self.env['ir.config_parameter'].sudo()
+    def _queue_for_pipeline(self, binary_payload, pending=0):
+        """
+        Keep the production waiting in Odoo when its robot's pipeline is full.
         
-        host = config.get_param('mqtt_integration.mqtt_api_host', 'localhost')
-        port = config.get_param('mqtt_integration.mqtt_api_port', '3000')
-        auth_enabled = config.get_param('mqtt_integration.mqtt_api_authentication_enabled', 'False')
-        auth_password = config.get_param('mqtt_integration.mqtt_api_authentication_password', '')
+        The pipeline of a robot holds its running task and up to the
+        configured lookahead of staged tasks. Productions also wait behind
+        earlier waiting ones so robots are served in start order. The robot
+        stays locked until commit so concurrent starts cannot overfill it.
         
-        url = f"http://{host}:{port}/api/tasks"
+        Args:
+            pending (int): tasks for the robot about to be created in the same start
         
-        headers = {'Content-Type': 'application/json'}
-        if auth_enabled == 'True' and auth_password:
-            headers['Authorization'] = f'Bearer {auth_password}'
+        Returns:
+            bool: True when the production was queued instead of dispatched
+        """
+        self.ensure_one()
+        robot = self.selected_robot_id
+        lookahead = robot._get_pipeline_lookahead()
+        if not lookahead:
+            return False
         
-        data = {
-            'odooProductionId': str(self.id),
-            'mqttTopic': mqtt_topic,
-            'binaryPayload': binary_payload,
-            'priority': 'normal'
-        }
+        with profiler.current().phase('lock', lock=True):
+            robot._lock_pipeline()
+        in_flight, queued = robot._get_pipeline_load().get(robot.id, (0, 0))
+        if in_flight + pending <= lookahead and not queued:
+            return False
+        
+        self.write({
+            'state': 'mqtt_processing',
+            'mqtt_binary_payload': binary_payload,
+            'mqtt_queued_at': fields.Datetime.now(),
+        })
+        events.info('dispatch', 'task.queued', sampled=True, production=self.id, robot=robot.id,
+                    in_flight=in_flight, waiting=queued + 1)
+        return True
+
+    def _dispatch_queued(self):
+        """
+        Send the task of a production that waited for a slot in its robot's pipeline.
+        
+        Members of a coalesced job send the job's single task instead.
+        
+        Returns:
+            bool: False when the API is unavailable and the production keeps waiting
+        """
+        self.ensure_one()
+        if self.mqtt_job_id:
+            return self.mqtt_job_id._dispatch()
         
+        mqtt_topic = self._get_mqtt_topic()
         try:
-            response = requests.post(url, json=data, headers=headers, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            _logger.error(f"Failed to create MQTT task for production {self.id}: {e}")
-            return None
+            task_data = mqtt_topic and self._create_api_task(
+                f"{mqtt_topic}/{self.selected_robot_id.identifier}", self.mqtt_binary_payload
+            )
+        except UserError as e:
+            events.warning('dispatch', 'task.top_up_deferred', production=self.id, error=e)
+            return False
+        
+        if task_data:
+            self._mark_dispatched(task_data, self.mqtt_binary_payload)
+            return True
+        
+        # The production never reached the API: return it to draft like a failed coalesced job.
+        self.workorder_ids.write({'state': 'pending'})
+        self.env['mqtt_integration.material.ledger']._release(self)
+        self.write({
+            'state': 'draft',
+            'mqtt_binary_payload': False,
+            'mqtt_queued_at': False,
+        })
+        events.error('dispatch', 'task.top_up_failed', production=self.id, robot=self.selected_robot_id.id)
+        return True
 
-    def _delete_api_task(self, task_id):
-        """Delete a task from the Node.js API."""
-        config = self.env['ir.config_parameter'].sudo()
+    # ===========================
+    # SPLIT MODE METHODS
+    # ===========================
+
+    def _is_mqtt_split(self):
+        """Return whether the production is processed as one task per unit."""
+        return self.mqtt_split_units and self.product_qty > 1
+
+    def _plan_unit_tasks(self, mqtt_topic, binary_payload, robots):
+        """
+        Plan one task per unit of the quantity, assigning robots round-robin.
+        
+        Returns:
+            list: (production, complete MQTT topic, binary payload, (sequence, robot))
+            entries for ``_create_api_tasks``
+        """
+        self.ensure_one()
+        unit_count = int(self.product_qty)
+        if unit_count != self.product_qty:
+            raise UserError(
+                'Split mode requires a whole quantity to produce.'
+            )
         
-        host = config.get_param('mqtt_integration.mqtt_api_host', 'localhost')
-        port = config.get_param('mqtt_integration.mqtt_api_port', '3000')
-        auth_enabled = config.get_param('mqtt_integration.mqtt_api_authentication_enabled', 'False')
-        auth_password = config.get_param('mqtt_integration.mqtt_api_authentication_password', '')
+        robots = robots.sorted('id')
+        plan = []
+        for sequence in range(unit_count):
+            robot = robots[sequence % len(robots)]
+            plan.append((self, f"{mqtt_topic}/{robot.identifier}", binary_payload, (sequence + 1, robot)))
+        return plan
+    
+    def _store_unit_tasks(self, unit_tasks, binary_payload):
+        """
+        Store the unit tasks of a split production.
         
-        url = f"http://{host}:{port}/api/tasks/{task_id}"
+        Args:
+            unit_tasks (list): ((sequence, robot), task data) pairs, the task
+                data being None for units waiting for a slot in their robot's pipeline
+        """
+        self.ensure_one()
+        self.mqtt_unit_ids.unlink()
+        now = fields.Datetime.now()
+        units = [{
+            'production_id': self.id,
+            'sequence': sequence,
+            'robot_id': robot.id,
+            'task_id': task_data.get('id') if task_data else False,
+            'api_base_url': task_data.get('base_url') if task_data else False,
+            'dispatched_at': now if task_data else False,
+            'state': 'processing' if task_data else 'waiting',
+        } for (sequence, robot), task_data in sorted(unit_tasks, key=lambda entry: entry[0][0])]
+        sent = [unit for unit in units if unit['task_id']]
         
-        headers = {}
-        if auth_enabled == 'True' and auth_password:
-            headers['Authorization'] = f'Bearer {auth_password}'
+        self.env['mqtt_integration.production.unit'].create(units)
+        self.write({
+            'state': 'mqtt_processing',
+            'mqtt_task_id': sent[0]['task_id'] if sent else False,
+            'mqtt_binary_payload': binary_payload,
+            'mqtt_api_base_url': False,
+            'mqtt_dispatched_at': now,
+            'mqtt_units_finished': 0,
+        })
+        events.info('dispatch', 'units.created', sampled=True, task=sent[0]['task_id'] if sent else None,
+                    production=self.id, units=len(units), waiting=len(units) - len(sent),
+                    robots=len({robot.id for (_sequence, robot), _task_data in unit_tasks}))
+    
+    def _dispatch_waiting_unit(self, unit):
+        """
+        Send the task of a unit that waited for a slot in its robot's pipeline.
+        
+        A unit whose task cannot be created fails like a unit the robot
+        reported failed.
         
+        Returns:
+            bool: False when the API is unavailable and the unit keeps waiting
+        """
+        self.ensure_one()
+        mqtt_topic = self._get_mqtt_topic()
         try:
-            response = requests.delete(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            _logger.info(f"Successfully deleted MQTT task {task_id} from API for production {self.id}")
-            return True
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
-                _logger.warning(f"MQTT task {task_id} not found in API (may have been already processed or deleted)")
-                return True
-            else:
-                _logger.error(f"HTTP error deleting MQTT task {task_id} from API for production {self.id}: {e}")
-                return False
-        except requests.exceptions.ConnectionError as e:
-            _logger.error(f"Connection error deleting MQTT task {task_id} from API for production {self.id}: {e}")
-            return False
-        except requests.exceptions.Timeout as e:
-            _logger.error(f"Timeout error deleting MQTT task {task_id} from API for production {self.id}: {e}")
-            return False
-        except Exception as e:
-            _logger.error(f"Unexpected error deleting MQTT task {task_id} from API for production {self.id}: {e}")
+            task_data = mqtt_topic and self._create_api_task(
+                f"{mqtt_topic}/{unit.robot_id.identifier}", self.mqtt_binary_payload
+            )
+        except UserError as e:
+            events.warning('dispatch', 'unit.top_up_deferred', production=self.id, unit=unit.sequence, error=e)
             return False
+        
+        if not task_data:
+            events.error('dispatch', 'unit.top_up_failed', production=self.id, unit=unit.sequence,
+                         robot=unit.robot_id.id)
+            self._finish_unit(unit, 'failed')
+            return True
+        
+        unit.write({
+            'task_id': task_data.get('id'),
+            'api_base_url': task_data.get('base_url'),
+            'dispatched_at': fields.Datetime.now(),
+            'state': 'processing',
+        })
+        if not self.mqtt_task_id:
+            self.mqtt_task_id = unit.task_id
+        events.info('dispatch', 'unit.created', sampled=True, task=unit.task_id, production=self.id,
+                    unit=unit.sequence, robot=unit.robot_id.id, endpoint=unit.api_base_url)
+        return True
 
-    def action_stop_mqtt_processing(self):
-        """Stop MQTT processing and reset production to draft state."""
+    def _delete_started_tasks(self):
+        """Best-effort deletion of the tasks sent for productions whose start is rolled back."""
+        tasks = []
         for production in self:
-            if production.state != 'mqtt_processing':
-                continue
-            
-            if production.mqtt_task_id:
-                success = production._delete_api_task(production.mqtt_task_id)
-                if not success:
-                    _logger.error(
-                        f"Failed to delete MQTT task {production.mqtt_task_id} "
-                        f"from API for production {production.id}"
-                    )
-                    raise UserError(
-                        'Failed to delete MQTT task from API. '
-                        'Please try again or contact the administrator.'
-                    )
-            
-            for wo in production.workorder_ids:
-                wo.write({'state': 'pending'})
-            
-            production.write({
-                'state': 'draft',
-                'mqtt_task_id': False,
-                'mqtt_binary_payload': False
-            })
+            workcenter = production.workorder_ids[:1].workcenter_id
+            if production.mqtt_unit_ids:
+                tasks.extend(
+                    (unit.task_id, unit.api_base_url or None, workcenter)
+                    for unit in production.mqtt_unit_ids if unit.task_id
+                )
+            elif production.mqtt_task_id:
+                tasks.append((production.mqtt_task_id, production.mqtt_api_base_url or None, workcenter))
+        for task_id in self.env['mqtt_integration.api.client']._delete_tasks(tasks):
+            events.error('dispatch', 'task.orphaned', task=task_id)
+
+    def _handle_unit_status(self, task_id, status):
+        """
+        Record the outcome of one unit task reported by the API.
+        
+        Returns:
+            bool: False when the task is not a unit of this production
+        """
+        self.ensure_one()
+        unit = self.mqtt_unit_ids.filtered(lambda u: u.task_id == task_id)
+        if not task_id or not unit:
+            return False
+        if unit.state == 'processing':
+            self._finish_unit(unit, status)
+        return True
+    
+    def _finish_unit(self, unit, status):
+        """
+        Record the outcome of one unit and finish the production once every unit has reported.
+        
+        The production completes when all units are done and fails when any
+        unit failed; stock moves cover all units at once. When some units
+        failed, the materials of the units that finished done are still
+        consumed, since the robot used them, and the reservation of the
+        rest is released with the failure.
+        """
+        unit.write({'state': status, 'finished_at': fields.Datetime.now()})
+        self.env['mqtt_integration.task.event']._record(self, status, unit=unit)
+        
+        finished = self.mqtt_unit_ids.filtered(lambda u: u.state in ('done', 'failed'))
+        self.write({'mqtt_units_finished': len(finished)})
+        events.info('callback', 'unit.finished', sampled=True, task=unit.task_id or None, production=self.id,
+                    status=status, finished=len(finished), units=len(self.mqtt_unit_ids))
+        self.env['mqtt_integration.robot']._request_top_up()
+        if len(finished) < len(self.mqtt_unit_ids):
+            return
+        
+        failed = finished.filtered(lambda u: u.state == 'failed')
+        if failed:
+            done = len(finished) - len(failed)
+            if done:
+                with profiler.current().phase('stock'):
+                    self._handle_stock_movements(share=done / len(finished))
+            self._handle_task_failure(f"{len(failed)} of {len(finished)} unit tasks failed")
+        else:
+            self._handle_task_completion()
 
     # ===========================
     # MQTT UTILITY METHODS
@@ -385,27 +793,20 @@ class MrpProduction(models.Model):
         """Get MQTT topic from work center configuration."""
         for wo in self.workorder_ids:
             if wo.workcenter_id and wo.workcenter_id.mqtt_topic:
-                _logger.info(
-                    f"Found MQTT topic '{wo.workcenter_id.mqtt_topic}' "
-                    f"from work center '{wo.workcenter_id.name}'"
-                )
+                events.debug('dispatch', 'topic.resolved', production=self.id,
+                             workcenter=wo.workcenter_id.id, source='workorder')
                 return wo.workcenter_id.mqtt_topic.strip()
         
         if self.bom_id and self.bom_id.operation_ids:
             for operation in self.bom_id.operation_ids:
                 if operation.workcenter_id and operation.workcenter_id.mqtt_topic:
-                    _logger.info(
-                        f"Found MQTT topic '{operation.workcenter_id.mqtt_topic}' "
-                        f"from BOM operation work center '{operation.workcenter_id.name}'"
-                    )
+                    events.debug('dispatch', 'topic.resolved', production=self.id,
+                                 workcenter=operation.workcenter_id.id, source='bom_operation')
                     return operation.workcenter_id.mqtt_topic.strip()
         
         bom_operations_count = len(self.bom_id.operation_ids) if self.bom_id else 0
-        _logger.warning(
-            f"No MQTT topic found for production {self.id}. "
-            f"Work orders: {len(self.workorder_ids)}, "
-            f"BOM operations: {bom_operations_count}"
-        )
+        events.warning('dispatch', 'topic.missing', production=self.id,
+                       workorders=len(self.workorder_ids), bom_operations=bom_operations_count)
         return None
 
     def _generate_binary_payload(self):
@@ -429,88 +830,147 @@ class MrpProduction(models.Model):
     # API METHODS
     # ===========================
 
-    def _create_api_task(self, mqtt_topic, binary_payload):
-        """Create a new task through the Node.js API."""
-        config = self.env['ir.config_parameter'].sudo()
+    def _create_api_tasks(self, pending, waiting_units=()):
+        """
+        Create the tasks of several productions, and the unit tasks of split ones, with concurrent API calls.
         
-        host = config.get_param('mqtt_integration.mqtt_api_host', 'localhost')
-        port = config.get_param('mqtt_integration.mqtt_api_port', '3000')
-        auth_enabled = config.get_param('mqtt_integration.mqtt_api_authentication_enabled', 'False')
-        auth_password = config.get_param('mqtt_integration.mqtt_api_authentication_password', '')
+        Tasks are stored once every call succeeded. Otherwise the tasks that
+        were created are deleted again and the first error is raised, so the
+        start fails as a whole without leaving tasks behind in the API.
         
-        url = f"http://{host}:{port}/api/tasks"
+        Args:
+            pending (list): (production, complete MQTT topic, binary payload, unit)
+                tuples, ``unit`` being the (sequence, robot) of a unit task and
+                None for the single task of a production
+            waiting_units (list): entries of the same form for unit tasks left
+                waiting for a slot in their robot's pipeline, stored without a call
         
-        headers = {'Content-Type': 'application/json'}
-        if auth_enabled == 'True' and auth_password:
-            headers['Authorization'] = f'Bearer {auth_password}'
+        Returns:
+            recordset: the productions whose tasks were stored
+        """
+        client = self.env['mqtt_integration.api.client']
+        calls = []
+        for production, mqtt_topic, binary_payload, _unit in pending:
+            data, compact_data = production._prepare_api_task(mqtt_topic, binary_payload)
+            calls.append({
+                'method': 'POST',
+                'path': '/api/tasks',
+                'json': data,
+                'compact_json': compact_data,
+                'workcenter': production.workorder_ids[:1].workcenter_id,
+            })
+        
+        created = []
+        errors = []
+        for (production, _mqtt_topic, binary_payload, unit), result in zip(pending, client._request_many(calls)):
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                base_url, response = result
+                response.raise_for_status()
+                created.append((production, dict(response.json(), base_url=base_url), binary_payload, unit))
+            except UserError as e:
+                errors.append(str(e))
+            except Exception as e:
+                events.error('dispatch', 'task.create_failed', production=production.id, error=e)
+                errors.append('Failed to create MQTT task.')
         
+        if errors:
+            orphans = client._delete_tasks([
+                (task_data.get('id'), task_data.get('base_url'), production.workorder_ids[:1].workcenter_id)
+                for production, task_data, _binary_payload, _unit in created
+            ])
+            for task_id in orphans:
+                events.error('dispatch', 'task.orphaned', task=task_id)
+            raise UserError(errors[0])
+        
+        profile = profiler.current()
+        unit_tasks = defaultdict(list)
+        for production, task_data, binary_payload, unit in created:
+            profile.annotate(task_id=task_data.get('id'))
+            if unit:
+                unit_tasks[production, binary_payload].append((unit, task_data))
+            else:
+                production._mark_dispatched(task_data, binary_payload)
+        for production, _mqtt_topic, binary_payload, unit in waiting_units:
+            unit_tasks[production, binary_payload].append((unit, None))
+        for (production, binary_payload), tasks in unit_tasks.items():
+            production._store_unit_tasks(tasks, binary_payload)
+        return self.browse(list({production.id for production, _task_data, _binary_payload, _unit in created}))
+
+    def _prepare_api_task(self, mqtt_topic, binary_payload, quantity=1):
+        """
+        Build the task bodies sent to the API.
+        
+        Returns:
+            tuple: (JSON body, compact body)
+        """
         data = {
             'odooProductionId': str(self.id),
+            'odooDatabase': self.env.cr.dbname,
             'mqttTopic': mqtt_topic,
             'binaryPayload': binary_payload,
             'priority': 'normal'
         }
         
+        payload_value, payload_bits = pack_payload(binary_payload)
+        compact_data = {
+            'odooProductionId': self.id,
+            'odooDatabase': self.env.cr.dbname,
+            'mqttTopic': mqtt_topic,
+            'payload': payload_value,
+            'payloadBits': payload_bits,
+            'priority': 'normal'
+        }
+        if quantity > 1:
+            data['quantity'] = compact_data['quantity'] = quantity
+        return data, compact_data
+
+    def _create_api_task(self, mqtt_topic, binary_payload, quantity=1):
+        """Create a new task through the Node.js API, for ``quantity`` units when coalesced."""
+        data, compact_data = self._prepare_api_task(mqtt_topic, binary_payload, quantity=quantity)
+        workcenter = self.workorder_ids[:1].workcenter_id
+        
         try:
-            response = requests.post(url, json=data, headers=headers, timeout=10)
+            base_url, response = self.env['mqtt_integration.api.client']._request(
+                'POST', '/api/tasks', json=data, workcenter=workcenter, compact_json=compact_data
+            )
             response.raise_for_status()
-            return response.json()
+            return dict(response.json(), base_url=base_url)
+        except UserError:
+            raise
         except Exception as e:
-            _logger.error(f"Failed to create MQTT task for production {self.id}: {e}")
+            events.error('dispatch', 'task.create_failed', production=self.id, error=e)
             return None
 
-    def _delete_api_task(self, task_id):
+    def _delete_api_task(self, task_id, base_url=None):
         """Delete a task from the Node.js API."""
-        config = self.env['ir.config_parameter'].sudo()
-        
-        host = config.get_param('mqtt_integration.mqtt_api_host', 'localhost')
-        port = config.get_param('mqtt_integration.mqtt_api_port', '3000')
-        auth_enabled = config.get_param('mqtt_integration.mqtt_api_authentication_enabled', 'False')
-        auth_password = config.get_param('mqtt_integration.mqtt_api_authentication_password', '')
-        
-        url = f"http://{host}:{port}/api/tasks/{task_id}"
-        
-        headers = {}
-        if auth_enabled == 'True' and auth_password:
-            headers['Authorization'] = f'Bearer {auth_password}'
-        
         try:
-            response = requests.delete(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            _logger.info(
-                f"Successfully deleted MQTT task {task_id} from API for production {self.id}"
+            _base_url, response = self.env['mqtt_integration.api.client']._request(
+                'DELETE', f'/api/tasks/{task_id}',
+                workcenter=self.workorder_ids[:1].workcenter_id,
+                base_url=base_url or self.mqtt_api_base_url,
             )
+            response.raise_for_status()
+            events.info('dispatch', 'task.deleted', sampled=True, task=task_id, production=self.id)
             return True
+        except UserError:
+            raise
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 404:
-                _logger.warning(
-                    f"MQTT task {task_id} not found in API "
-                    "(may have been already processed or deleted)"
-                )
+                events.warning('dispatch', 'task.delete_not_found', task=task_id, production=self.id)
                 return True
             else:
-                _logger.error(
-                    f"HTTP error deleting MQTT task {task_id} "
-                    f"from API for production {self.id}: {e}"
-                )
+                events.error('dispatch', 'task.delete_http_error', task=task_id, production=self.id, error=e)
                 return False
         except requests.exceptions.ConnectionError as e:
-            _logger.error(
-                f"Connection error deleting MQTT task {task_id} "
-                f"from API for production {self.id}: {e}"
-            )
+            events.error('dispatch', 'task.delete_connection_error', task=task_id, production=self.id, error=e)
             return False
         except requests.exceptions.Timeout as e:
-            _logger.error(
-                f"Timeout error deleting MQTT task {task_id} "
-                f"from API for production {self.id}: {e}"
-            )
+            events.error('dispatch', 'task.delete_timeout', task=task_id, production=self.id, error=e)
             return False
         except Exception as e:
-            _logger.error(
-                f"Unexpected error deleting MQTT task {task_id} "
-                f"from API for production {self.id}: {e}"
-            )
+            events.error('dispatch', 'task.delete_error', task=task_id, production=self.id, error=e)
             return False
 
     # ===========================
@@ -519,72 +979,82 @@ class MrpProduction(models.Model):
 
     def _handle_task_completion(self):
         """Handle successful task completion from MQTT API with stock management."""
+        profile = profiler.current()
         for production in self:
             if production.state != 'mqtt_processing':
-                _logger.warning(
-                    f"Production {production.id} is not in mqtt_processing state, "
-                    f"current state: {production.state}"
-                )
+                events.warning('callback', 'completion.skipped', task=production.mqtt_task_id,
+                               production=production.id, state=production.state)
                 continue
             
             try:
-                production._handle_stock_movements()
+                with profile.phase('stock'):
+                    production._handle_stock_movements()
+                with profile.phase('ledger', lock=True):
+                    self.env['mqtt_integration.material.ledger']._release(production)
                 
-                if production.state == 'mqtt_processing':
-                    production.action_assign()
+                with profile.phase('assign'):
+                    if production.state == 'mqtt_processing':
+                        production.action_assign()
                 
-                for wo in production.workorder_ids:
-                    production._complete_work_order(wo)
+                with profile.phase('workorder'):
+                    for wo in production.workorder_ids:
+                        production._complete_work_order(wo)
                 
-                production.write({'state': 'done'})
+                with profile.phase('write'):
+                    production.write({'state': 'done'})
+                    if not production.mqtt_unit_ids:
+                        self.env['mqtt_integration.task.event']._record(production, 'done')
                 
-                _logger.info(
-                    f"Production {production.id} completed successfully "
-                    f"via MQTT task {production.mqtt_task_id}"
-                )
+                events.info('callback', 'production.done', sampled=True,
+                            task=production.mqtt_task_id, production=production.id)
                 
             except Exception as e:
-                _logger.error(f"Error completing production {production.id}: {e}")
+                events.error('callback', 'production.completion_error', exc_info=True,
+                             task=production.mqtt_task_id, production=production.id, error=e)
                 production.write({'state': 'cancel'})
                 raise
+        
+        self.env['mqtt_integration.robot']._request_top_up()
 
     # ===========================
     # STOCK MOVEMENT METHODS
     # ===========================
 
-    def _handle_stock_movements(self):
-        """Handle stock movements for completed MQTT production."""
+    def _handle_stock_movements(self, share=1.0):
+        """
+        Handle stock movements for completed MQTT productions.
+        
+        Materials are consumed in the quantities of ``_get_material_requirements``,
+        the same ones reserved in the ledger, whether or not the production
+        was split. Each consumed unit of material yields its configured
+        result quantity.
+        
+        Args:
+            share (float): part of the production that was processed, for
+                split productions whose units did not all finish done
+        """
         for production in self:
             try:
                 if not production.bom_id or not production.bom_id.bom_line_ids:
-                    _logger.warning(
-                        f"No BOM or components found for production {production.id}"
-                    )
-                    return
+                    events.warning('stock', 'bom.missing', production=production.id)
+                    continue
                 
-                for bom_line in production.bom_id.bom_line_ids:
-                    material_product = bom_line.product_id
-                    
-                    if material_product.product_tmpl_id.mqtt_product_type != 'material':
-                        continue
-                    
-                    production._decrease_material_stock(material_product, 1.0)
+                for material_product, required_qty in production._get_material_requirements().items():
+                    quantity = required_qty * share
+                    production._decrease_material_stock(material_product, quantity)
                     
                     result_product = material_product.product_tmpl_id.mqtt_material_product_result_id
-                    result_qty = material_product.product_tmpl_id.mqtt_material_product_result_qty or 1.0
+                    result_qty = (material_product.product_tmpl_id.mqtt_material_product_result_qty or 1.0) * quantity
                     
                     if result_product:
                         production._increase_result_stock(result_product, result_qty)
-                        _logger.info(
-                            f"Stock updated for production {production.id}: "
-                            f"decreased {material_product.name}, "
-                            f"increased {result_product.name} by {result_qty}"
-                        )
+                        events.info('stock', 'stock.updated', sampled=True, task=production.mqtt_task_id,
+                                    production=production.id, material=material_product.id,
+                                    result=result_product.id, quantity=result_qty)
                 
             except Exception as e:
-                _logger.error(
-                    f"Error handling stock movements for production {production.id}: {e}"
-                )
+                events.error('stock', 'stock.movement_error', task=production.mqtt_task_id,
+                             production=production.id, error=e)
                 raise
 
     def _decrease_material_stock(self, product, quantity):
@@ -610,14 +1080,10 @@ class MrpProduction(models.Model):
                 'quantity': -quantity,
             })
             
-            _logger.info(
-                f"Decreased stock for material {product.name} by {quantity} units"
-            )
+            events.debug('stock', 'material.decreased', production=self.id, product=product.id, quantity=quantity)
             
         except Exception as e:
-            _logger.error(
-                f"Error decreasing material stock for product {product.name}: {e}"
-            )
+            events.error('stock', 'material.decrease_error', production=self.id, product=product.id, error=e)
             raise
 
     def _increase_result_stock(self, product, quantity):
@@ -631,14 +1097,10 @@ class MrpProduction(models.Model):
                 'quantity': quantity,
             })
             
-            _logger.info(
-                f"Increased stock for result product {product.name} by {quantity} units"
-            )
+            events.debug('stock', 'result.increased', production=self.id, product=product.id, quantity=quantity)
             
         except Exception as e:
-            _logger.error(
-                f"Error increasing result stock for product {product.name}: {e}"
-            )
+            events.error('stock', 'result.increase_error', production=self.id, product=product.id, error=e)
             raise
 
     # ===========================
@@ -647,24 +1109,29 @@ class MrpProduction(models.Model):
 
     def _handle_task_failure(self, error_message):
         """Handle task failure from MQTT API."""
+        profile = profiler.current()
         for production in self:
             if production.state != 'mqtt_processing':
-                _logger.warning(
-                    f"Production {production.id} is not in mqtt_processing state, "
-                    f"current state: {production.state}"
-                )
+                events.warning('callback', 'failure.skipped', task=production.mqtt_task_id,
+                               production=production.id, state=production.state)
                 continue
             
-            for wo in production.workorder_ids:
-                if wo.state in ['pending', 'ready', 'progress']:
-                    wo.write({'state': 'cancel'})
+            with profile.phase('workorder'):
+                for wo in production.workorder_ids:
+                    if wo.state in ['pending', 'ready', 'progress']:
+                        wo.write({'state': 'cancel'})
             
-            production.write({'state': 'draft'})
+            with profile.phase('ledger', lock=True):
+                self.env['mqtt_integration.material.ledger']._release(production)
+            with profile.phase('write'):
+                if not production.mqtt_unit_ids:
+                    self.env['mqtt_integration.task.event']._record(production, 'failed')
+                production.write({'state': 'draft'})
             
-            _logger.error(
-                f"Production {production.id} failed via MQTT task "
-                f"{production.mqtt_task_id}: {error_message}"
-            )
+            events.error('callback', 'production.failed', task=production.mqtt_task_id,
+                         production=production.id, reason=error_message)
+        
+        self.env['mqtt_integration.robot']._request_top_up()
 
     def _handle_production_completion(self):
         """Handle production completion notification from MQTT API."""
@@ -685,78 +1152,112 @@ class MrpProduction(models.Model):
     def _complete_work_order(self, work_order):
         """Properly complete a work order by progressing through states."""
         try:
-            _logger.info(
-                f"Completing work order {work_order.id} (current state: {work_order.state})"
-            )
+            events.debug('workorder', 'workorder.completing', production=self.id,
+                         workorder=work_order.id, state=work_order.state)
             
             if work_order.state == 'waiting':
                 if self.reservation_state != 'assigned':
                     self.action_assign()
                 
                 work_order.write({'state': 'ready'})
-                _logger.info(f"Work order {work_order.id} moved from waiting to ready")
+                events.debug('workorder', 'workorder.ready', production=self.id, workorder=work_order.id)
             
             if work_order.state == 'ready':
                 try:
                     work_order.button_start()
-                    _logger.info(f"Work order {work_order.id} started")
+                    events.debug('workorder', 'workorder.started', production=self.id, workorder=work_order.id)
                 except Exception as e:
-                    _logger.warning(
-                        f"Could not start work order {work_order.id} normally: {e}. "
-                        "Setting to progress."
-                    )
+                    events.warning('workorder', 'workorder.start_forced', production=self.id,
+                                   workorder=work_order.id, error=e)
                     work_order.write({'state': 'progress'})
             
             if work_order.state == 'progress':
                 try:
                     if hasattr(work_order, 'working_state') and work_order.working_state != 'done':
                         work_order.button_finish()
-                        _logger.info(f"Work order {work_order.id} finished")
+                        events.debug('workorder', 'workorder.finished', production=self.id, workorder=work_order.id)
                     else:
                         work_order.write({'state': 'done'})
-                        _logger.info(f"Work order {work_order.id} set to done")
+                        events.debug('workorder', 'workorder.done', production=self.id, workorder=work_order.id)
                 except Exception as e:
-                    _logger.warning(
-                        f"Could not finish work order {work_order.id} normally: {e}. "
-                        "Setting to done."
-                    )
+                    events.warning('workorder', 'workorder.finish_forced', production=self.id,
+                                   workorder=work_order.id, error=e)
                     work_order.write({'state': 'done'})
             
             if work_order.state != 'done':
                 work_order.write({'state': 'done'})
-                _logger.info(f"Work order {work_order.id} forced to done state")
+                events.warning('workorder', 'workorder.done_forced', production=self.id, workorder=work_order.id)
                 
         except Exception as e:
-            _logger.error(f"Error completing work order {work_order.id}: {e}")
+            events.error('workorder', 'workorder.completion_error', production=self.id,
+                         workorder=work_order.id, error=e)
             work_order.write({'state': 'done'})
 
     # ===========================
     # STOCK AVAILABILITY METHODS
     # ===========================
 
-    def _check_material_stock_availability(self):
-        """Check if sufficient stock is available for all materials before starting MQTT process."""
+    def _get_material_requirements(self):
+        """
+        Return the MQTT materials required by this production.
+
+        Returns:
+            dict: {product.product record: required quantity}
+        """
+        requirements = {}
+        if not self.bom_id:
+            return requirements
+        
+        for bom_line in self.bom_id.bom_line_ids:
+            material_product = bom_line.product_id
+            if material_product.product_tmpl_id.mqtt_product_type != 'material':
+                continue
+            requirements[material_product] = (
+                requirements.get(material_product, 0.0) + bom_line.product_qty * self.product_qty
+            )
+        return requirements
+
+    def _reserve_material_stock(self):
+        """Check availability and reserve the materials of these productions, locking them once for the batch."""
+        requirements = {}
+        for production in self:
+            production_requirements = production._get_material_requirements()
+            if production_requirements:
+                requirements[production] = production_requirements
+            else:
+                production._check_material_stock_availability()
+        if not requirements:
+            return
+        
+        self.env['mqtt_integration.material.ledger']._reserve(
+            requirements,
+            skip_locked=self.env.context.get('mqtt_skip_locked_materials', False),
+        )
+
+    def _check_material_stock_availability(self, reserved=None):
+        """
+        Check if sufficient stock is available for all materials before starting MQTT process.
+        
+        Args:
+            reserved (dict): {product_id: quantity} already reserved by other
+                productions, deducted from the on-hand stock
+        """
         if not self.bom_id or not self.bom_id.bom_line_ids:
-            _logger.warning(f"No BOM or components found for production {self.id}")
+            events.warning('stock', 'bom.missing', production=self.id)
             return
         
+        reserved = reserved or {}
         stock_location = self.env.ref('stock.stock_location_stock')
         insufficient_materials = []
         
-        for bom_line in self.bom_id.bom_line_ids:
-            material_product = bom_line.product_id
-            
-            if material_product.product_tmpl_id.mqtt_product_type != 'material':
-                continue
-            
+        for material_product, required_qty in self._get_material_requirements().items():
             # Get current stock quantity
             stock_quant = self.env['stock.quant'].search([
                 ('product_id', '=', material_product.id),
                 ('location_id', '=', stock_location.id)
             ])
             
-            current_stock = sum(quant.quantity for quant in stock_quant)
-            required_qty = bom_line.product_qty * self.product_qty
+            current_stock = sum(quant.quantity for quant in stock_quant) - reserved.get(material_product.id, 0.0)
             
             if current_stock < required_qty:
                 insufficient_materials.append({
@@ -773,4 +1274,4 @@ class MrpProduction(models.Model):
             
             raise UserError(error_msg)
         
-        _logger.info(f"Stock availability check passed for production {self.id}")
\ No newline at end of file
+        events.debug('stock', 'availability.passed', production=self.id)
@@ -1,11 +1,9 @@
 # -*- coding: utf-8 -*-
 
-import logging
-
 from odoo import models
 from odoo.exceptions import UserError
 
-_logger = logging.getLogger(__name__)
+from ..tools.event_logger import events
 
 
 class MrpWorkorder(models.Model):
@@ -90,10 +88,7 @@ class MrpWorkorder(models.Model):
         is_mqtt_processing = production.state == 'mqtt_processing'
         
         if should_use_mqtt or is_mqtt_processing:
-            _logger.info(
-                f"Blocking work order {self.id} action - "
-                f"Production {production.id} uses MQTT processing"
-            )
+            events.debug('workorder', 'workorder.blocked', production=production.id, workorder=self.id)
             return True
             
         return False
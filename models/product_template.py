@@ -38,9 +38,16 @@ class ProductTemplate(models.Model):
     # ===========================
 
     def action_start_mqtt_processing_on_productions(self):
-        """Start MQTT processing on all productions using this product template."""
-        productions = self.env['mrp.production'].search([
-            ('product_id.product_tmpl_id', '=', self.id)
-        ])
-        for production in productions:
-            production.action_start_mqtt_processing()
\ No newline at end of file
+        """Queue a background job starting MQTT processing on the productions of this product."""
+        self.ensure_one()
+        job = self.env['mqtt_integration.mass.start']._create_for_template(self)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'MQTT mass start queued',
+                'message': f'{job.total_count} productions will be started in the background.',
+                'type': 'info',
+                'sticky': False,
+            },
+        }
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields
+
+
+class MqttProductionUnit(models.Model):
+    _name = "mqtt_integration.production.unit"
+    _description = "MQTT Production Unit"
+    _order = 'production_id, sequence'
+    _log_access = False
+
+    # ===========================
+    # FIELDS
+    # ===========================
+
+    production_id = fields.Many2one(
+        comodel_name='mrp.production',
+        string="Production",
+        required=True,
+        index=True,
+        ondelete='cascade'
+    )
+    sequence = fields.Integer(
+        string="Unit",
+        required=True
+    )
+    robot_id = fields.Many2one(
+        comodel_name='mqtt_integration.robot',
+        string="Robot",
+        ondelete='set null'
+    )
+    task_id = fields.Char(
+        string="MQTT Task ID",
+        index=True
+    )
+    api_base_url = fields.Char(
+        string="MQTT API Endpoint"
+    )
+    state = fields.Selection(
+        selection=[
+            ('waiting', 'Waiting for Robot'),
+            ('processing', 'Processing'),
+            ('done', 'Done'),
+            ('failed', 'Failed'),
+        ],
+        string="Status",
+        default='processing',
+        required=True
+    )
+    dispatched_at = fields.Datetime(
+        string="Dispatched At"
+    )
+    finished_at = fields.Datetime(
+        string="Finished At"
+    )
+
+    _sql_constraints = [
+        ('production_sequence_unique', 'unique(production_id, sequence)', 'Unit numbers must be unique per production.'),
+    ]
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import random
+
+from odoo import models, fields, api
+
+from ..tools.profiler import NULL_PROFILE, RequestProfile
+
+_logger = logging.getLogger(__name__)
+
+
+class MqttProfile(models.Model):
+    _name = "mqtt_integration.profile"
+    _description = "MQTT Request Profile"
+    _order = 'duration_ms desc'
+    _log_access = False
+
+    # ===========================
+    # FIELDS
+    # ===========================
+
+    kind = fields.Selection(
+        selection=[
+            ('callback', 'Callback'),
+            ('dispatch', 'Dispatch'),
+        ],
+        string="Kind",
+        required=True
+    )
+    name = fields.Char(
+        string="Request",
+        required=True
+    )
+    production_id = fields.Integer(
+        string="Production ID"
+    )
+    task_id = fields.Char(
+        string="MQTT Task ID"
+    )
+    recorded_at = fields.Datetime(
+        string="Recorded At",
+        required=True,
+        index=True
+    )
+    duration_ms = fields.Float(
+        string="Duration (ms)",
+        index=True
+    )
+    sql_count = fields.Integer(
+        string="SQL Queries"
+    )
+    sql_time_ms = fields.Float(
+        string="SQL Time (ms)"
+    )
+    python_time_ms = fields.Float(
+        string="Python Time (ms)",
+        help="Duration minus SQL time"
+    )
+    lock_wait_ms = fields.Float(
+        string="Lock Wait (ms)",
+        help="Time spent in phases that acquire row locks"
+    )
+    phases = fields.Text(
+        string="Phases",
+        help="JSON breakdown of time and SQL per phase"
+    )
+
+    # ===========================
+    # PROFILING METHODS
+    # ===========================
+
+    @api.model
+    def _get_profile_settings(self):
+        """Return (sample rate between 0 and 1, maximum number of stored profiles) from configuration."""
+        config = self.env['ir.config_parameter'].sudo()
+        try:
+            rate = float(config.get_param('mqtt_integration.mqtt_profile_sample_rate', 0) or 0)
+        except ValueError:
+            rate = 0.0
+        max_rows = int(config.get_param('mqtt_integration.mqtt_profile_max_rows', 1000) or 1000)
+        return min(max(rate, 0.0), 1.0), max(max_rows, 1)
+
+    @api.model
+    def _start(self, kind, name):
+        """Return a new profile for a sampled share of requests, the no-op profile otherwise."""
+        rate, _max_rows = self._get_profile_settings()
+        if rate and random.random() < rate:
+            return RequestProfile(kind, name)
+        return NULL_PROFILE
+
+    @api.model
+    def _save(self, profile):
+        """
+        Store a finished profile and trim the table to its configured size.
+
+        Written through a separate cursor so profiles of failed requests are
+        kept and the request transaction is not extended.
+        """
+        if not profile.enabled:
+            return
+        _rate, max_rows = self._get_profile_settings()
+        values = dict(
+            profile.summary(),
+            kind=profile.kind,
+            name=profile.name,
+            production_id=profile.context.get('production_id'),
+            task_id=profile.context.get('task_id'),
+            recorded_at=fields.Datetime.now(),
+            phases=json.dumps(profile.phases),
+        )
+        try:
+            with self.env.registry.cursor() as cr:
+                self.with_env(self.env(cr=cr)).sudo().create(values)
+                cr.execute(f"""
+                    DELETE FROM {self._table}
+                     WHERE id <= (SELECT id FROM {self._table} ORDER BY id DESC OFFSET %s LIMIT 1)
+                """, (max_rows,))
+        except Exception as e:
+            _logger.warning(f"Could not store MQTT request profile: {e}")
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from odoo import models, api
+from odoo.sql_db import db_connect
+
+_logger = logging.getLogger(__name__)
+
+# Per-worker replica health ({dsn: (monotonic expiry, usable)}), so that the
+# lag is not checked on every read.
+_REPLICA_STATE = {}
+_REPLICA_STATE_LOCK = threading.Lock()
+_REPLICA_CHECK_TTL = 10
+
+
+class MqttReplica(models.AbstractModel):
+    _name = "mqtt_integration.replica"
+    _description = "MQTT Read Replica"
+
+    # ===========================
+    # CONFIGURATION METHODS
+    # ===========================
+
+    @api.model
+    def _get_replica_settings(self):
+        """Return (replica DSN, or an empty string when none is configured, maximum tolerated lag in seconds)."""
+        config = self.env['ir.config_parameter'].sudo()
+        dsn = (config.get_param('mqtt_integration.mqtt_replica_dsn', '') or '').strip()
+        max_lag = int(config.get_param('mqtt_integration.mqtt_replica_max_lag', 10) or 0)
+        return dsn, max(max_lag, 0)
+
+    # ===========================
+    # CURSOR METHODS
+    # ===========================
+
+    @api.model
+    @contextmanager
+    def _read_cursor(self):
+        """
+        Yield a cursor for read-only reporting queries and where it reads from.
+
+        The replica is used when it is configured, reachable and no further
+        behind than the tolerated lag; otherwise the current transaction's
+        cursor on the primary is yielded. Replica cursors are read-only and
+        closed on exit.
+
+        Yields:
+            tuple: (cursor, 'replica' or 'primary')
+        """
+        dsn, max_lag = self._get_replica_settings()
+        cr = self._open_replica(dsn, max_lag) if dsn else None
+        if cr is None:
+            yield self.env.cr, 'primary'
+            return
+        try:
+            yield cr, 'replica'
+        finally:
+            cr.close()
+
+    @api.model
+    def _open_replica(self, dsn, max_lag):
+        """
+        Open a read-only cursor on the replica, checking its lag at most every few seconds.
+
+        Returns:
+            Cursor: the replica cursor, or None when the replica is unreachable or lagging
+        """
+        with _REPLICA_STATE_LOCK:
+            state = _REPLICA_STATE.get(dsn)
+        checked = state and state[0] > time.monotonic()
+        if checked and not state[1]:
+            return None
+
+        cr = None
+        try:
+            cr = db_connect(dsn, allow_uri=True).cursor()
+            cr.execute("SET TRANSACTION READ ONLY")
+            if not checked:
+                cr.execute("""
+                    SELECT CASE
+                               WHEN NOT pg_is_in_recovery() THEN 0
+                               WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                               ELSE COALESCE(
+                                   EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8,
+                                   'infinity'::float8
+                               )
+                           END
+                """)
+                lag = cr.fetchone()[0]
+        except Exception as e:
+            _logger.warning(f"MQTT read replica unavailable, reading from the primary: {e}")
+            if cr is not None:
+                cr.close()
+            self._remember_replica(dsn, False)
+            return None
+
+        if not checked:
+            usable = lag <= max_lag
+            self._remember_replica(dsn, usable)
+            if not usable:
+                _logger.warning(f"MQTT read replica is {lag:.1f}s behind (limit {max_lag}s), reading from the primary")
+                cr.close()
+                return None
+        return cr
+
+    @api.model
+    def _remember_replica(self, dsn, usable):
+        """Cache whether the replica may be used for the next few seconds."""
+        with _REPLICA_STATE_LOCK:
+            _REPLICA_STATE[dsn] = (time.monotonic() + _REPLICA_CHECK_TTL, usable)
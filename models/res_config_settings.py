@@ -22,6 +22,17 @@ class ResConfigSettings(models.TransientModel):
         default=3000,
         help="Port number used to connect to the MQTT API server (default is 3000)"
     )
+    mqtt_api_wire_format = fields.Selection(
+        selection=[
+            ('auto', 'Negotiate (compact when supported)'),
+            ('json', 'JSON only'),
+        ],
+        string="Wire Format",
+        config_parameter="mqtt_integration.mqtt_api_wire_format",
+        default='auto',
+        help="Negotiate the compact bitfield format with gzip bodies with each API endpoint, "
+             "or always use the legacy JSON format"
+    )
     mqtt_api_authentication_enabled = fields.Boolean(
         string="Enable Authentication",
         config_parameter="mqtt_integration.mqtt_api_authentication_enabled",
@@ -33,3 +44,98 @@ class ResConfigSettings(models.TransientModel):
         config_parameter="mqtt_integration.mqtt_api_authentication_password",
         help="Password for authenticating with the MQTT API server"
     )
+    mqtt_api_circuit_failure_threshold = fields.Integer(
+        string="Circuit Failure Threshold",
+        config_parameter="mqtt_integration.mqtt_api_circuit_failure_threshold",
+        default=5,
+        help="Consecutive failed API calls after which calls fail fast instead of waiting for the timeout"
+    )
+    mqtt_api_circuit_reset_timeout = fields.Integer(
+        string="Circuit Reset Timeout",
+        config_parameter="mqtt_integration.mqtt_api_circuit_reset_timeout",
+        default=30,
+        help="Seconds to wait before a single probe call is allowed through an open circuit"
+    )
+    mqtt_api_hedge_requests = fields.Boolean(
+        string="Hedge Slow API Calls",
+        config_parameter="mqtt_integration.mqtt_api_hedge_requests",
+        default=False,
+        help="Send task deletions a second time when they take longer than the endpoint's recent 95th percentile latency"
+    )
+    mqtt_dispatch_concurrency = fields.Integer(
+        string="Parallel API Calls",
+        config_parameter="mqtt_integration.mqtt_dispatch_concurrency",
+        default=8,
+        help="API calls sent at once when several productions are started or stopped together; 1 sends them one by one"
+    )
+    mqtt_retention_enabled = fields.Boolean(
+        string="Enable History Retention",
+        config_parameter="mqtt_integration.mqtt_retention_enabled",
+        default=False,
+        help="Roll up finished MQTT tasks into hourly robot statistics and archive old MQTT detail"
+    )
+    mqtt_retention_event_days = fields.Integer(
+        string="Event Retention (days)",
+        config_parameter="mqtt_integration.mqtt_retention_event_days",
+        default=30,
+        help="Days to keep rolled-up task events and telemetry before deleting them"
+    )
+    mqtt_retention_archive_days = fields.Integer(
+        string="Archive After (days)",
+        config_parameter="mqtt_integration.mqtt_retention_archive_days",
+        default=90,
+        help="Days after which the MQTT detail of finished productions moves to the archive table"
+    )
+    mqtt_robot_stale_after = fields.Integer(
+        string="Robot Offline After (s)",
+        config_parameter="mqtt_integration.mqtt_robot_stale_after",
+        default=0,
+        help="Seconds without heartbeat after which a robot is considered offline and receives no tasks; 0 disables liveness checks"
+    )
+    mqtt_schedule_deadlines = fields.Boolean(
+        string="Deadline Scheduling",
+        config_parameter="mqtt_integration.mqtt_schedule_deadlines",
+        default=False,
+        help="Assign productions to the robot expected to finish them soonest, send waiting productions earliest deadline first and predict completion times"
+    )
+    mqtt_coalesce_window = fields.Integer(
+        string="Coalescing Window (s)",
+        config_parameter="mqtt_integration.mqtt_coalesce_window",
+        default=0,
+        help="Seconds to collect productions with the same topic and payload into one robot task; 0 disables coalescing"
+    )
+    mqtt_coalesce_max_units = fields.Integer(
+        string="Max Productions per Job",
+        config_parameter="mqtt_integration.mqtt_coalesce_max_units",
+        default=10,
+        help="Maximum number of productions sent to a robot as one coalesced task"
+    )
+    mqtt_pipeline_lookahead = fields.Integer(
+        string="Pipeline Lookahead",
+        config_parameter="mqtt_integration.mqtt_pipeline_lookahead",
+        default=0,
+        help="Tasks staged in the API behind the running one per robot; further productions and unit tasks wait in Odoo and are sent as robots finish. 0 sends every production at once"
+    )
+    mqtt_profile_sample_rate = fields.Float(
+        string="Profiling Sample Rate",
+        config_parameter="mqtt_integration.mqtt_profile_sample_rate",
+        default=0.0,
+        help="Share of callbacks and dispatches to profile, between 0 (disabled) and 1 (all)"
+    )
+    mqtt_profile_max_rows = fields.Integer(
+        string="Profiles Kept",
+        config_parameter="mqtt_integration.mqtt_profile_max_rows",
+        default=1000,
+        help="Maximum number of request profiles stored; the oldest are deleted first"
+    )
+    mqtt_replica_dsn = fields.Char(
+        string="Read Replica DSN",
+        config_parameter="mqtt_integration.mqtt_replica_dsn",
+        help="PostgreSQL URI of a read-only replica of this database, e.g. postgresql://odoo@replica:5432/odoo, used for the health check and read-only reporting queries"
+    )
+    mqtt_replica_max_lag = fields.Integer(
+        string="Replica Max Lag (s)",
+        config_parameter="mqtt_integration.mqtt_replica_max_lag",
+        default=10,
+        help="Reads fall back to the primary while the replica is further behind than this"
+    )
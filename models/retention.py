@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+
+class MqttRetention(models.AbstractModel):
+    _name = "mqtt_integration.retention"
+    _description = "MQTT History Retention"
+
+    # ===========================
+    # CONFIGURATION METHODS
+    # ===========================
+
+    @api.model
+    def _get_retention_settings(self):
+        """Return (enabled, event retention days, archive after days) from configuration."""
+        config = self.env['ir.config_parameter'].sudo()
+        enabled = config.get_param('mqtt_integration.mqtt_retention_enabled', 'False') == 'True'
+        event_days = int(config.get_param('mqtt_integration.mqtt_retention_event_days', 30) or 30)
+        archive_days = int(config.get_param('mqtt_integration.mqtt_retention_archive_days', 90) or 90)
+        return enabled, max(event_days, 1), max(archive_days, 1)
+
+    # ===========================
+    # CRON METHODS
+    # ===========================
+
+    @api.model
+    def _cron_run_retention(self, chunk_size=1000, time_budget=300):
+        """
+        Roll up finished tasks, archive old MQTT detail and purge expired history.
+
+        Every step works in chunks committed one by one and uses SKIP LOCKED,
+        so it never blocks the callback path and resumes where it stopped
+        when the time budget runs out.
+        """
+        enabled, event_days, archive_days = self._get_retention_settings()
+        if not enabled:
+            return
+
+        deadline = time.monotonic() + time_budget
+        now = fields.Datetime.now()
+        steps = [
+            lambda: self._rollup_chunk(chunk_size),
+            lambda: self._archive_chunk(now - timedelta(days=archive_days), chunk_size),
+            lambda: self._purge_chunk('mqtt_integration_task_event', 'finished_at',
+                                      now - timedelta(days=event_days), chunk_size, 'rolled_up'),
+            lambda: self._purge_chunk('mqtt_integration_telemetry', 'event_time',
+                                      now - timedelta(days=event_days), chunk_size),
+            lambda: self._purge_chunk('mqtt_integration_telemetry_latest', 'last_event_at',
+                                      now - timedelta(days=event_days), chunk_size),
+        ]
+        for step in steps:
+            while time.monotonic() < deadline:
+                processed = step()
+                self.env.cr.commit()
+                if processed < chunk_size:
+                    break
+            else:
+                self.env.ref('mqtt_integration.ir_cron_mqtt_retention')._trigger()
+                return
+
+    # ===========================
+    # CHUNK METHODS
+    # ===========================
+
+    @api.model
+    def _rollup_chunk(self, chunk_size):
+        """
+        Aggregate finished task events of past hours into hourly robot statistics.
+
+        Returns:
+            int: number of events rolled up
+        """
+        cr = self.env.cr
+        cr.execute("""
+            SELECT id
+              FROM mqtt_integration_task_event
+             WHERE rolled_up IS NOT TRUE
+               AND finished_at < date_trunc('hour', now() at time zone 'utc')
+             ORDER BY id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, (chunk_size,))
+        event_ids = [row[0] for row in cr.fetchall()]
+        if not event_ids:
+            return 0
+
+        cr.execute("""
+            INSERT INTO mqtt_integration_robot_stat_hourly AS s
+                   (robot_id, workcenter_id, hour, task_count, done_count, failed_count,
+                    cycle_time_total, queue_wait_total, queue_wait_count)
+            SELECT robot_id,
+                   workcenter_id,
+                   date_trunc('hour', finished_at),
+                   count(*),
+                   count(*) FILTER (WHERE status = 'done'),
+                   count(*) FILTER (WHERE status = 'failed'),
+                   COALESCE(SUM(EXTRACT(EPOCH FROM finished_at - COALESCE(started_at, dispatched_at))), 0),
+                   COALESCE(SUM(EXTRACT(EPOCH FROM started_at - dispatched_at)), 0),
+                   count(*) FILTER (WHERE started_at IS NOT NULL AND dispatched_at IS NOT NULL)
+              FROM mqtt_integration_task_event
+             WHERE id = ANY(%s)
+             GROUP BY 1, 2, 3
+            ON CONFLICT ((COALESCE(robot_id, 0)), (COALESCE(workcenter_id, 0)), hour) DO UPDATE
+               SET task_count = s.task_count + EXCLUDED.task_count,
+                   done_count = s.done_count + EXCLUDED.done_count,
+                   failed_count = s.failed_count + EXCLUDED.failed_count,
+                   cycle_time_total = s.cycle_time_total + EXCLUDED.cycle_time_total,
+                   queue_wait_total = s.queue_wait_total + EXCLUDED.queue_wait_total,
+                   queue_wait_count = s.queue_wait_count + EXCLUDED.queue_wait_count
+        """, (event_ids,))
+        cr.execute(
+            "UPDATE mqtt_integration_task_event SET rolled_up = TRUE WHERE id = ANY(%s)",
+            (event_ids,)
+        )
+        _logger.info(f"Rolled up {len(event_ids)} MQTT task events into hourly robot statistics")
+        return len(event_ids)
+
+    @api.model
+    def _archive_chunk(self, cutoff, chunk_size):
+        """
+        Move the MQTT detail of old finished productions to the archive table.
+
+        The production rows themselves stay, as stock moves and work orders
+        reference them; their MQTT columns are cleared and the unit tasks of
+        split productions are deleted. Candidates are read oldest first from
+        a partial index covering only productions not archived yet, so the
+        cost does not grow with the archived history.
+
+        Returns:
+            int: number of productions archived
+        """
+        cr = self.env.cr
+        cr.execute("""
+            SELECT id
+              FROM mrp_production
+             WHERE state IN ('done', 'cancel')
+               AND mqtt_task_id IS NOT NULL
+               AND write_date < %s
+             ORDER BY write_date, id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, (cutoff, chunk_size))
+        production_ids = [row[0] for row in cr.fetchall()]
+        if not production_ids:
+            return 0
+
+        cr.execute("""
+            INSERT INTO mqtt_integration_production_archive
+                   (production_id, task_id, binary_payload, robot_id, api_base_url, dispatched_at,
+                    unit_count, archived_at)
+            SELECT p.id, p.mqtt_task_id, p.mqtt_binary_payload, p.selected_robot_id, p.mqtt_api_base_url,
+                   p.mqtt_dispatched_at,
+                   (SELECT count(*) FROM mqtt_integration_production_unit u WHERE u.production_id = p.id),
+                   now() at time zone 'utc'
+              FROM mrp_production p
+             WHERE p.id = ANY(%s)
+            ON CONFLICT (production_id) DO NOTHING
+        """, (production_ids,))
+        cr.execute(
+            "DELETE FROM mqtt_integration_production_unit WHERE production_id = ANY(%s)",
+            (production_ids,)
+        )
+        cr.execute("""
+            UPDATE mrp_production
+               SET mqtt_task_id = NULL,
+                   mqtt_binary_payload = NULL,
+                   selected_robot_id = NULL,
+                   mqtt_api_base_url = NULL,
+                   mqtt_dispatched_at = NULL
+             WHERE id = ANY(%s)
+        """, (production_ids,))
+        self.env['mrp.production'].invalidate_model([
+            'mqtt_task_id', 'mqtt_binary_payload', 'selected_robot_id',
+            'mqtt_api_base_url', 'mqtt_dispatched_at',
+        ])
+        self.env['mqtt_integration.production.unit'].invalidate_model()
+        _logger.info(f"Archived MQTT detail of {len(production_ids)} productions")
+        return len(production_ids)
+
+    @api.model
+    def _purge_chunk(self, table, date_column, cutoff, chunk_size, flag_column=None):
+        """
+        Delete one chunk of expired rows from a history table.
+
+        Returns:
+            int: number of rows deleted
+        """
+        flag_clause = f"AND {flag_column} IS TRUE" if flag_column else ""
+        self.env.cr.execute(f"""
+            DELETE FROM {table}
+             WHERE id IN (
+                SELECT id
+                  FROM {table}
+                 WHERE {date_column} < %s {flag_clause}
+                 LIMIT %s
+                   FOR UPDATE SKIP LOCKED
+             )
+        """, (cutoff, chunk_size))
+        return self.env.cr.rowcount
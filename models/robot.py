@@ -1,6 +1,20 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields
+from datetime import timedelta
+
+from psycopg2.extras import execute_values
+
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+
+from ..tools.wire_format import pack_payload
+
+# First key of the transaction-level advisory locks serializing dispatch per robot.
+PIPELINE_LOCK_KEY = 1297437776
+# Delay before robots whose pipeline was locked by another transaction are topped up again.
+PIPELINE_RETRY_SECONDS = 5
+# A heartbeat only rewrites the robot row when the stored one is at least this old.
+HEARTBEAT_MIN_INTERVAL = 5
 
 
 class MqttRobot(models.Model):
@@ -15,6 +29,7 @@ class MqttRobot(models.Model):
     identifier = fields.Char(
         string="Robot Identifier",
         required=True,
+        index=True,
         help="Unique identifier used for MQTT communication"
     )
     name = fields.Char(
@@ -26,5 +41,454 @@ class MqttRobot(models.Model):
         comodel_name='mrp.workcenter',
         string="Work Center",
         ondelete='cascade',
+        index=True,
         help="Work center where this robot is assigned"
-    )
\ No newline at end of file
+    )
+    capability_binary = fields.Char(
+        string="Capabilities",
+        help="Materials the robot can process, in the binary format of the material products. Leave empty for all materials"
+    )
+    capability_mask = fields.Integer(
+        string="Capability Mask",
+        compute='_compute_capability_mask',
+        store=True,
+        help="Integer form of the capabilities matched against production payloads; -1 accepts every payload"
+    )
+    active = fields.Boolean(
+        string="Active",
+        default=True,
+        help="Retired robots are archived and no longer offered for MQTT processing"
+    )
+    last_seen = fields.Datetime(
+        string="Last Seen",
+        readonly=True,
+        index=True,
+        help="Last heartbeat received from the robot"
+    )
+    scheduled_at = fields.Datetime(
+        string="Scheduled At",
+        readonly=True,
+        help="When the predicted completions of the robot's backlog were last computed"
+    )
+    predicted_free_at = fields.Datetime(
+        string="Predicted Free At",
+        readonly=True,
+        help="When the robot is expected to finish its backlog, as of the last scheduling run"
+    )
+
+    _sql_constraints = [
+        ('identifier_unique', 'unique(identifier)', 'The robot identifier must be unique.'),
+    ]
+
+    # ===========================
+    # COMPUTED FIELDS
+    # ===========================
+
+    @api.depends('capability_binary')
+    def _compute_capability_mask(self):
+        """Pack the capabilities into an integer aligned with the production payloads."""
+        for robot in self:
+            robot.capability_mask = self._get_capability_mask(robot.capability_binary)
+
+    @api.model
+    def _get_capability_mask(self, capability_binary):
+        """Return the mask of a capability string, -1 when empty."""
+        capability_binary = (capability_binary or '').strip()
+        if not capability_binary:
+            return -1
+        return pack_payload(capability_binary.zfill(6)[-6:])[0]
+
+    # ===========================
+    # CONSTRAINTS
+    # ===========================
+
+    @api.constrains('capability_binary')
+    def _check_capability_binary(self):
+        """Ensure capabilities are written with binary digits only."""
+        for robot in self:
+            if robot.capability_binary and set(robot.capability_binary.strip()) - {'0', '1'}:
+                raise ValidationError('Robot capabilities may only contain 0 and 1.')
+
+    # ===========================
+    # CAPABILITY METHODS
+    # ===========================
+
+    def _filter_capable(self, binary_payload, live=False):
+        """
+        Return the robots able to process every material of a payload, optionally only the live ones.
+
+        A robot qualifies when its mask covers all bits of the payload; the
+        match is one bitwise filter on the stored mask.
+        """
+        if not self:
+            return self
+        mask = pack_payload(binary_payload)[0]
+        stale_after = self._get_stale_after() if live else 0
+        cutoff = fields.Datetime.now() - timedelta(seconds=stale_after) if stale_after else None
+        self.flush_model(['capability_mask', 'last_seen'])
+        self.env.cr.execute(f"""
+            SELECT id
+              FROM {self._table}
+             WHERE id = ANY(%s)
+               AND COALESCE(capability_mask, -1) & %s = %s
+               AND (%s::timestamp IS NULL OR last_seen >= %s)
+             ORDER BY id
+        """, (self.ids, mask, mask, cutoff, cutoff))
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    def _auto_select(self, binary_payload):
+        """Return the live robot able to process the payload with the fewest tasks in the API and waiting, if any."""
+        robots = self._filter_capable(binary_payload, live=True)
+        if not robots:
+            return robots
+        load = robots._get_pipeline_load()
+        return min(robots, key=lambda robot: (sum(load.get(robot.id, (0, 0))), robot.id))
+
+    # ===========================
+    # LIVENESS METHODS
+    # ===========================
+
+    @api.model
+    def _get_stale_after(self):
+        """Return the seconds without heartbeat after which a robot is offline; 0 disables liveness checks."""
+        config = self.env['ir.config_parameter'].sudo()
+        return max(int(config.get_param('mqtt_integration.mqtt_robot_stale_after', 0) or 0), 0)
+
+    def _filter_live(self):
+        """Return the robots that sent a heartbeat recently enough, or all of them when liveness checks are disabled."""
+        stale_after = self._get_stale_after()
+        if not stale_after or not self:
+            return self
+        cutoff = fields.Datetime.now() - timedelta(seconds=stale_after)
+        return self.search([('id', 'in', self.ids), ('last_seen', '>=', cutoff)])
+
+    @api.model
+    def _record_heartbeats(self, identifiers):
+        """
+        Store the heartbeats of a request with one UPDATE.
+        
+        Robots whose last heartbeat was stored less than
+        ``HEARTBEAT_MIN_INTERVAL`` seconds ago are not written again, so
+        frequent heartbeats do not churn the robot rows.
+        
+        Args:
+            identifiers (list): identifiers of the robots that are alive
+        
+        Returns:
+            int: number of robots updated
+        """
+        if not identifiers:
+            return 0
+        now = fields.Datetime.now()
+        self.flush_model(['last_seen'])
+        updated = execute_values(self.env.cr._obj, f"""
+            UPDATE {self._table} AS r
+               SET last_seen = v.seen
+              FROM (VALUES %s) AS v(identifier, seen)
+             WHERE r.identifier = v.identifier
+               AND (r.last_seen IS NULL OR r.last_seen <= v.seen - interval '{HEARTBEAT_MIN_INTERVAL} seconds')
+            RETURNING r.id
+        """, [(identifier, now) for identifier in set(identifiers)],
+            template='(%s, %s::timestamp)', page_size=1000, fetch=True)
+        self.invalidate_model(['last_seen'])
+        return len(updated)
+
+    # ===========================
+    # PIPELINE METHODS
+    # ===========================
+
+    @api.model
+    def _get_pipeline_lookahead(self):
+        """Return how many tasks are staged in the API behind the running one per robot; 0 disables pipelining."""
+        config = self.env['ir.config_parameter'].sudo()
+        return max(int(config.get_param('mqtt_integration.mqtt_pipeline_lookahead', 0) or 0), 0)
+
+    def _lock_pipeline(self, wait=True):
+        """
+        Take the dispatch lock of the robot until the end of the transaction.
+
+        Advisory locks are used so heartbeats updating the robot row are not blocked.
+
+        Returns:
+            bool: False when ``wait`` is False and another transaction holds the lock
+        """
+        self.ensure_one()
+        if wait:
+            self.env.cr.execute("SELECT pg_advisory_xact_lock(%s, %s)", (PIPELINE_LOCK_KEY, self.id))
+            return True
+        self.env.cr.execute("SELECT pg_try_advisory_xact_lock(%s, %s)", (PIPELINE_LOCK_KEY, self.id))
+        return self.env.cr.fetchone()[0]
+
+    def _get_pipeline_load(self):
+        """
+        Count the tasks each robot holds in the API and the productions waiting for it.
+
+        Members of a coalesced job share one task and unit tasks count for
+        the robot they were assigned to; unit tasks not sent yet count as
+        waiting.
+
+        Returns:
+            dict: {robot id: (tasks in the API, productions waiting in Odoo)}
+        """
+        if not self:
+            return {}
+        self.env['mrp.production'].flush_model(['state', 'selected_robot_id', 'mqtt_task_id', 'mqtt_queued_at'])
+        self.env['mqtt_integration.production.unit'].flush_model(['state', 'robot_id', 'task_id'])
+        self.env.cr.execute("""
+            SELECT robot_id,
+                   count(DISTINCT task_id),
+                   count(*) FILTER (WHERE queued)
+              FROM (
+                    SELECT p.selected_robot_id AS robot_id, p.mqtt_task_id AS task_id,
+                           p.mqtt_queued_at IS NOT NULL AS queued
+                      FROM mrp_production p
+                     WHERE p.state = 'mqtt_processing'
+                       AND p.selected_robot_id = ANY(%s)
+                       AND NOT EXISTS (
+                           SELECT 1 FROM mqtt_integration_production_unit u WHERE u.production_id = p.id
+                       )
+                    UNION ALL
+                    SELECT u.robot_id, u.task_id, u.state = 'waiting'
+                      FROM mqtt_integration_production_unit u
+                     WHERE u.state IN ('processing', 'waiting')
+                       AND u.robot_id = ANY(%s)
+                   ) AS load
+             GROUP BY robot_id
+        """, (self.ids, self.ids))
+        return {robot_id: (in_flight, queued) for robot_id, in_flight, queued in self.env.cr.fetchall()}
+
+    def _has_pipeline_slot(self, pending=0):
+        """
+        Return whether the robot takes one more task now, locking its pipeline until commit.
+        
+        Args:
+            pending (int): tasks for the robot about to be created in the same start
+        """
+        self.ensure_one()
+        lookahead = self._get_pipeline_lookahead()
+        if not lookahead:
+            return True
+        self._lock_pipeline()
+        in_flight, queued = self._get_pipeline_load().get(self.id, (0, 0))
+        return in_flight + pending <= lookahead and not queued
+
+    @api.model
+    def _request_top_up(self):
+        """Wake the pipeline cron when productions or unit tasks are waiting for a robot."""
+        if not self._get_pipeline_lookahead():
+            return
+        self.env['mrp.production'].flush_model(['state', 'mqtt_queued_at'])
+        self.env['mqtt_integration.production.unit'].flush_model(['state'])
+        self.env.cr.execute("""
+            SELECT 1
+              FROM mrp_production
+             WHERE mqtt_queued_at IS NOT NULL
+               AND state = 'mqtt_processing'
+            UNION ALL
+            SELECT 1
+              FROM mqtt_integration_production_unit
+             WHERE state = 'waiting'
+             LIMIT 1
+        """)
+        if self.env.cr.fetchone():
+            self.env.ref('mqtt_integration.ir_cron_mqtt_pipeline')._trigger()
+
+    @api.model
+    def _cron_top_up_pipelines(self):
+        """
+        Send waiting productions to their robots until each holds one running and ``lookahead`` staged tasks.
+
+        Robots are handled one by one, committing in between. Robots whose
+        dispatch lock is held by a starting production are retried shortly
+        after; waiting productions locked by another transaction are skipped.
+        When pipelining was switched off, all waiting productions are sent.
+        Waiting unit tasks of split productions, which already started, go
+        before waiting productions. With deadline scheduling, the earliest
+        deadline is sent first.
+        """
+        lookahead = self._get_pipeline_lookahead()
+        order = 'mqtt_queued_at, id'
+        if self.env['mqtt_integration.cycle.time']._get_schedule_enabled():
+            order = 'date_deadline NULLS LAST, mqtt_queued_at, id'
+        cr = self.env.cr
+        cr.execute("""
+            SELECT selected_robot_id
+              FROM mrp_production
+             WHERE mqtt_queued_at IS NOT NULL
+               AND state = 'mqtt_processing'
+            UNION
+            SELECT robot_id
+              FROM mqtt_integration_production_unit
+             WHERE state = 'waiting'
+               AND robot_id IS NOT NULL
+        """)
+        robots = self.browse([row[0] for row in cr.fetchall()])._filter_live()
+        retry = False
+        for robot in robots:
+            if not robot._lock_pipeline(wait=False):
+                retry = True
+                continue
+            in_flight, _queued = robot._get_pipeline_load().get(robot.id, (0, 0))
+            free = 1 + lookahead - in_flight if lookahead else None
+            if free is not None and free <= 0:
+                cr.commit()
+                continue
+            cr.execute("""
+                SELECT id
+                  FROM mqtt_integration_production_unit
+                 WHERE state = 'waiting'
+                   AND robot_id = %s
+                 ORDER BY production_id, sequence
+                 LIMIT %s
+                   FOR UPDATE SKIP LOCKED
+            """, (robot.id, free))
+            units = self.env['mqtt_integration.production.unit'].browse([row[0] for row in cr.fetchall()])
+            sent = 0
+            for unit in units:
+                if not unit.production_id._dispatch_waiting_unit(unit):
+                    break
+                sent += 1
+            if sent < len(units) or (free is not None and sent >= free):
+                cr.commit()
+                continue
+            if free is not None:
+                free -= sent
+            cr.execute(f"""
+                SELECT id
+                  FROM mrp_production
+                 WHERE mqtt_queued_at IS NOT NULL
+                   AND state = 'mqtt_processing'
+                   AND selected_robot_id = %s
+                 ORDER BY {order}
+                 LIMIT %s
+                   FOR UPDATE SKIP LOCKED
+            """, (robot.id, free))
+            for production in self.env['mrp.production'].browse([row[0] for row in cr.fetchall()]):
+                if not production._dispatch_queued():
+                    break
+            cr.commit()
+
+        if retry:
+            self.env.ref('mqtt_integration.ir_cron_mqtt_pipeline')._trigger(
+                at=fields.Datetime.now() + timedelta(seconds=PIPELINE_RETRY_SECONDS)
+            )
+
+    # ===========================
+    # FLEET METHODS
+    # ===========================
+
+    @api.model
+    def _bulk_upsert(self, robots):
+        """
+        Register, move or retire robots by identifier in one statement.
+
+        Each entry is a dict with ``identifier`` and optionally ``name``,
+        ``workcenter`` (id or code), ``active`` and ``capabilities``. Rows are
+        written with SQL so thousands of robots do not go through per-record
+        ORM writes. Fields omitted for an existing robot are left unchanged;
+        new robots default to their identifier as name and to active. A null
+        work center unassigns the robot and empty capabilities clear them.
+
+        Returns:
+            tuple: (created count, updated count, list of error messages)
+        """
+        errors = []
+        workcenter_ids = self._resolve_workcenters(robots)
+
+        rows = {}
+        for index, robot in enumerate(robots):
+            if not isinstance(robot, dict) or not str(robot.get('identifier') or '').strip():
+                errors.append(f"Robot {index}: missing identifier")
+                continue
+            identifier = str(robot['identifier']).strip()
+            workcenter = robot.get('workcenter')
+            workcenter_id = None
+            active = robot.get('active')
+            if workcenter not in (None, False, ''):
+                workcenter_id = workcenter_ids.get(str(workcenter))
+                if not workcenter_id:
+                    errors.append(f"Robot {identifier}: unknown work center '{workcenter}'")
+                    continue
+            capabilities = robot.get('capabilities')
+            if capabilities is not None:
+                capabilities = str(capabilities).strip()
+                if set(capabilities) - {'0', '1'}:
+                    errors.append(f"Robot {identifier}: capabilities may only contain 0 and 1")
+                    continue
+            # The last entry wins when an identifier is listed twice.
+            rows[identifier] = (
+                identifier,
+                str(robot['name']) if robot.get('name') else None,
+                workcenter_id,
+                'workcenter' in robot,
+                None if active is None else bool(active),
+                capabilities,
+                self._get_capability_mask(capabilities),
+            )
+
+        if not rows:
+            return 0, 0, errors
+
+        # New robots are inserted first; existing ones, including robots
+        # inserted concurrently, are then updated with only the fields sent.
+        self.flush_model()
+        uid = int(self.env.uid)
+        columns = "v(identifier, name, workcenter_id, workcenter_set, active, capability_binary, capability_mask)"
+        template = '(%s, %s, %s::int, %s::bool, %s::bool, %s, %s::int)'
+        inserted = execute_values(self.env.cr._obj, f"""
+            INSERT INTO {self._table}
+                   (identifier, name, workcenter_id, active, capability_binary, capability_mask,
+                    create_uid, write_uid, create_date, write_date)
+            SELECT v.identifier, COALESCE(v.name, v.identifier), v.workcenter_id, COALESCE(v.active, TRUE),
+                   v.capability_binary, v.capability_mask,
+                   {uid}, {uid}, now() at time zone 'utc', now() at time zone 'utc'
+              FROM (VALUES %s) AS {columns}
+            ON CONFLICT (identifier) DO NOTHING
+            RETURNING identifier
+        """, list(rows.values()), template=template, page_size=1000, fetch=True)
+        created = {identifier for (identifier,) in inserted}
+
+        existing = [row for identifier, row in rows.items() if identifier not in created]
+        updated = []
+        if existing:
+            updated = execute_values(self.env.cr._obj, f"""
+                UPDATE {self._table} AS r
+                   SET name = COALESCE(v.name, r.name),
+                       workcenter_id = CASE WHEN v.workcenter_set THEN v.workcenter_id ELSE r.workcenter_id END,
+                       active = COALESCE(v.active, r.active),
+                       capability_binary = COALESCE(v.capability_binary, r.capability_binary),
+                       capability_mask = CASE
+                           WHEN v.capability_binary IS NULL THEN r.capability_mask
+                           ELSE v.capability_mask
+                       END,
+                       write_uid = {uid},
+                       write_date = now() at time zone 'utc'
+                  FROM (VALUES %s) AS {columns}
+                 WHERE r.identifier = v.identifier
+             RETURNING r.id
+            """, existing, template=template, page_size=1000, fetch=True)
+        self.invalidate_model()
+        self.env['mrp.workcenter'].invalidate_model(['robot_ids'])
+        return len(created), len(updated), errors
+
+    @api.model
+    def _resolve_workcenters(self, robots):
+        """Return {reference: work center id} for the ids and codes referenced by the robots."""
+        references = {
+            str(robot['workcenter']) for robot in robots
+            if isinstance(robot, dict) and robot.get('workcenter') not in (None, False, '')
+        }
+        if not references:
+            return {}
+        numeric_ids = [int(reference) for reference in references if reference.isdigit()]
+        self.env.cr.execute("""
+            SELECT id, code
+              FROM mrp_workcenter
+             WHERE id = ANY(%s) OR code = ANY(%s)
+        """, (numeric_ids, list(references)))
+        mapping = {}
+        for workcenter_id, code in self.env.cr.fetchall():
+            if code:
+                mapping[code] = workcenter_id
+            mapping[str(workcenter_id)] = workcenter_id
+        return mapping
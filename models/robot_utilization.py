@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# Row ids pack the hour and both keys into 53 bits, so they stay exact in the
+# web client: 18 bits of hours counted from 2020-01-01, 18 bits of robot id
+# and 17 bits of work center id.
+ID_EPOCH_HOUR = 438288
+ID_ROBOT_SHIFT = 17
+ID_HOUR_SHIFT = 35
+
+
+class MqttRobotUtilization(models.Model):
+    _name = "mqtt_integration.robot.utilization"
+    _description = "MQTT Robot Utilization"
+    _auto = False
+    _order = 'hour desc'
+    _rec_name = 'robot_id'
+
+    # ===========================
+    # FIELDS
+    # ===========================
+
+    robot_id = fields.Many2one(
+        comodel_name='mqtt_integration.robot',
+        string="Robot",
+        readonly=True
+    )
+    workcenter_id = fields.Many2one(
+        comodel_name='mrp.workcenter',
+        string="Work Center",
+        readonly=True
+    )
+    hour = fields.Datetime(
+        string="Hour",
+        readonly=True
+    )
+    task_count = fields.Integer(
+        string="Throughput (tasks)",
+        readonly=True
+    )
+    done_count = fields.Integer(
+        string="Done",
+        readonly=True
+    )
+    failed_count = fields.Integer(
+        string="Failed",
+        readonly=True
+    )
+    busy_seconds = fields.Float(
+        string="Busy Time (s)",
+        readonly=True
+    )
+    utilization = fields.Float(
+        string="Utilization (%)",
+        readonly=True,
+        group_operator='avg',
+        help="Share of the hour the robot spent processing tasks"
+    )
+    avg_cycle_time = fields.Float(
+        string="Avg Cycle Time (s)",
+        readonly=True,
+        group_operator='avg'
+    )
+    avg_queue_wait = fields.Float(
+        string="Avg Queue Wait (s)",
+        readonly=True,
+        group_operator='avg',
+        help="Average time between dispatch and the first progress reported by the robot"
+    )
+    failure_rate = fields.Float(
+        string="Failure Rate (%)",
+        readonly=True,
+        group_operator='avg'
+    )
+
+    # ===========================
+    # VIEW METHODS
+    # ===========================
+
+    def init(self):
+        """
+        Create the materialized view over hourly rollups and not yet rolled-up task events.
+
+        Dashboards read this view only; it is refreshed concurrently by a cron
+        so readers are never blocked and ``mrp_production`` is never scanned.
+        Row ids are derived from the robot, work center and hour so they stay
+        the same across refreshes.
+        """
+        cr = self.env.cr
+        cr.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (self._table,))
+        row = cr.fetchone()
+        if row and row[0] == 'm':
+            cr.execute(f"DROP MATERIALIZED VIEW {self._table}")
+        elif row and row[0] == 'v':
+            cr.execute(f"DROP VIEW {self._table}")
+        cr.execute(f"""
+            CREATE MATERIALIZED VIEW {self._table} AS
+            WITH slots AS (
+                SELECT robot_id, workcenter_id, hour, task_count, done_count, failed_count,
+                       cycle_time_total, queue_wait_total, queue_wait_count
+                  FROM mqtt_integration_robot_stat_hourly
+                UNION ALL
+                SELECT robot_id,
+                       workcenter_id,
+                       date_trunc('hour', finished_at),
+                       1,
+                       (status = 'done')::int,
+                       (status = 'failed')::int,
+                       COALESCE(EXTRACT(EPOCH FROM finished_at - COALESCE(started_at, dispatched_at)), 0),
+                       COALESCE(EXTRACT(EPOCH FROM started_at - dispatched_at), 0),
+                       (started_at IS NOT NULL AND dispatched_at IS NOT NULL)::int
+                  FROM mqtt_integration_task_event
+                 WHERE rolled_up IS NOT TRUE
+            ), totals AS (
+                SELECT robot_id, workcenter_id, hour,
+                       SUM(task_count) AS task_count,
+                       SUM(done_count) AS done_count,
+                       SUM(failed_count) AS failed_count,
+                       SUM(cycle_time_total) AS busy_seconds,
+                       SUM(queue_wait_total) AS queue_wait_total,
+                       SUM(queue_wait_count) AS queue_wait_count
+                  FROM slots
+                 GROUP BY robot_id, workcenter_id, hour
+            )
+            SELECT (((EXTRACT(EPOCH FROM hour)::bigint / 3600 - {ID_EPOCH_HOUR}) << {ID_HOUR_SHIFT})
+                    | (COALESCE(robot_id, 0)::bigint << {ID_ROBOT_SHIFT})
+                    | COALESCE(workcenter_id, 0)) AS id,
+                   COALESCE(robot_id, 0) AS robot_key,
+                   COALESCE(workcenter_id, 0) AS workcenter_key,
+                   robot_id,
+                   workcenter_id,
+                   hour,
+                   task_count::int AS task_count,
+                   done_count::int AS done_count,
+                   failed_count::int AS failed_count,
+                   busy_seconds,
+                   LEAST(100.0, busy_seconds / 36.0) AS utilization,
+                   CASE WHEN task_count > 0 THEN busy_seconds / task_count ELSE 0 END AS avg_cycle_time,
+                   CASE WHEN queue_wait_count > 0 THEN queue_wait_total / queue_wait_count ELSE 0 END AS avg_queue_wait,
+                   CASE WHEN task_count > 0 THEN 100.0 * failed_count / task_count ELSE 0 END AS failure_rate
+              FROM totals
+        """)
+        cr.execute(f"""
+            CREATE UNIQUE INDEX {self._table}_slot_uniq
+                ON {self._table} (robot_key, workcenter_key, hour)
+        """)
+
+    @api.model
+    def _cron_refresh(self):
+        """Refresh the materialized view without blocking dashboard readers."""
+        self.env.cr.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {self._table}")
+        _logger.info("Refreshed MQTT robot utilization view")
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+
+
+class MqttTaskEvent(models.Model):
+    _name = "mqtt_integration.task.event"
+    _description = "MQTT Task Event"
+    _order = 'finished_at desc, id desc'
+    _log_access = False
+
+    # ===========================
+    # FIELDS
+    # ===========================
+
+    production_id = fields.Integer(
+        string="Production ID",
+        required=True,
+        index=True,
+        help="Production of the task; kept as a plain id so history survives the production"
+    )
+    task_id = fields.Char(
+        string="MQTT Task ID"
+    )
+    robot_id = fields.Many2one(
+        comodel_name='mqtt_integration.robot',
+        string="Robot",
+        ondelete='set null'
+    )
+    workcenter_id = fields.Many2one(
+        comodel_name='mrp.workcenter',
+        string="Work Center",
+        ondelete='set null'
+    )
+    binary_payload = fields.Char(
+        string="Binary Payload"
+    )
+    status = fields.Selection(
+        selection=[
+            ('done', 'Done'),
+            ('failed', 'Failed'),
+        ],
+        string="Status",
+        required=True
+    )
+    dispatched_at = fields.Datetime(
+        string="Dispatched At",
+        help="When the task was sent to the API"
+    )
+    started_at = fields.Datetime(
+        string="Started At",
+        help="First progress reported by the robot, if any"
+    )
+    finished_at = fields.Datetime(
+        string="Finished At",
+        required=True,
+        index=True
+    )
+    rolled_up = fields.Boolean(
+        string="Rolled Up",
+        index=True,
+        help="Already aggregated into the hourly robot statistics"
+    )
+
+    # ===========================
+    # METHODS
+    # ===========================
+
+    @api.model
+    def _record(self, production, status, unit=None):
+        """Append the outcome of the production's current task, or of one of its unit tasks."""
+        started = self.env['mqtt_integration.telemetry.latest'].sudo().search(
+            [('production_id', '=', production.id)], limit=1
+        )
+        self.sudo().create({
+            'production_id': production.id,
+            'task_id': unit.task_id if unit else production.mqtt_task_id,
+            'robot_id': unit.robot_id.id if unit else production.selected_robot_id.id,
+            'workcenter_id': production.workorder_ids[:1].workcenter_id.id,
+            'binary_payload': production.mqtt_binary_payload,
+            'status': status,
+            'dispatched_at': unit.dispatched_at if unit else production.mqtt_dispatched_at,
+            'started_at': started.first_event_at,
+            'finished_at': fields.Datetime.now(),
+        })
+
+
+class MqttRobotStatHourly(models.Model):
+    _name = "mqtt_integration.robot.stat.hourly"
+    _description = "MQTT Hourly Robot Statistics"
+    _order = 'hour desc'
+    _log_access = False
+
+    # ===========================
+    # FIELDS
+    # ===========================
+
+    robot_id = fields.Many2one(
+        comodel_name='mqtt_integration.robot',
+        string="Robot",
+        ondelete='set null'
+    )
+    workcenter_id = fields.Many2one(
+        comodel_name='mrp.workcenter',
+        string="Work Center",
+        ondelete='set null'
+    )
+    hour = fields.Datetime(
+        string="Hour",
+        required=True,
+        index=True
+    )
+    task_count = fields.Integer(
+        string="Tasks"
+    )
+    done_count = fields.Integer(
+        string="Done"
+    )
+    failed_count = fields.Integer(
+        string="Failed"
+    )
+    cycle_time_total = fields.Float(
+        string="Total Cycle Time (s)",
+        help="Sum of dispatch-or-start to finish durations"
+    )
+    queue_wait_total = fields.Float(
+        string="Total Queue Wait (s)",
+        help="Sum of dispatch to first progress durations"
+    )
+    queue_wait_count = fields.Integer(
+        string="Tasks With Queue Wait",
+        help="Tasks for which the robot reported progress"
+    )
+
+    def init(self):
+        """Unique slot per robot, work center and hour, tolerant to missing robot or work center."""
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS mqtt_integration_robot_stat_hourly_slot_uniq
+                ON mqtt_integration_robot_stat_hourly (COALESCE(robot_id, 0), COALESCE(workcenter_id, 0), hour)
+        """)
+
+
+class MqttProductionArchive(models.Model):
+    _name = "mqtt_integration.production.archive"
+    _description = "MQTT Production Archive"
+    _order = 'archived_at desc'
+    _log_access = False
+
+    # ===========================
+    # FIELDS
+    # ===========================
+
+    production_id = fields.Integer(
+        string="Production ID",
+        required=True
+    )
+    task_id = fields.Char(
+        string="MQTT Task ID"
+    )
+    binary_payload = fields.Char(
+        string="Binary Payload"
+    )
+    robot_id = fields.Many2one(
+        comodel_name='mqtt_integration.robot',
+        string="Robot",
+        ondelete='set null'
+    )
+    api_base_url = fields.Char(
+        string="MQTT API Endpoint"
+    )
+    dispatched_at = fields.Datetime(
+        string="Dispatched At"
+    )
+    unit_count = fields.Integer(
+        string="Unit Tasks",
+        help="Number of unit tasks of a split production, removed from the live table"
+    )
+    archived_at = fields.Datetime(
+        string="Archived At",
+        required=True
+    )
+
+    _sql_constraints = [
+        ('production_unique', 'unique(production_id)', 'A production can only be archived once.'),
+    ]
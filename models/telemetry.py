@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from datetime import datetime, timezone
+
+from psycopg2.extras import execute_values
+
+from odoo import models, fields, api
+from odoo.tools.sql import create_index
+
+_logger = logging.getLogger(__name__)
+
+EVENT_TYPES = ('progress', 'sensor')
+
+
+class MqttTelemetry(models.Model):
+    _name = "mqtt_integration.telemetry"
+    _description = "MQTT Robot Telemetry Event"
+    _order = 'event_time desc, id desc'
+    _log_access = False
+
+    # ===========================
+    # FIELDS
+    # ===========================
+
+    # Plain integer on purpose: a foreign key would take a share lock on the
+    # production row for every insert and contend with the status callbacks.
+    production_id = fields.Integer(
+        string="Production ID",
+        required=True,
+        index=True
+    )
+    event_type = fields.Selection(
+        selection=[
+            ('progress', 'Progress'),
+            ('sensor', 'Sensor'),
+        ],
+        string="Type",
+        required=True
+    )
+    name = fields.Char(
+        string="Sensor",
+        help="Sensor name for sensor events"
+    )
+    value = fields.Float(
+        string="Value",
+        help="Progress percentage or sensor reading"
+    )
+    event_time = fields.Datetime(
+        string="Event Time",
+        required=True
+    )
+
+    def init(self):
+        """BRIN index on the append-only event time column."""
+        create_index(self.env.cr, 'mqtt_integration_telemetry_event_time_brin', self._table, ['event_time'], method='brin')
+
+    # ===========================
+    # INGESTION METHODS
+    # ===========================
+
+    @api.model
+    def _parse_event(self, event):
+        """
+        Normalize one raw telemetry event.
+
+        Returns:
+            tuple: (production_id, event_type, name, value, event_time) or None if invalid
+        """
+        if not isinstance(event, dict):
+            return None
+        try:
+            production_id = int(event.get('productionId'))
+            value = float(event.get('progress') if event.get('type') == 'progress' else event.get('value'))
+        except (TypeError, ValueError):
+            return None
+
+        event_type = event.get('type')
+        if event_type not in EVENT_TYPES or production_id <= 0:
+            return None
+        if event_type == 'sensor' and not event.get('name'):
+            return None
+
+        event_time = None
+        if event.get('timestamp'):
+            try:
+                event_time = datetime.fromisoformat(str(event['timestamp']).replace('Z', '+00:00'))
+            except ValueError:
+                return None
+            if event_time.tzinfo:
+                event_time = event_time.astimezone(timezone.utc).replace(tzinfo=None)
+        return (
+            production_id,
+            event_type,
+            str(event['name'])[:64] if event_type == 'sensor' else None,
+            value,
+            event_time or fields.Datetime.now(),
+        )
+
+    @api.model
+    def _ingest(self, events):
+        """
+        Append a batch of telemetry events with multi-row inserts.
+
+        Events go straight to SQL: no ORM records are created and no
+        production row is read or locked. The latest progress of every
+        production in the batch is upserted into the latest-progress table.
+
+        Returns:
+            tuple: (accepted count, rejected count)
+        """
+        rows = []
+        for event in events:
+            row = self._parse_event(event)
+            if row:
+                rows.append(row)
+        if not rows:
+            return 0, len(events)
+
+        cr = self.env.cr
+        execute_values(cr._obj, """
+            INSERT INTO mqtt_integration_telemetry (production_id, event_type, name, value, event_time)
+            VALUES %s
+        """, rows, page_size=1000)
+
+        latest = {}
+        for production_id, event_type, _name, value, event_time in rows:
+            if event_type != 'progress':
+                continue
+            first, last, progress = latest.get(production_id, (event_time, event_time, value))
+            latest[production_id] = (
+                min(first, event_time),
+                max(last, event_time),
+                value if event_time >= last else progress,
+            )
+        if latest:
+            self.env['mqtt_integration.telemetry.latest']._upsert(latest)
+
+        return len(rows), len(events) - len(rows)
+
+
+class MqttTelemetryLatest(models.Model):
+    _name = "mqtt_integration.telemetry.latest"
+    _description = "MQTT Latest Production Progress"
+    _log_access = False
+
+    # ===========================
+    # FIELDS
+    # ===========================
+
+    production_id = fields.Integer(
+        string="Production ID",
+        required=True
+    )
+    progress = fields.Float(
+        string="Progress"
+    )
+    first_event_at = fields.Datetime(
+        string="First Progress Event"
+    )
+    last_event_at = fields.Datetime(
+        string="Last Progress Event"
+    )
+
+    _sql_constraints = [
+        ('production_unique', 'unique(production_id)', 'Latest progress is tracked once per production.'),
+    ]
+
+    # ===========================
+    # METHODS
+    # ===========================
+
+    @api.model
+    def _upsert(self, latest):
+        """
+        Upsert the latest progress per production.
+
+        Args:
+            latest (dict): {production_id: (first event time, last event time, progress)}
+        """
+        rows = [
+            (production_id, progress, first, last)
+            for production_id, (first, last, progress) in sorted(latest.items())
+        ]
+        execute_values(self.env.cr._obj, """
+            INSERT INTO mqtt_integration_telemetry_latest AS t
+                   (production_id, progress, first_event_at, last_event_at)
+            VALUES %s
+            ON CONFLICT (production_id) DO UPDATE
+               SET progress = CASE WHEN EXCLUDED.last_event_at >= t.last_event_at
+                                   THEN EXCLUDED.progress ELSE t.progress END,
+                   first_event_at = LEAST(t.first_event_at, EXCLUDED.first_event_at),
+                   last_event_at = GREATEST(t.last_event_at, EXCLUDED.last_event_at)
+        """, rows, page_size=1000)
+
+    @api.model
+    def _get_progress(self, production_ids):
+        """
+        Return the latest progress of the given productions.
+
+        Read from the replica when one is configured, since it is only displayed.
+
+        Returns:
+            dict: {production_id: progress}
+        """
+        if not production_ids:
+            return {}
+        with self.env['mqtt_integration.replica']._read_cursor() as (cr, _source):
+            cr.execute(
+                "SELECT production_id, progress FROM mqtt_integration_telemetry_latest WHERE production_id = ANY(%s)",
+                (list(production_ids),)
+            )
+            return dict(cr.fetchall())
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Load generator for the /mqtt-integration/update-production-status endpoint.
+
+Seeds manufacturing orders in the ``mqtt_processing`` state through XML-RPC and
+then fires concurrent ``done``/``failed`` callbacks at them, mimicking the Node
+API with configurable duplicate and out-of-order rates.
+
+Example:
+    python load_test_status_update.py --url http://localhost:8069 --db odoo \\
+        --user admin --password admin --product-id 42 \\
+        --productions 500 --concurrency 16 --duplicate-rate 0.1
+"""
+
+import argparse
+import math
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+import xmlrpc.client
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+STATUS_ENDPOINT = '/mqtt-integration/update-production-status'
+
+# Messages returned by MQTTAPIController, used to classify responses.
+OUTCOMES = {
+    'Production status updated successfully': 'updated',
+    'Production already completed': 'already_done',
+    'Production already failed/cancelled': 'already_failed',
+    'Production update already in progress': 'lock_conflict',
+    'Task ID mismatch': 'task_mismatch',
+}
+
+
+# ===========================
+# SEEDING
+# ===========================
+
+class OdooRPC:
+    """Minimal XML-RPC client used to seed and inspect productions."""
+
+    def __init__(self, url, db, user, password):
+        self.db = db
+        self.password = password
+        common = xmlrpc.client.ServerProxy(f"{url}/xmlrpc/2/common")
+        self.uid = common.authenticate(db, user, password, {})
+        if not self.uid:
+            raise SystemExit(f"Authentication failed for user '{user}' on database '{db}'")
+        self.models = xmlrpc.client.ServerProxy(f"{url}/xmlrpc/2/object", allow_none=True)
+
+    def call(self, model, method, *args, **kwargs):
+        return self.models.execute_kw(self.db, self.uid, self.password, model, method, list(args), kwargs)
+
+
+def seed_productions(rpc, product_id, count, batch_size=100):
+    """Create productions and put them in mqtt_processing with a fresh task id."""
+    seeded = {}
+    for offset in range(0, count, batch_size):
+        size = min(batch_size, count - offset)
+        vals_list = [{'product_id': product_id, 'product_qty': 1.0} for _ in range(size)]
+        production_ids = rpc.call('mrp.production', 'create', vals_list)
+        for production_id in production_ids:
+            task_id = str(uuid.uuid4())
+            rpc.call('mrp.production', 'write', [production_id], {
+                'state': 'mqtt_processing',
+                'mqtt_task_id': task_id,
+            })
+            seeded[production_id] = task_id
+        print(f"Seeded {len(seeded)}/{count} productions", file=sys.stderr)
+    return seeded
+
+
+# ===========================
+# WORKLOAD
+# ===========================
+
+def build_events(seeded, failure_rate, duplicate_rate, out_of_order_rate, rng):
+    """
+    Build the callback sequence for the seeded productions.
+
+    Every production gets one primary event. Duplicates are placed right after
+    their original so that they race for the row lock; out-of-order events carry
+    the opposite status and are placed before the primary one.
+
+    Returns:
+        list: dicts with production id, task id, status and event kind
+    """
+    events = []
+    for production_id, task_id in seeded.items():
+        status = 'failed' if rng.random() < failure_rate else 'done'
+        primary = {'productionId': production_id, 'taskId': task_id, 'status': status, 'kind': 'primary'}
+
+        group = [primary]
+        if rng.random() < out_of_order_rate:
+            stale_status = 'done' if status == 'failed' else 'failed'
+            group.insert(0, dict(primary, status=stale_status, kind='out_of_order'))
+        if rng.random() < duplicate_rate:
+            group.append(dict(primary, kind='duplicate'))
+        events.append(group)
+
+    # Interleave productions while keeping each group contiguous.
+    rng.shuffle(events)
+    return [event for group in events for event in group]
+
+
+def send_event(session, url, headers, event, timeout):
+    """Send one callback and return (event, outcome, latency in seconds)."""
+    body = {
+        'productionId': event['productionId'],
+        'taskId': event['taskId'],
+        'status': event['status'],
+    }
+    started = time.perf_counter()
+    try:
+        response = session.post(url, json=body, headers=headers, timeout=timeout)
+        latency = time.perf_counter() - started
+        if response.status_code != 200:
+            return event, f'http_{response.status_code}', latency
+        message = response.json().get('message', '')
+        outcome = OUTCOMES.get(message, 'error')
+        return event, outcome, latency
+    except requests.exceptions.Timeout:
+        return event, 'timeout', time.perf_counter() - started
+    except requests.exceptions.RequestException:
+        return event, 'connection_error', time.perf_counter() - started
+
+
+def run_load(events, url, token, concurrency, timeout):
+    """Fire the events from a thread pool, one HTTP session per thread."""
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+
+    local = threading.local()
+
+    def worker(event):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        return send_event(local.session, url, headers, event, timeout)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, events))
+    return results, time.perf_counter() - started
+
+
+# ===========================
+# REPORTING
+# ===========================
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def report(results, elapsed, rpc, seeded):
+    latencies = sorted(latency for _event, _outcome, latency in results)
+    outcomes = Counter(outcome for _event, outcome, _latency in results)
+    primary_lost = sum(
+        1 for event, outcome, _latency in results
+        if event['kind'] == 'primary' and outcome == 'lock_conflict'
+    )
+
+    print("\n=== Status update load test ===")
+    print(f"Requests:          {len(results)}")
+    print(f"Elapsed:           {elapsed:.2f} s")
+    print(f"Throughput:        {len(results) / elapsed if elapsed else 0:.1f} req/s")
+    if latencies:
+        print(f"Latency mean:      {statistics.mean(latencies) * 1000:.1f} ms")
+        for pct in (50, 90, 95, 99):
+            print(f"Latency p{pct:<2}:       {percentile(latencies, pct) * 1000:.1f} ms")
+        print(f"Latency max:       {latencies[-1] * 1000:.1f} ms")
+
+    print("\nOutcomes:")
+    for outcome, count in sorted(outcomes.items(), key=lambda item: -item[1]):
+        print(f"  {outcome:<18} {count}")
+    print(f"\nPrimary updates answered 'already in progress': {primary_lost}")
+
+    if rpc and seeded:
+        stuck = rpc.call('mrp.production', 'search_count', [
+            ('id', 'in', list(seeded)), ('state', '=', 'mqtt_processing'),
+        ])
+        print(f"Productions still in mqtt_processing (lost updates): {stuck}")
+
+
+# ===========================
+# ENTRY POINT
+# ===========================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', default='http://localhost:8069', help="Odoo base URL")
+    parser.add_argument('--db', required=True, help="Database to seed productions in")
+    parser.add_argument('--user', default='admin', help="Login used for XML-RPC seeding")
+    parser.add_argument('--password', default='admin', help="Password used for XML-RPC seeding")
+    parser.add_argument('--token', default='', help="Bearer token sent with callbacks (if authentication is enabled)")
+    parser.add_argument('--product-id', type=int, required=True, help="product.product id of an MQTT action product with a BOM")
+    parser.add_argument('--productions', type=int, default=200, help="Number of productions to seed")
+    parser.add_argument('--concurrency', type=int, default=8, help="Number of concurrent callback senders")
+    parser.add_argument('--failure-rate', type=float, default=0.05, help="Share of productions reported as failed")
+    parser.add_argument('--duplicate-rate', type=float, default=0.10, help="Share of callbacks sent twice")
+    parser.add_argument('--out-of-order-rate', type=float, default=0.02, help="Share of productions receiving a stale opposite status first")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed for a reproducible workload")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+
+    rpc = OdooRPC(args.url, args.db, args.user, args.password)
+    seeded = seed_productions(rpc, args.product_id, args.productions)
+
+    events = build_events(seeded, args.failure_rate, args.duplicate_rate, args.out_of_order_rate, rng)
+    url = f"{args.url.rstrip('/')}{STATUS_ENDPOINT}?db={args.db}"
+    print(f"Firing {len(events)} callbacks with concurrency {args.concurrency}", file=sys.stderr)
+
+    results, elapsed = run_load(events, url, args.token, args.concurrency, args.timeout)
+    report(results, elapsed, rpc, seeded)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for the Node MQTT API and its robots, for capacity planning.
+
+Accepts tasks on /api/tasks exactly like the Node API, queues them per robot
+(the last segment of the MQTT topic) and, after a processing time drawn from
+the robot's latency distribution, calls back Odoo on
+/mqtt-integration/update-production-status with ``done`` or ``failed``.
+
+Point the addon's API host/port (or an API endpoint record) at the simulator.
+
+Example:
+    python robot_simulator.py --odoo-url http://localhost:8069 --db odoo \\
+        --port 3000 --speed 10 --config robots.json
+
+Example configuration (all keys optional, times in seconds):
+    {
+      "default": {"distribution": "lognormal", "mean": 30, "sigma": 0.25, "failure_rate": 0.02},
+      "robots": {
+        "robot1": {"distribution": "normal", "mean": 20, "stddev": 4},
+        "robot2": {"distribution": "exponential", "mean": 45, "failure_rate": 0.1}
+      }
+    }
+"""
+
+import argparse
+import gzip
+import json
+import math
+import queue
+import random
+import re
+import signal
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+STATUS_ENDPOINT = '/mqtt-integration/update-production-status'
+DEFAULT_PROFILE = {'distribution': 'lognormal', 'mean': 30.0, 'sigma': 0.25, 'failure_rate': 0.0}
+
+
+# ===========================
+# LATENCY DISTRIBUTIONS
+# ===========================
+
+def sample_latency(profile, rng):
+    """Draw one processing time in seconds from a robot profile."""
+    distribution = profile.get('distribution', 'lognormal')
+    mean = float(profile.get('mean', 30.0))
+
+    if distribution == 'fixed':
+        value = mean
+    elif distribution == 'uniform':
+        value = rng.uniform(float(profile.get('low', 0.5 * mean)), float(profile.get('high', 1.5 * mean)))
+    elif distribution == 'normal':
+        value = rng.gauss(mean, float(profile.get('stddev', 0.1 * mean)))
+    elif distribution == 'exponential':
+        value = rng.expovariate(1.0 / mean)
+    elif distribution == 'lognormal':
+        # Parametrized by the arithmetic mean so profiles stay readable.
+        sigma = float(profile.get('sigma', 0.25))
+        value = rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+    else:
+        raise ValueError(f"Unknown distribution '{distribution}'")
+    return max(value, 0.0)
+
+
+# ===========================
+# SIMULATED FLEET
+# ===========================
+
+class Task:
+    """A task accepted by the simulator."""
+
+    def __init__(self, production_id, topic, payload, priority, database=None):
+        self.id = str(uuid.uuid4())
+        self.production_id = production_id
+        self.database = database
+        self.topic = topic
+        self.robot = topic.rsplit('/', 1)[-1]
+        self.payload = payload
+        self.priority = priority
+        self.status = 'queued'
+        self.accepted_at = time.monotonic()
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'odooProductionId': str(self.production_id),
+            'mqttTopic': self.topic,
+            'binaryPayload': self.payload,
+            'priority': self.priority,
+            'status': self.status,
+        }
+
+
+class Fleet:
+    """Per-robot task queues processed by one worker thread per robot."""
+
+    def __init__(self, args, config):
+        self.args = args
+        self.default_profile = dict(DEFAULT_PROFILE, **config.get('default', {}))
+        if args.failure_rate is not None:
+            self.default_profile['failure_rate'] = args.failure_rate
+        self.robot_profiles = config.get('robots', {})
+        self.rng = random.Random(args.seed)
+        self.rng_lock = threading.Lock()
+
+        self.tasks = {}
+        self.queues = {}
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.callback_latencies = []
+        self.stopping = threading.Event()
+
+        self.callback_url = f"{args.odoo_url.rstrip('/')}{STATUS_ENDPOINT}"
+        self.callback_headers = {'Content-Type': 'application/json'}
+        if args.callback_token:
+            self.callback_headers['Authorization'] = f'Bearer {args.callback_token}'
+
+    def profile_for(self, robot):
+        return dict(self.default_profile, **self.robot_profiles.get(robot, {}))
+
+    def submit(self, task):
+        with self.lock:
+            self.tasks[task.id] = task
+            robot_queue = self.queues.get(task.robot)
+            if robot_queue is None:
+                robot_queue = self.queues[task.robot] = queue.Queue()
+                threading.Thread(target=self._robot_loop, args=(task.robot, robot_queue), daemon=True).start()
+        robot_queue.put(task)
+        self.stats['accepted'] += 1
+
+    def cancel(self, task_id):
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if not task or task.status in ('done', 'failed', 'cancelled'):
+                return False
+            task.status = 'cancelled'
+        self.stats['cancelled'] += 1
+        return True
+
+    def _robot_loop(self, robot, robot_queue):
+        """Process the robot's tasks one at a time, like a physical robot."""
+        session = requests.Session()
+        profile = self.profile_for(robot)
+        while not self.stopping.is_set():
+            try:
+                task = robot_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if task.status == 'cancelled':
+                continue
+
+            task.status = 'processing'
+            with self.rng_lock:
+                duration = sample_latency(profile, self.rng) / self.args.speed
+                failed = self.rng.random() < float(profile.get('failure_rate', 0.0))
+            if self.stopping.wait(duration):
+                return
+            if task.status == 'cancelled':
+                continue
+
+            task.status = 'failed' if failed else 'done'
+            self._callback(session, task)
+
+    def _callback(self, session, task):
+        """Report the task outcome to Odoo, retrying transient failures."""
+        body = {'productionId': task.production_id, 'taskId': task.id, 'status': task.status}
+        for attempt in range(self.args.callback_retries + 1):
+            started = time.perf_counter()
+            try:
+                response = session.post(self.callback_url, json=body, headers=self.callback_headers, timeout=30,
+                                        params={'db': task.database or self.args.db or None})
+                self.callback_latencies.append(time.perf_counter() - started)
+                result = response.json() if response.status_code == 200 else {}
+                if result.get('status') == 'success':
+                    self.stats[f'callback_{task.status}'] += 1
+                    return
+                self.stats['callback_rejected'] += 1
+                print(f"Callback for task {task.id} rejected: {result.get('message', response.status_code)}", file=sys.stderr)
+                return
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self.stats['callback_errors'] += 1
+                if attempt == self.args.callback_retries:
+                    print(f"Callback for task {task.id} failed: {e}", file=sys.stderr)
+                    return
+                time.sleep(min(2 ** attempt, 10))
+
+    def snapshot(self):
+        with self.lock:
+            depth = {robot: q.qsize() for robot, q in self.queues.items()}
+        latencies = sorted(self.callback_latencies[-10000:])
+        p95 = latencies[max(0, math.ceil(0.95 * len(latencies)) - 1)] if latencies else 0.0
+        return {
+            'stats': dict(self.stats),
+            'queue_depth': depth,
+            'callback_p95_ms': round(p95 * 1000, 1),
+        }
+
+
+# ===========================
+# HTTP API
+# ===========================
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    """HTTP handler mimicking the routes of the Node MQTT API used by the addon."""
+
+    fleet = None
+    token = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        if not self.token:
+            return True
+        if self.headers.get('Authorization') == f'Bearer {self.token}':
+            return True
+        self._send_json(401, {'error': 'Unauthorized'})
+        return False
+
+    def _read_json(self):
+        raw = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if (self.headers.get('Content-Encoding') or '').lower() == 'gzip':
+            raw = gzip.decompress(raw)
+        return json.loads(raw.decode('utf-8') or '{}')
+
+    def do_GET(self):
+        if self.path == '/api/capabilities':
+            self._send_json(200, {'formats': ['json', 'compact-v1'], 'encodings': ['gzip']})
+        elif self.path in ('/health', '/api/health'):
+            self._send_json(200, dict(self.fleet.snapshot(), status='healthy'))
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if self.path != '/api/tasks':
+            self._send_json(404, {'error': 'Not found'})
+            return
+        if not self._authorized():
+            return
+        try:
+            data = self._read_json()
+            if 'payload' in data:
+                bits = int(data.get('payloadBits', 6))
+                payload = format(int(data['payload']), 'b').zfill(bits)[-bits:] if bits else ''
+            else:
+                payload = data['binaryPayload']
+            task = Task(int(data['odooProductionId']), data['mqttTopic'], payload, data.get('priority', 'normal'),
+                        data.get('odooDatabase'))
+        except (KeyError, TypeError, ValueError, OSError) as e:
+            self._send_json(400, {'error': f'Invalid task: {e}'})
+            return
+        self.fleet.submit(task)
+        self._send_json(201, task.as_dict())
+
+    def do_DELETE(self):
+        match = re.fullmatch(r'/api/tasks/([\w-]+)', self.path)
+        if not match:
+            self._send_json(404, {'error': 'Not found'})
+            return
+        if not self._authorized():
+            return
+        if self.fleet.cancel(match.group(1)):
+            self._send_json(200, {'id': match.group(1), 'status': 'cancelled'})
+        else:
+            self._send_json(404, {'error': 'Task not found'})
+
+
+# ===========================
+# ENTRY POINT
+# ===========================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on")
+    parser.add_argument('--port', type=int, default=3000, help="Port to listen on (the addon defaults to 3000)")
+    parser.add_argument('--odoo-url', default='http://localhost:8069', help="Odoo base URL for callbacks")
+    parser.add_argument('--db', default='', help="Database passed with callbacks of tasks that do not name one")
+    parser.add_argument('--token', default='', help="Bearer token required from Odoo (API authentication)")
+    parser.add_argument('--callback-token', default='', help="Bearer token sent with callbacks to Odoo")
+    parser.add_argument('--config', help="JSON file with default and per-robot latency profiles")
+    parser.add_argument('--speed', type=float, default=1.0, help="Time compression factor, e.g. 10 replays a day in 2.4 h")
+    parser.add_argument('--failure-rate', type=float, default=None, help="Override the default failure rate")
+    parser.add_argument('--callback-retries', type=int, default=3, help="Retries for callbacks that cannot reach Odoo")
+    parser.add_argument('--report-interval', type=float, default=30.0, help="Seconds between progress reports (0 to disable)")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed for reproducible runs")
+    parser.add_argument('--verbose', action='store_true', help="Log every HTTP request")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.speed <= 0:
+        raise SystemExit("--speed must be positive")
+
+    config = {}
+    if args.config:
+        with open(args.config, encoding='utf-8') as config_file:
+            config = json.load(config_file)
+
+    fleet = Fleet(args, config)
+    handler = type('Handler', (SimulatorHandler,), {'fleet': fleet, 'token': args.token or None})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.verbose = args.verbose
+    server.daemon_threads = True
+
+    def shutdown(*_args):
+        fleet.stopping.set()
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    if args.report_interval > 0:
+        def report_loop():
+            while not fleet.stopping.wait(args.report_interval):
+                print(json.dumps(fleet.snapshot()), file=sys.stderr)
+        threading.Thread(target=report_loop, daemon=True).start()
+
+    print(f"Robot simulator listening on http://{args.host}:{args.port} (speed x{args.speed})", file=sys.stderr)
+    server.serve_forever()
+    print(json.dumps(fleet.snapshot(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Bounded thread pool sending independent HTTP calls to the MQTT API.
+
+Only the network round trips run in the pool: calls are fully prepared
+(URL, headers, body) by the caller, and the responses are handed back so
+that circuit bookkeeping and database writes happen in the calling
+transaction. Each pool thread keeps its own ``requests.Session`` so
+connections to an endpoint are reused across calls and batches.
+"""
+
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+# ``fallback`` is the (json, headers) pair resent when the endpoint rejects a compact body with 415.
+HttpCall = namedtuple('HttpCall', ['method', 'url', 'headers', 'json', 'data', 'timeout', 'fallback'])
+
+_local = threading.local()
+
+# Per-worker pool, recreated after a fork and grown when a larger concurrency is configured.
+_POOL = None
+_POOL_PID = None
+_POOL_SIZE = 0
+_POOL_LOCK = threading.Lock()
+
+
+def _session():
+    """Return the HTTP session of the current pool thread."""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+
+def _executor(concurrency):
+    """
+    Return the pool of this process, with at least ``concurrency`` threads.
+
+    A pool that is too small is replaced but never shut down: calls other
+    threads already submitted to it still run, and its threads exit once it
+    is no longer referenced. Callers bound their own calls in flight, so the
+    pool never needs to shrink.
+    """
+    global _POOL, _POOL_PID, _POOL_SIZE
+    size = max(concurrency, 2)
+    with _POOL_LOCK:
+        if _POOL_PID != os.getpid() or _POOL_SIZE < size:
+            _POOL = ThreadPoolExecutor(max_workers=size, thread_name_prefix='mqtt-dispatch')
+            _POOL_PID = os.getpid()
+            _POOL_SIZE = size
+        return _POOL
+
+
+def send(call):
+    """Send one call on the current thread; returns (response, whether the compact body was refused)."""
+    session = _session()
+    response = session.request(
+        call.method, call.url, json=call.json, data=call.data, headers=call.headers, timeout=call.timeout
+    )
+    if call.fallback is not None and response.status_code == 415:
+        json, headers = call.fallback
+        return session.request(call.method, call.url, json=json, headers=headers, timeout=call.timeout), True
+    return response, False
+
+
+def send_all(calls, concurrency):
+    """
+    Send the calls with at most ``concurrency`` in flight.
+
+    Returns:
+        list: one (response or ``requests`` exception, downgraded) pair per call, in order
+    """
+    executor = _executor(concurrency)
+    futures = []
+    in_flight = set()
+    for call in calls:
+        if len(in_flight) >= concurrency:
+            _done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+        future = executor.submit(send, call)
+        futures.append(future)
+        in_flight.add(future)
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except requests.exceptions.RequestException as e:
+            results.append((e, False))
+    return results
+
+
+def send_hedged(call, delay, concurrency):
+    """
+    Send an idempotent call, and a second copy when the first has not answered after ``delay`` seconds.
+
+    The first response wins; the slower copy is left to finish in the pool.
+    An error is only raised when both copies failed.
+
+    Returns:
+        tuple: (response, whether the compact body was refused, whether the call was hedged)
+    """
+    executor = _executor(concurrency)
+    futures = [executor.submit(send, call)]
+    done, _pending = wait(futures, timeout=delay)
+    if not done:
+        futures.append(executor.submit(send, call))
+
+    pending = set(futures)
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                response, downgraded = future.result()
+            except requests.exceptions.RequestException as e:
+                error = e
+                continue
+            return response, downgraded, len(futures) > 1
+    raise error
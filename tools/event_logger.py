@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Structured event logging for the MQTT hot paths.
+
+Events are emitted as ``event=<name> key=value ...`` lines on one child
+logger per category (``odoo.addons.mqtt_integration.events.<category>``),
+so levels can be tuned per category with Odoo's ``--log-handler``, e.g.
+``--log-handler=odoo.addons.mqtt_integration.events.callback:WARNING``.
+
+Formatting is lazy: nothing is rendered unless the record is emitted.
+High-volume success events can be sampled with the ``mqtt_log_sample_rate``
+server option (0.0 to 1.0, default 1.0); warnings and errors are never sampled.
+"""
+
+import logging
+import random
+
+from odoo.tools import config
+
+EVENT_LOGGER_NAME = 'odoo.addons.mqtt_integration.events'
+
+_sample_rate = None
+
+
+def _get_sample_rate():
+    """Read the sampling rate of success events from the server configuration once per worker."""
+    global _sample_rate
+    if _sample_rate is None:
+        try:
+            _sample_rate = min(max(float(config.get('mqtt_log_sample_rate') or 1.0), 0.0), 1.0)
+        except (TypeError, ValueError):
+            _sample_rate = 1.0
+    return _sample_rate
+
+
+class _EventFields:
+    """Key/value pairs rendered only when the log record is formatted."""
+
+    __slots__ = ('fields',)
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __str__(self):
+        return ' '.join(f'{key}={value}' for key, value in self.fields.items() if value is not None)
+
+
+class EventLogger:
+    """Category-aware structured logger with lazy formatting and sampling."""
+
+    def __init__(self, name=EVENT_LOGGER_NAME):
+        self.name = name
+        self._loggers = {}
+
+    def _get_logger(self, category):
+        logger = self._loggers.get(category)
+        if logger is None:
+            logger = self._loggers[category] = logging.getLogger(f'{self.name}.{category}')
+        return logger
+
+    def log(self, level, category, event, sampled=False, exc_info=False, **fields):
+        """
+        Emit one structured event.
+
+        Args:
+            level: logging level
+            category: child logger suffix, e.g. 'dispatch' or 'callback'
+            event: event name, e.g. 'task.created'
+            sampled: subject the event to the success sampling rate
+            exc_info: attach the current exception traceback
+            **fields: context of the event; pass ``task`` as the correlation id
+        """
+        logger = self._get_logger(category)
+        if not logger.isEnabledFor(level):
+            return
+        if sampled and level < logging.WARNING:
+            rate = _get_sample_rate()
+            if rate < 1.0 and random.random() >= rate:
+                return
+        logger.log(level, 'event=%s %s', event, _EventFields(fields), exc_info=exc_info)
+
+    def debug(self, category, event, **fields):
+        self.log(logging.DEBUG, category, event, **fields)
+
+    def info(self, category, event, **fields):
+        self.log(logging.INFO, category, event, **fields)
+
+    def warning(self, category, event, **fields):
+        self.log(logging.WARNING, category, event, **fields)
+
+    def error(self, category, event, **fields):
+        self.log(logging.ERROR, category, event, **fields)
+
+
+events = EventLogger()
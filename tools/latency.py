@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Per-endpoint latency tracking for the MQTT API client.
+
+Each worker keeps a sliding window of recent response times per API
+endpoint. Request timeouts are derived from the observed p99 and hedged
+requests are fired after the p95, so both follow the endpoint instead of a
+fixed constant. Until an endpoint has enough samples the fixed defaults
+apply and no request is hedged.
+"""
+
+import threading
+from collections import deque
+
+WINDOW = 512
+MIN_SAMPLES = 20
+DEFAULT_TIMEOUT = 10.0
+MIN_TIMEOUT = 1.0
+MAX_TIMEOUT = 30.0
+# Multiple of the p99 latency allowed before a call times out.
+TIMEOUT_FACTOR = 2.0
+
+
+class LatencyTracker:
+    """Sliding windows of response times, in seconds, keyed by endpoint."""
+
+    def __init__(self, window=WINDOW):
+        self._window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        """Add one response time; timed-out calls are recorded with their timeout."""
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self._window)
+            samples.append(seconds)
+
+    def percentiles(self, key):
+        """
+        Latency percentiles of an endpoint.
+
+        Returns:
+            dict: {0.5, 0.95, 0.99: seconds}, or None below ``MIN_SAMPLES`` samples
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return {
+            quantile: samples[min(int(quantile * len(samples)), len(samples) - 1)]
+            for quantile in (0.5, 0.95, 0.99)
+        }
+
+    def timeout(self, key):
+        """Return the timeout for the next call to an endpoint."""
+        percentiles = self.percentiles(key)
+        if not percentiles:
+            return DEFAULT_TIMEOUT
+        return min(max(percentiles[0.99] * TIMEOUT_FACTOR, MIN_TIMEOUT), MAX_TIMEOUT)
+
+    def hedge_delay(self, key):
+        """Return after how many seconds an idempotent call is sent a second time, or None."""
+        percentiles = self.percentiles(key)
+        return percentiles[0.95] if percentiles else None
+
+    def snapshot(self):
+        """
+        Percentiles and current timeout of every tracked endpoint.
+
+        Returns:
+            list: one dict per endpoint, in milliseconds except ``timeout_s``
+        """
+        with self._lock:
+            keys = list(self._samples)
+        snapshot = []
+        for key in sorted(keys):
+            percentiles = self.percentiles(key) or {}
+            snapshot.append({
+                'endpoint': key,
+                'samples': len(self._samples[key]),
+                'p50_ms': round(percentiles[0.5] * 1000, 1) if percentiles else None,
+                'p95_ms': round(percentiles[0.95] * 1000, 1) if percentiles else None,
+                'p99_ms': round(percentiles[0.99] * 1000, 1) if percentiles else None,
+                'timeout_s': round(self.timeout(key), 2),
+            })
+        return snapshot
+
+
+tracker = LatencyTracker()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Lightweight per-request profiling of the MQTT callback and dispatch paths.
+
+A profile splits one request into named phases and records, per phase, the
+wall time and the SQL query count and time taken from the counters Odoo
+keeps on the current thread. The active profile is thread-local so model
+code can open phases without having it passed around; when no request is
+being profiled, ``current()`` returns a no-op profile.
+"""
+
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+_local = threading.local()
+
+
+def _sql_counters():
+    """Return the (query count, query time in seconds) Odoo accumulated on this thread."""
+    thread = threading.current_thread()
+    return getattr(thread, 'query_count', 0), getattr(thread, 'query_time', 0.0)
+
+
+class RequestProfile:
+    """Phase timings and SQL counters of one profiled request."""
+
+    enabled = True
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.phases = []
+        self.context = {}
+        self._started = time.perf_counter()
+        self._sql_started = _sql_counters()
+
+    def annotate(self, **values):
+        """Attach identifiers such as ``production_id`` or ``task_id`` to the profile."""
+        self.context.update({key: value for key, value in values.items() if value})
+
+    @contextmanager
+    def phase(self, name, lock=False):
+        """Time a phase; ``lock`` marks phases that mostly wait on row locks."""
+        count, sql_time = _sql_counters()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            new_count, new_sql_time = _sql_counters()
+            self.phases.append({
+                'name': name,
+                'ms': round((time.perf_counter() - started) * 1000, 2),
+                'sql_count': new_count - count,
+                'sql_ms': round((new_sql_time - sql_time) * 1000, 2),
+                'lock': lock,
+            })
+
+    def summary(self):
+        """
+        Totals of the request so far.
+
+        Returns:
+            dict: duration, SQL and Python time, and lock wait in milliseconds
+        """
+        count, sql_time = _sql_counters()
+        duration = (time.perf_counter() - self._started) * 1000
+        sql_ms = (sql_time - self._sql_started[1]) * 1000
+        return {
+            'duration_ms': round(duration, 2),
+            'sql_count': count - self._sql_started[0],
+            'sql_time_ms': round(sql_ms, 2),
+            'python_time_ms': round(max(duration - sql_ms, 0.0), 2),
+            'lock_wait_ms': round(sum(phase['ms'] for phase in self.phases if phase['lock']), 2),
+        }
+
+
+class _NullProfile:
+    """Stand-in used when the request is not sampled."""
+
+    enabled = False
+
+    def annotate(self, **values):
+        pass
+
+    def phase(self, name, lock=False):
+        return nullcontext()
+
+
+NULL_PROFILE = _NullProfile()
+
+
+def current():
+    """Return the profile active on this thread, or the no-op profile."""
+    return getattr(_local, 'profile', NULL_PROFILE)
+
+
+@contextmanager
+def activate(profile):
+    """Make ``profile`` the active profile of this thread for the duration of the block."""
+    previous = current()
+    _local.profile = profile
+    try:
+        yield profile
+    finally:
+        _local.profile = previous
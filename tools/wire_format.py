@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Compact wire format shared by the API client and the callback controller.
+
+The legacy format sends JSON with the binary payload as a string of ASCII
+'0'/'1' characters. The compact format packs the payload into an integer
+bitfield and gzips the body, announced through ``Content-Encoding``.
+"""
+
+import gzip
+import json
+
+COMPACT_FORMAT = 'compact-v1'
+WIRE_FORMAT_HEADER = 'X-MQTT-Wire-Format'
+
+# Bodies smaller than this are not worth compressing.
+GZIP_MIN_SIZE = 512
+
+
+def pack_payload(binary_payload):
+    """
+    Pack a '0'/'1' payload string into an integer bitfield.
+
+    Returns:
+        tuple: (integer value, number of bits)
+    """
+    binary_payload = binary_payload or ''
+    return (int(binary_payload, 2) if binary_payload else 0), len(binary_payload)
+
+
+def unpack_payload(value, bits):
+    """Unpack an integer bitfield into a '0'/'1' payload string of ``bits`` characters."""
+    return format(int(value), 'b').zfill(int(bits))[-int(bits):] if bits else ''
+
+
+def encode_body(data, compress=True):
+    """
+    Serialize a JSON body, gzipped when worthwhile.
+
+    Returns:
+        tuple: (body bytes, extra headers)
+    """
+    body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    headers = {'Content-Type': 'application/json'}
+    if compress and len(body) >= GZIP_MIN_SIZE:
+        body = gzip.compress(body, compresslevel=5)
+        headers['Content-Encoding'] = 'gzip'
+    return body, headers
+
+
+def decode_body(raw, content_encoding=None):
+    """Decode a JSON request body, gunzipping it if announced by ``Content-Encoding``."""
+    if (content_encoding or '').strip().lower() == 'gzip':
+        raw = gzip.decompress(raw)
+    return json.loads(raw.decode('utf-8'))